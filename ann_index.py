@@ -0,0 +1,284 @@
+import json
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from dish_index import top_k_indices
+
+logger = logging.getLogger(__name__)
+
+
+def spherical_kmeans(vectors, n_clusters, iterations=15, sample_size=None, seed=0):
+    """Cluster L2-normalized vectors by cosine similarity, returns normalized centroids"""
+    rng = np.random.default_rng(seed)
+    if sample_size and len(vectors) > sample_size:
+        vectors = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+    vectors = np.asarray(vectors, dtype=np.float32)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        empty = counts == 0
+        # Re-seed empty clusters from random points so every list gets used
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.maximum(norms, 1e-12)
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """Inverted-file ANN index over a normalized embedding matrix, pure NumPy.
+
+    Dishes are clustered into ``n_lists`` cells (default: the square root
+    of the catalogue size) with spherical k-means; a query scores the
+    centroids, scans the ``nprobe`` closest cells exactly and returns the
+    best rows.  Raising ``nprobe`` trades latency for recall (probing every
+    cell is exact search).  Only centroids and the row
+    order are stored; vectors are read from the dish matrix, which may be
+    memory-mapped.
+    """
+
+    kind = "ivf"
+    filename = "ann_ivf.npz"
+
+    def __init__(self, n_lists=None, nprobe=8, iterations=15, seed=0):
+        self.n_lists = n_lists
+        self.trained_rows = None
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.seed = seed
+        self.centroids = None
+        self.order = None
+        self.offsets = None
+        self.fingerprint = None
+        self.build_seconds = None
+
+    def build(self, matrix, fingerprint=None, keys=None):
+        started = time.perf_counter()
+        n = len(matrix)
+        n_lists = self.n_lists or max(1, int(np.sqrt(n)))
+        n_lists = min(n_lists, n)
+        self.centroids = spherical_kmeans(matrix, n_lists, iterations=self.iterations,
+                                          sample_size=256 * n_lists, seed=self.seed)
+        self._assign(matrix)
+        self.trained_rows = n
+        self.fingerprint = fingerprint
+        self.build_seconds = time.perf_counter() - started
+        return self
+
+    def _assign(self, matrix):
+        assignments = np.empty(len(matrix), dtype=np.int64)
+        for start in range(0, len(matrix), 65536):
+            block = np.asarray(matrix[start:start + 65536], dtype=np.float32)
+            assignments[start:start + len(block)] = np.argmax(block @ self.centroids.T, axis=1)
+        self.order = np.argsort(assignments, kind='stable')
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=len(self.centroids)))])
+
+    def refreshed(self, matrix, fingerprint=None, keys=None):
+        """Index over a changed matrix.  The trained centroids are kept and rows
+        are only reassigned (one matrix multiply), unless the catalogue has
+        halved or doubled since training, in which case k-means runs again."""
+        if not self.trained_rows or not self.trained_rows / 2 <= len(matrix) <= self.trained_rows * 2:
+            return IVFIndex(n_lists=self.n_lists, nprobe=self.nprobe, iterations=self.iterations,
+                            seed=self.seed).build(matrix, fingerprint)
+        started = time.perf_counter()
+        index = IVFIndex(n_lists=self.n_lists, nprobe=self.nprobe, iterations=self.iterations, seed=self.seed)
+        index.centroids = self.centroids
+        index._assign(matrix)
+        index.trained_rows = self.trained_rows
+        index.fingerprint = fingerprint
+        index.build_seconds = time.perf_counter() - started
+        return index
+
+    def search(self, matrix, query_vector, n_candidates, nprobe=None):
+        """Rows of the approximately best ``n_candidates`` dishes, best first"""
+        query_vector = np.asarray(query_vector, dtype=np.float32).ravel()
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        cells = top_k_indices(self.centroids @ query_vector, nprobe)
+        rows = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in cells])
+        rows.sort()
+        scores = np.asarray(matrix[rows], dtype=np.float32) @ query_vector
+        return rows[top_k_indices(scores, n_candidates)]
+
+    def save(self, path):
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, centroids=self.centroids, order=self.order, offsets=self.offsets,
+                 fingerprint=np.array(self.fingerprint or ""), trained_rows=np.array(self.trained_rows or 0))
+        os.replace(tmp_path, path)
+
+    def load(self, path, fingerprint=None, dim=None):
+        """Load a saved index; returns False if missing or built for other data"""
+        if not os.path.exists(path):
+            return False
+        with np.load(path) as data:
+            if fingerprint is not None and str(data["fingerprint"]) != fingerprint:
+                return False
+            self.centroids = data["centroids"]
+            self.order = data["order"]
+            self.offsets = data["offsets"]
+            self.fingerprint = str(data["fingerprint"])
+            self.trained_rows = int(data["trained_rows"]) if "trained_rows" in data else len(self.order)
+        return True
+
+
+class HNSWIndex:
+    """HNSW graph index through the optional ``hnswlib`` package.
+
+    Graph labels are stable per dish version (``keys``, one per row), so a
+    catalogue change only inserts new or re-embedded dishes and marks the
+    removed ones deleted, on a copy of the graph; ``row_of`` maps labels
+    back to matrix rows.  A graph is never modified once its index is
+    searchable, so older snapshots keep their dishes and concurrent searches
+    need no lock.
+    """
+
+    kind = "hnsw"
+    filename = "ann_hnsw.bin"
+
+    def __init__(self, m=16, ef_construction=200, ef_search=64, seed=0):
+        import hnswlib  # noqa: F401  (fail early when the package is missing)
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.seed = seed
+        self.index = None
+        self.keys = None
+        self.labels = None
+        self.row_of = None
+        self.next_label = 0
+        self.fingerprint = None
+        self.build_seconds = None
+
+    def _new(self):
+        return HNSWIndex(m=self.m, ef_construction=self.ef_construction, ef_search=self.ef_search, seed=self.seed)
+
+    def _set_rows(self, labels, keys):
+        self.labels = np.asarray(labels, dtype=np.int64)
+        self.keys = list(keys) if keys is not None else None
+        self.row_of = np.full(self.next_label, -1, dtype=np.int64)
+        self.row_of[self.labels] = np.arange(len(self.labels))
+        # hnswlib searches with max(ef, k), so ef is set once rather than per query
+        self.index.set_ef(self.ef_search)
+
+    @staticmethod
+    def _capacity(n):
+        # Headroom for inserts; slots of deleted dishes are reused
+        return n + max(16, n // 4)
+
+    def build(self, matrix, fingerprint=None, keys=None):
+        import hnswlib
+        started = time.perf_counter()
+        n = len(matrix)
+        self.index = hnswlib.Index(space='ip', dim=matrix.shape[1])
+        self.index.init_index(max_elements=self._capacity(n), ef_construction=self.ef_construction, M=self.m,
+                              random_seed=self.seed, allow_replace_deleted=True)
+        self.index.add_items(np.asarray(matrix, dtype=np.float32), np.arange(n))
+        self.next_label = n
+        self._set_rows(np.arange(n), keys)
+        self.fingerprint = fingerprint
+        self.build_seconds = time.perf_counter() - started
+        return self
+
+    def refreshed(self, matrix, fingerprint=None, keys=None):
+        """Index over a changed matrix.  The graph is copied, new and changed
+        dishes are inserted into the copy and removed ones marked deleted;
+        this index is left untouched.  Rebuilt from scratch when the row keys
+        are unknown or over half the rows are new."""
+        if keys is None or self.keys is None:
+            return self._new().build(matrix, fingerprint, keys)
+        old = dict(zip(self.keys, self.labels.tolist()))
+        kept = set(keys)
+        added = [row for row, key in enumerate(keys) if key not in old]
+        removed = [label for key, label in old.items() if key not in kept]
+        if len(added) > len(keys) // 2:
+            return self._new().build(matrix, fingerprint, keys)
+
+        import hnswlib
+        started = time.perf_counter()
+        index = self._new()
+        index.index = hnswlib.Index(space='ip', dim=matrix.shape[1])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, self.filename)
+            self.index.save_index(path)
+            index.index.load_index(path, max_elements=max(self.index.get_max_elements(), self._capacity(len(keys))),
+                                   allow_replace_deleted=True)
+        for label in removed:
+            index.index.mark_deleted(label)
+        labels = np.array([old.get(key, -1) for key in keys], dtype=np.int64)
+        index.next_label = self.next_label + len(added)
+        if added:
+            new_labels = np.arange(self.next_label, index.next_label)
+            index.index.add_items(np.asarray(matrix[added], dtype=np.float32), new_labels, replace_deleted=True)
+            labels[added] = new_labels
+        index._set_rows(labels, keys)
+        index.fingerprint = fingerprint
+        index.build_seconds = time.perf_counter() - started
+        return index
+
+    def search(self, matrix, query_vector, n_candidates, nprobe=None):
+        n_candidates = min(n_candidates, len(self.labels))
+        labels, _ = self.index.knn_query(np.asarray(query_vector, dtype=np.float32).reshape(1, -1), k=n_candidates)
+        return self.row_of[labels[0].astype(np.int64)]
+
+    def save(self, path):
+        self.index.save_index(path + '.tmp')
+        with open(path + '.json.tmp', 'w', encoding='utf-8') as f:
+            json.dump({"fingerprint": self.fingerprint or "", "keys": self.keys, "labels": self.labels.tolist(),
+                       "next_label": self.next_label}, f)
+        os.replace(path + '.tmp', path)
+        os.replace(path + '.json.tmp', path + '.json')
+
+    def load(self, path, fingerprint=None, dim=None):
+        """Load a saved index; returns False if missing or built for other data"""
+        import hnswlib
+        if not (os.path.exists(path) and os.path.exists(path + '.json')):
+            return False
+        with open(path + '.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if fingerprint is not None and meta["fingerprint"] != fingerprint:
+            return False
+        self.index = hnswlib.Index(space='ip', dim=dim)
+        self.index.load_index(path, allow_replace_deleted=True)
+        self.next_label = meta["next_label"]
+        self._set_rows(meta["labels"], meta["keys"])
+        self.fingerprint = meta["fingerprint"]
+        return True
+
+
+def recall_at_k(matrix, queries, ann, k=10, n_candidates=None, nprobe=None):
+    """Share of the exact top-k found by the ANN index, averaged over queries,
+    plus mean exact and ANN latency in milliseconds"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    hits, exact_seconds, ann_seconds = 0, 0.0, 0.0
+    for query in queries:
+        started = time.perf_counter()
+        exact = top_k_indices(matrix @ query, k)
+        exact_seconds += time.perf_counter() - started
+        started = time.perf_counter()
+        approx = ann.search(matrix, query, n_candidates or k, nprobe=nprobe)
+        ann_seconds += time.perf_counter() - started
+        hits += len(set(exact.tolist()) & set(approx[:n_candidates or k].tolist()))
+    return {
+        "k": k,
+        "n_candidates": n_candidates or k,
+        "recall": hits / (k * len(queries)) if len(queries) else 0.0,
+        "exact_ms": exact_seconds * 1000.0 / max(1, len(queries)),
+        "ann_ms": ann_seconds * 1000.0 / max(1, len(queries)),
+    }
+
+
+def make_ann_index(kind="ivf", nprobe=8, n_lists=None, ef_search=64):
+    """``ivf`` (pure NumPy) or ``hnsw`` (needs hnswlib, falls back to ivf)"""
+    if kind == "hnsw":
+        try:
+            return HNSWIndex(ef_search=ef_search)
+        except ImportError:
+            logger.warning("hnswlib is not installed, using the NumPy IVF index instead")
+    elif kind != "ivf":
+        raise ValueError(f"Unknown ANN index '{kind}'")
+    return IVFIndex(n_lists=n_lists, nprobe=nprobe)
@@ -1,131 +1,426 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 import json
+import logging
+import threading
+import time
+import config
+import metrics
+from batching import MicroBatcher
+from dish_catalogue import CatalogueManager
+from dish_filters import validate_filters
+from fallback import CircuitBreaker, FallbackSearch
 from intelligent_nlp_model import IntelligentFoodRecommender
+from log_setup import configure_logging
+from responses import json_document, ndjson_lines, search_item_json, smart_item_json
+
+configure_logging()
+logger = logging.getLogger(__name__)
 
 # Tạo Flask app
 app = Flask(__name__)
 
 # Initialize intelligent recommender
 recommender = None
+batcher = None
+catalogue = None
+fallback_search = None
+breaker = None
+# The ASGI server (asgi.py) when the app is served through it
+serving = None
+warm_up_done = threading.Event()
+warm_up_error = None
+
+def initialize_app(warm_up=config.WARMUP, num_threads=config.TORCH_NUM_THREADS):
+    """Create the recommender. Models load on first use unless warm_up is set,
+    in which case they load in the background and /ready reports 503 until done.
+    ``num_threads`` caps the intra-op threads of model inference."""
+    global recommender, batcher, catalogue, fallback_search, breaker
+    recommender = IntelligentFoodRecommender(num_threads=num_threads)
+    batcher = MicroBatcher(recommender, max_batch_size=config.BATCH_MAX_SIZE,
+                           max_wait_ms=config.BATCH_MAX_WAIT_MS)
+    # Tải dữ liệu món ăn; indexed on first use and reloaded when the file changes
+    if catalogue is not None:
+        catalogue.stop()
+    catalogue = CatalogueManager(recommender, path=config.DISHES_PATH)
+    catalogue.watch()
+    # Keyword search that needs no model, ready before the first request, and
+    # the circuit breaker that switches /search to it when the models misbehave
+    fallback_search = FallbackSearch(catalogue)
+    threading.Thread(target=fallback_search.prepare, name="fallback-index", daemon=True).start()
+    breaker = CircuitBreaker(probe=_probe_models)
+    warm_up_done.clear()
+    if warm_up:
+        threading.Thread(target=_warm_up, name="model-warm-up", daemon=True).start()
+    else:
+        warm_up_done.set()
+
+def _probe_models():
+    """One uncached call to each model, for the circuit breaker's recovery probe"""
+    recommender.backend.sentiment(["probe"])
+    recommender.backend.embed(["probe"])
+
+def _warm_up():
+    global warm_up_error
+    logger.info("Warming up models...")
+    try:
+        recommender.warm_up()
+        logger.info("Models ready! Dish index holds %d dishes", len(catalogue.snapshot()))
+    except Exception as e:
+        warm_up_error = str(e)
+        logger.exception("Error during warm-up")
+        return
+    warm_up_done.set()
+
+initialize_app()
+
+# Read when /metrics is scraped, from whichever recommender is current
+metrics.REGISTRY.gauge("nlp_ready", "1 once warm-up finished", lambda: int(warm_up_done.is_set()))
+metrics.REGISTRY.gauge("nlp_batch_queue_depth", "Queries waiting for the micro-batcher",
+                       lambda: batcher.queue_depth())
+metrics.REGISTRY.gauge("nlp_asgi_in_flight", "Search requests running or queued in the ASGI pool",
+                       lambda: serving.in_flight if serving else None)
+metrics.REGISTRY.gauge("nlp_asgi_rejected_total", "Search requests rejected with 503 by the ASGI pool",
+                       lambda: serving.rejected if serving else None, kind="counter")
+metrics.REGISTRY.gauge("nlp_model_load_seconds", "Time each loaded model took to load",
+                       lambda: {name: status["load_seconds"] for name, status in recommender.models.status().items()},
+                       labelnames=("model",))
+metrics.REGISTRY.gauge("nlp_cache_hit_ratio", "Hit ratio of the query caches",
+                       lambda: {"results": recommender.result_cache.stats()["hit_ratio"],
+                                "features": recommender.feature_cache.stats()["hit_ratio"]},
+                       labelnames=("cache",))
+metrics.REGISTRY.gauge("nlp_cache_lookups_total", "Query cache lookups by result",
+                       lambda: {(cache, result): stats[result]
+                                for cache, stats in (("results", recommender.result_cache.stats()),
+                                                     ("features", recommender.feature_cache.stats()))
+                                for result in ("hits", "misses")},
+                       labelnames=("cache", "result"), kind="counter")
+metrics.REGISTRY.gauge("nlp_circuit_open", "1 while the circuit breaker routes /search to the keyword fallback",
+                       lambda: int(breaker.state == "open"))
+metrics.REGISTRY.gauge("nlp_circuit_opened_total", "Times the circuit breaker opened",
+                       lambda: breaker.opened, kind="counter")
+metrics.REGISTRY.gauge("nlp_catalogue_dishes", "Dishes in the live catalogue", lambda: len(catalogue.dishes))
+
+@app.before_request
+def start_timer():
+    g.started = time.perf_counter()
+
+@app.after_request
+def count_request(response):
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.observe_request(endpoint, response.status_code, time.perf_counter() - g.started)
+    return response
+
+def query_features(query_text):
+    """Sentiment and embedding for a query, computed in a shared micro-batch"""
+    return batcher.submit(query_text).result(timeout=config.BATCH_RESULT_TIMEOUT_S)
+
+def run_search(query_text, snapshot, top_k=5, offset=0, filters=None):
+    """SearchResult page for a query against one catalogue snapshot, from cache when possible"""
+    result = recommender.cached_search(query_text, snapshot, top_k=top_k, offset=offset, filters=filters)
+    if result is None:
+        features = query_features(query_text)
+        result = recommender.intelligent_search(query_text, snapshot, use_cache=False, top_k=top_k, offset=offset,
+                                                filters=filters, **features)
+    metrics.observe_timings(result.timings)
+    return result
+
+def paging(data, args=None):
+    """(top_k, offset) from the query string or JSON body, ValueError when out of range"""
+    args = request.args if args is None else args
+    try:
+        top_k = int(args.get("top_k", data.get("top_k", 5)))
+        offset = int(args.get("offset", data.get("offset", 0)))
+    except (TypeError, ValueError):
+        raise ValueError("'top_k' and 'offset' must be integers") from None
+    if top_k < 1 or offset < 0:
+        raise ValueError("'top_k' must be positive and 'offset' not negative")
+    if offset + top_k > config.SEARCH_MAX_DEPTH:
+        raise ValueError(f"'offset' + 'top_k' may not exceed {config.SEARCH_MAX_DEPTH}")
+    return top_k, offset
+
+def search_query(data):
+    """The "query" string of the JSON body, ValueError when missing or not a string"""
+    query_text = data.get("query")
+    if not query_text:
+        raise ValueError("Missing 'query' parameter")
+    if not isinstance(query_text, str):
+        raise ValueError("'query' must be a string")
+    return query_text
+
+def search_filters(data):
+    """Validated "filters" object of the JSON body, ValueError when malformed"""
+    filters = data.get("filters")
+    validate_filters(filters)
+    return filters
+
+def wants_stream(data, args=None, accept=None):
+    """True when results should stream as NDJSON: stream=1 or Accept: application/x-ndjson"""
+    args = request.args if args is None else args
+    accept = request.accept_mimetypes.best if accept is None else accept
+    return args.get("stream") in ("1", "true") or data.get("stream") is True or accept == "application/x-ndjson"
+
+def search_response(fields, items, stream, status=200, headers=None):
+    """JSON document with the serialized items under "result", or an NDJSON
+    stream of the other fields followed by one line per item.  Without
+    items, ``fields`` is an error body."""
+    if items is None:
+        response = jsonify(fields)
+    elif stream:
+        response = Response(ndjson_lines(fields, items), mimetype="application/x-ndjson")
+    else:
+        response = Response(json_document(fields, "result", items), mimetype="application/json")
+    response.status_code = status
+    response.headers.update(headers or {})
+    return response
+
+def wants_timings(data, args=None):
+    """True when the caller asked for per-stage timings with debug=timings"""
+    args = request.args if args is None else args
+    return args.get("debug") == "timings" or data.get("debug") == "timings"
+
+def search_results(query_text, top_k=5, offset=0, filters=None, timings=False):
+    """(fields, serialized items) of a /search response"""
+    # Use intelligent search instead of simple keyword matching
+    snapshot = catalogue.snapshot()
+    search_result = run_search(query_text, snapshot, top_k, offset, filters)
+
+    # Just the dish data (same format as before), from the pre-serialized dish records
+    results = (search_item_json(snapshot, rec) for rec in search_result.candidates)
+
+    # Return in your original format
+    response = {"query": query_text}
+    if timings:
+        response["timings_ms"] = search_result.timings
+    return response, results
+
+def smart_search_results(query_text, top_k=5, offset=0, filters=None, timings=False):
+    """(fields, serialized items) of a /smart-search response"""
+    # Get intelligent recommendations and the emotional context behind them
+    snapshot = catalogue.snapshot()
+    search_result = run_search(query_text, snapshot, top_k, offset, filters)
+
+    # Format with additional intelligence data
+    enhanced_results = (smart_item_json(snapshot, rec) for rec in search_result.candidates)
+
+    response = {
+        "query": query_text,
+        "emotional_analysis": search_result.emotional_context,
+        "total_found": len(search_result.candidates)
+    }
+    if timings:
+        response["timings_ms"] = search_result.timings
+    return response, enhanced_results
 
-# Tải dữ liệu món ăn
-def load_dishes():
-    with open('data/dishes.json', 'r', encoding='utf-8') as f:
-        return json.load(f)
+def fallback_results(query_text, top_k=5, offset=0, filters=None):
+    """(fields, serialized items) of a /search response from keyword search alone"""
+    metrics.FALLBACKS.inc(kind="keyword_search")
+    records = fallback_search.search(query_text, top_k, offset, filters)
+    return {"query": query_text}, (record.json for record in records)
 
-def initialize_app():
-    global recommender
-    print("🚀 Initializing intelligent model...")
-    recommender = IntelligentFoodRecommender()
-    print("✅ Model ready!")
+def search_or_fallback(endpoint, query_text, top_k=5, offset=0, filters=None, timings=False):
+    """(status, fields, serialized items, extra headers) of /search or
+    /smart-search, through the circuit breaker.
 
-dishes = load_dishes()
+    /search answers from the keyword fallback while the breaker is open
+    (200) or when the intelligent model fails (500); /smart-search has no
+    fallback, so it gets 503 or an error body with items None.  Callers
+    validate the request first (``search_query``, ``paging``,
+    ``search_filters``), so only model and backend errors count as failures.
+    """
+    build = search_results if endpoint == "/search" else smart_search_results
+    if not breaker.allow():
+        if endpoint == "/search":
+            fields, items = fallback_results(query_text, top_k, offset, filters)
+            return 200, fields, items, {"X-Search-Mode": "fallback"}
+        return (503, {"error": "Search models are unavailable, retry shortly"}, None,
+                {"Retry-After": str(max(1, round(config.BREAKER_PROBE_INTERVAL_S)))})
+
+    started = time.perf_counter()
+    try:
+        fields, items = build(query_text, top_k, offset, filters, timings)
+    except Exception as e:
+        breaker.record_failure(str(e))
+        logger.exception("Error in %s: %s", endpoint, e) # Added endpoint name for clarity
+        if endpoint == "/search":
+            # Fallback to keyword search if intelligent model fails; 500 so callers can tell
+            fields, items = fallback_results(query_text, top_k, offset, filters)
+            return 500, fields, items, {"X-Search-Mode": "fallback"}
+        return 500, {"error": str(e)}, None, {}
+    breaker.record_success(time.perf_counter() - started)
+    return 200, fields, items, {}
 
 # API tìm kiếm - SAME ENDPOINT, SMARTER LOGIC
 @app.route('/search', methods=['POST']) # <--- CHANGED FROM GET TO POST
 def search():
     data = request.json
-    query_text = data.get("query")
-    if not query_text:
-        return jsonify({"error": "Missing 'query' parameter"}), 400
-
     try:
-        # Use intelligent search instead of simple keyword matching
-        recommendations = recommender.intelligent_search(query_text, dishes)
-
-        # Extract just the dish data (same format as before)
-        results = []
-        for rec in recommendations:
-            dish = rec["dish"]
-            # Return the complete dish object with all original fields
-            results.append({
-                "categoryName": dish["categoryName"],
-                "description": dish["description"],
-                "imageUrl": dish["imageUrl"],
-                "isDeleted": dish["isDeleted"],
-                "isPopular": dish["isPopular"],
-                "name": dish["name"],
-                "price": dish["price"],
-                "star": dish["star"],
-                "time": dish["time"],
-                "cuisine_type": dish["cuisine_type"],
-                "dish_characteristics": dish["dish_characteristics"],
-                "main_ingredients": dish["main_ingredients"],
-                "__collections__": dish.get("__collections__", {})
-            })
-
-        # Return in your original format
-        return jsonify({
-            "query": query_text,
-            "result": results
-        })
+        query_text = search_query(data)
+        top_k, offset = paging(data)
+        filters = search_filters(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    except Exception as e:
-        print(f"Error in /search: {e}") # Added endpoint name for clarity
-        import traceback
-        traceback.print_exc()
-        # Fallback to original method if intelligent model fails
-        from nlp_model import analyze_query, search_dishes
-        keywords = analyze_query(query_text)
-        results = search_dishes(keywords, dishes)
-        # Ensure the fallback also returns a proper response, even if empty
-        return jsonify({"query": query_text, "result": results}), 500 # Changed status to 500 for error fallback
+    status, response, results, headers = search_or_fallback('/search', query_text, top_k, offset, filters,
+                                                            wants_timings(data))
+    return search_response(response, results, wants_stream(data), status, headers)
 
 # Optional: Add new intelligent endpoint while keeping original
 @app.route('/smart-search', methods=['POST']) # <--- CHANGED FROM GET TO POST
 def smart_search():
     """Enhanced endpoint with reasoning and scores"""
     data = request.json
-    query_text = data.get("query")
-    if not query_text:
-        return jsonify({"error": "Missing 'query' parameter"}), 400
+    try:
+        query_text = search_query(data)
+        top_k, offset = paging(data)
+        filters = search_filters(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
+    status, response, enhanced_results, headers = search_or_fallback('/smart-search', query_text, top_k, offset,
+                                                                     filters, wants_timings(data))
+    return search_response(response, enhanced_results, wants_stream(data), status, headers)
+
+@app.route('/batch-search', methods=['POST'])
+def batch_search():
+    """Many queries in one call: one model pass and one matrix multiply for all of them.
+
+    Body: {"queries": [...], "top_k": 5, "offset": 0, "filters": {"cuisine_type": [...], "max_price": 20, ...}}.
+    Results come back in query order; a failing query gets an "error" entry
+    instead of failing the batch.
+    """
+    data = request.json or {}
+    queries = data.get("queries")
+    if not isinstance(queries, list) or not queries:
+        return jsonify({"error": "Missing 'queries' parameter (a list of strings)"}), 400
+    if not all(isinstance(query_text, str) for query_text in queries):
+        return jsonify({"error": "Each query must be a string"}), 400
+    if len(queries) > config.BATCH_SEARCH_MAX_QUERIES:
+        return jsonify({"error": f"At most {config.BATCH_SEARCH_MAX_QUERIES} queries per batch"}), 400
     try:
-        # Get emotional context
-        emotional_context = recommender.analyze_emotional_context(query_text)
-
-        # Get intelligent recommendations
-        recommendations = recommender.intelligent_search(query_text, dishes)
-
-        # Format with additional intelligence data
-        enhanced_results = []
-        for rec in recommendations:
-            dish = rec["dish"]
-            enhanced_results.append({
-                "dish": {
-                    "categoryName": dish["categoryName"],
-                    "description": dish["description"],
-                    "imageUrl": dish["imageUrl"],
-                    "isDeleted": dish["isDeleted"],
-                    "isPopular": dish["isPopular"],
-                    "name": dish["name"],
-                    "price": dish["price"],
-                    "star": dish["star"],
-                    "time": dish["time"],
-                    "cuisine_type": dish["cuisine_type"],
-                    "dish_characteristics": dish["dish_characteristics"],
-                    "main_ingredients": dish["main_ingredients"],
-                    "__collections__": dish.get("__collections__", {})
-                },
-                "confidence_score": float(rec["score"]),
-                "reasoning": rec["reasoning"],
-                "similarity": float(rec["similarity"])
-            })
-
-        return jsonify({
-            "query": query_text,
-            "emotional_analysis": emotional_context,
-            "result": enhanced_results,
-            "total_found": len(recommendations)
-        })
+        top_k, offset = paging(data)
+        filters = search_filters(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
+    if not breaker.allow():
+        return jsonify({"error": "Search models are unavailable, retry shortly"}), 503, \
+            {"Retry-After": str(max(1, round(config.BREAKER_PROBE_INTERVAL_S)))}
+
+    started = time.perf_counter()
+    try:
+        snapshot = catalogue.snapshot()
+        search_results = recommender.intelligent_search_batch(queries, snapshot, top_k=top_k, offset=offset,
+                                                              filters=filters)
     except Exception as e:
-        print(f"Error in smart_search: {e}") # Added endpoint name for clarity
-        import traceback
-        traceback.print_exc() # Print full traceback for debugging
+        breaker.record_failure(str(e))
+        logger.exception("Error in batch_search: %s", e)
         return jsonify({"error": str(e)}), 500
+    breaker.record_success(time.perf_counter() - started)
+
+    results, errors = [], 0
+    for query_text, search_result in zip(queries, search_results):
+        if isinstance(search_result, Exception):
+            errors += 1
+            results.append(json.dumps({"query": query_text, "error": str(search_result)}))
+            continue
+        metrics.observe_timings(search_result.timings)
+        fields = {
+            "query": query_text,
+            "emotional_analysis": search_result.emotional_context,
+            "total_found": len(search_result.candidates)
+        }
+        if wants_timings(data):
+            fields["timings_ms"] = search_result.timings
+        results.append(json_document(fields, "result",
+                                     (smart_item_json(snapshot, rec) for rec in search_result.candidates)))
+    return Response(json_document({"errors": errors}, "results", results), mimetype="application/json")
+
+def admin_error():
+    """Error response unless the request carries the configured admin token"""
+    if not config.ADMIN_TOKEN:
+        return jsonify({"error": "Admin endpoints are disabled; set ADMIN_TOKEN to enable them"}), 403
+    if request.headers.get("X-Admin-Token") != config.ADMIN_TOKEN:
+        return jsonify({"error": "Invalid admin token"}), 401
+    return None
+
+@app.route('/admin/dishes', methods=['POST'])
+def upsert_dishes():
+    """Add or replace dishes: {"dishes": {id: dish, ...}} or {"dishes": [{"id": ..., ...}]}"""
+    error = admin_error()
+    if error:
+        return error
+    data = request.json or {}
+    updates = data.get("dishes")
+    if isinstance(updates, list):
+        if not all(isinstance(dish, dict) and dish.get("id") for dish in updates):
+            return jsonify({"error": "Each dish in a list needs an 'id'"}), 400
+        updates = {str(dish["id"]): dish for dish in updates}
+    if not isinstance(updates, dict) or not updates:
+        return jsonify({"error": "Missing 'dishes' parameter"}), 400
+    try:
+        return jsonify(catalogue.upsert(updates))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/admin/dishes', methods=['DELETE'])
+def delete_dishes():
+    """Remove dishes: {"ids": [...]}"""
+    error = admin_error()
+    if error:
+        return error
+    dish_ids = (request.json or {}).get("ids")
+    if not isinstance(dish_ids, list) or not dish_ids:
+        return jsonify({"error": "Missing 'ids' parameter"}), 400
+    return jsonify(catalogue.delete(str(dish_id) for dish_id in dish_ids))
+
+@app.route('/admin/reload', methods=['POST'])
+def reload_catalogue():
+    """Re-read the catalogue file now instead of waiting for the watcher"""
+    error = admin_error()
+    if error:
+        return error
+    try:
+        update = catalogue.reload()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(update or {"reason": "reload", "changed": 0, "removed": 0, "version": catalogue.version})
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness probe: which models are loaded and how long each took"""
+    is_ready = warm_up_done.is_set()
+    return jsonify({
+        "ready": is_ready,
+        "warm_up": config.WARMUP,
+        "warm_up_error": warm_up_error,
+        "models": recommender.models.status(),
+        "dish_index": {
+            "dishes": len(recommender.dish_index),
+            "retrieval": recommender.retrieval_mode,
+            "ann_index": recommender.ann_index.kind if recommender.ann_index is not None else None
+        }
+    }), 200 if is_ready else 503
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Counters, latency histograms and gauges in the Prometheus text format"""
+    return Response(metrics.REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Runtime metrics for tuning the service"""
+    return jsonify({
+        "batcher": batcher.stats() if batcher else None,
+        "circuit_breaker": breaker.status(),
+        "serving": serving.stats() if serving else None,
+        "catalogue": catalogue.status(),
+        "cache": {
+            "catalogue_version": catalogue.version,
+            "results": recommender.result_cache.stats(),
+            "features": recommender.feature_cache.stats()
+        }
+    })
 
 if __name__ == '__main__':
-    initialize_app()
-    print("🌟 Starting intelligent food search API...")
+    logger.info("Starting intelligent food search API...")
     app.run(debug=True, host="0.0.0.0", port=5000)
\ No newline at end of file
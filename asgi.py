@@ -0,0 +1,237 @@
+import asyncio
+import io
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+import torch
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+import app as wsgi
+import config
+import metrics
+from responses import json_document, ndjson_lines
+
+JSON_HEADERS = [(b"content-type", b"application/json")]
+NDJSON_HEADERS = [(b"content-type", b"application/x-ndjson")]
+
+
+class SearchServer:
+    """ASGI app running searches on a fixed pool of worker threads.
+
+    /search, /smart-search and /batch-search are admitted only while fewer
+    than ``workers + queue_size`` of them are in flight; beyond that the
+    caller gets 503 with ``Retry-After`` straight from the event loop
+    instead of queueing without bound.  /search and /smart-search are
+    answered with the same helpers (and response bodies) as the Flask
+    routes; every other route is handed to the Flask app unchanged.
+
+    Run it with any ASGI server, e.g. ``uvicorn asgi:app``.
+    """
+
+    search_routes = ("/search", "/smart-search")
+    pooled_routes = ("/search", "/smart-search", "/batch-search")
+
+    def __init__(self, workers=config.ASGI_WORKERS, queue_size=config.ASGI_QUEUE_SIZE,
+                 retry_after=config.ASGI_RETRY_AFTER_S):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.retry_after = retry_after
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search-worker")
+        # Only touched from the event loop, so no lock
+        self.in_flight = 0
+        self.served = 0
+        self.rejected = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        body = await _read_body(receive)
+        loop = asyncio.get_running_loop()
+
+        if scope["path"] not in self.pooled_routes:
+            # Admin, health and stats routes: cheap, never rejected
+            await _send(send, *await loop.run_in_executor(None, _call_wsgi, scope, body))
+            return
+
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            metrics.REQUESTS.inc(endpoint=scope["path"], status="503")
+            await _send(send, 503, JSON_HEADERS + [(b"retry-after", str(self.retry_after).encode())],
+                        [json.dumps({"error": "Server busy, retry shortly"}).encode()])
+            return
+        # Requests the Flask app handles are counted by its own hooks
+        native = scope["method"] == "POST" and scope["path"] in self.search_routes
+        started = time.perf_counter()
+        self.in_flight += 1
+        try:
+            status = await _stream(send, loop, self.pool, self._search if native else _call_wsgi, scope, body)
+        finally:
+            self.in_flight -= 1
+        self.served += 1
+        if native:
+            metrics.observe_request(scope["path"], status, time.perf_counter() - started)
+
+    def _search(self, scope, body):
+        """(status, headers, body chunks) for /search or /smart-search, on a pool
+        thread; NDJSON chunks are produced lazily, one line at a time"""
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            return _json(400, {"error": "Request body must be a JSON object"})
+        args = dict(parse_qsl(scope["query_string"].decode("latin-1")))
+        accept = parse_accept_header(_header(scope, b"accept"), MIMEAccept).best or ""
+
+        try:
+            query_text = wsgi.search_query(data)
+            top_k, offset = wsgi.paging(data, args)
+            filters = wsgi.search_filters(data)
+        except ValueError as e:
+            return _json(400, {"error": str(e)})
+
+        path = scope["path"]
+        status, fields, items, headers = wsgi.search_or_fallback(path, query_text, top_k, offset, filters,
+                                                                 wsgi.wants_timings(data, args))
+        headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+        if items is None:
+            return status, JSON_HEADERS + headers, [json.dumps(fields).encode()]
+        if wsgi.wants_stream(data, args, accept):
+            return status, NDJSON_HEADERS + headers, (line.encode() for line in ndjson_lines(fields, items))
+        return status, JSON_HEADERS + headers, [json_document(fields, "result", items).encode()]
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.pool.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "served": self.served,
+            "rejected": self.rejected,
+            "torch_threads": torch.get_num_threads(),
+        }
+
+
+def _json(status, payload):
+    return status, JSON_HEADERS, [json.dumps(payload).encode()]
+
+
+def _header(scope, name):
+    return b",".join(value for key, value in scope["headers"] if key.lower() == name).decode("latin-1")
+
+
+async def _read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+            return body
+
+
+async def _send(send, status, headers, chunks):
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    for chunk in chunks:
+        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _stream(send, loop, pool, handler, scope, body):
+    """Run ``handler(scope, body)`` on ``pool`` and send each body chunk as
+    soon as the pool thread produces it; returns the status"""
+    queue = asyncio.Queue()
+
+    def produce():
+        try:
+            status, headers, chunks = handler(scope, body)
+            loop.call_soon_threadsafe(queue.put_nowait, (status, headers))
+            for chunk in chunks:
+                loop.call_soon_threadsafe(queue.put_nowait, chunk)
+        except BaseException as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        else:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    producer = loop.run_in_executor(pool, produce)
+    started = await queue.get()
+    if isinstance(started, BaseException):
+        await producer
+        raise started
+    status, headers = started
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    while True:
+        chunk = await queue.get()
+        if chunk is None:
+            break
+        if isinstance(chunk, BaseException):
+            await producer
+            raise chunk
+        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+    await producer
+    return status
+
+
+def _call_wsgi(scope, body):
+    """Run the Flask app for one ASGI request, returns (status, headers, body chunks)"""
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"],
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+    for key, value in scope["headers"]:
+        key = key.decode("latin-1").upper().replace("-", "_")
+        if key == "CONTENT_LENGTH":
+            continue
+        key = key if key == "CONTENT_TYPE" else "HTTP_" + key
+        value = value.decode("latin-1")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = int(status.split()[0])
+        started["headers"] = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+    result = wsgi.app(environ, start_response)
+    try:
+        chunks = [chunk for chunk in result if chunk]
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    return started["status"], started["headers"], chunks
+
+
+app = SearchServer()
+wsgi.serving = app
@@ -0,0 +1,147 @@
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Background worker that groups concurrent queries into one model pass.
+
+    Callers ``submit`` a query and get a ``Future``.  The worker waits for the
+    first query, then keeps collecting until ``max_batch_size`` queries are
+    queued or ``max_wait_ms`` has elapsed, and runs one batched sentiment call
+    and one batched embedding call for the whole group.  Each future resolves
+    to ``{"sentiment": ..., "query_embedding": ..., "timings": ...}``, which
+    can be passed straight to ``IntelligentFoodRecommender.intelligent_search``.
+    """
+
+    def __init__(self, recommender, max_batch_size=16, max_wait_ms=5.0, stats_window=1000):
+        self.recommender = recommender
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+
+        # Metrics
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._batch_sizes = Counter()
+        self._queue_waits = deque(maxlen=stats_window)
+        self._batch_latencies = deque(maxlen=stats_window)
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, query):
+        """Queue a query for the next batch, returns a Future.
+
+        The worker thread starts on first submit, so each forked WSGI worker
+        gets its own.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        future = Future()
+        self._queue.put((query, future, time.perf_counter()))
+        return future
+
+    def _collect(self):
+        """Block for the first item, then gather more until size or time runs out"""
+        first = self._queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopping.set()
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._collect()
+            if batch:
+                self._process(batch)
+        # Fail anything still queued so callers don't hang
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[1].set_exception(RuntimeError("Micro-batcher stopped"))
+
+    def _process(self, batch):
+        started = time.perf_counter()
+        waits = [started - enqueued for _, _, enqueued in batch]
+
+        # The recommender dedupes identical queries and skips cached ones
+        timings = {}
+        try:
+            features = self.recommender.get_query_features([query for query, _, _ in batch], timings=timings)
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+        else:
+            for (_, future, enqueued), result in zip(batch, features):
+                item_timings = dict(timings, queue_wait=(started - enqueued) * 1000.0)
+                future.set_result(dict(result, timings=item_timings))
+
+        with self._lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._batch_sizes[len(batch)] += 1
+            self._queue_waits.extend(waits)
+            self._batch_latencies.append(time.perf_counter() - started)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        """Batch size and queue wait metrics for tuning throughput vs latency"""
+        with self._lock:
+            waits_ms = np.array(self._queue_waits) * 1000.0
+            latencies_ms = np.array(self._batch_latencies) * 1000.0
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "items": self._items,
+                "mean_batch_size": self._items / self._batches if self._batches else 0.0,
+                "batch_size_histogram": {str(size): count for size, count in sorted(self._batch_sizes.items())},
+                "queue_wait_ms": _percentiles(waits_ms),
+                "batch_latency_ms": _percentiles(latencies_ms),
+            }
+
+
+def _percentiles(values):
+    if len(values) == 0:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "max": float(values.max())}
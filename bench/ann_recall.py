@@ -0,0 +1,110 @@
+"""Recall@k of the ANN retrieval stage against exact search.
+
+    python -m bench.ann_recall --size 100000 --nprobe 1 4 8 16 32
+    python -m bench.ann_recall --kind hnsw --ef-search 32 64 128     # needs hnswlib
+
+Embeds a synthetic catalogue (see bench/corpus.py) with the chosen backend,
+builds the ANN index once and, for each setting, reports:
+
+* ``vector``: recall@k of the raw nearest-neighbour candidates against an
+  exact matrix scan, with the latency of both;
+* ``pipeline``: share of the top 5 dishes returned by ``intelligent_search``
+  in ``ann`` mode that score at least as well as the 5th dish of ``exact``
+  mode, i.e. how often the keyword/mood re-ranking ends up with an equally
+  good answer.  Scaled catalogues contain many equal-scoring variants, so
+  this compares scores rather than dish ids.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--backend", default="stub", choices=["stub", "torch", "onnx"])
+    parser.add_argument("--kind", default="ivf", choices=["ivf", "hnsw"])
+    parser.add_argument("--lists", type=int, help="IVF lists (default sqrt(size))")
+    parser.add_argument("--nprobe", nargs="+", type=int, default=[1, 4, 8, 16, 32])
+    parser.add_argument("--ef-search", nargs="+", type=int, default=[32, 64, 128, 256])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--candidates", type=int, default=1000, help="ANN candidates handed to re-ranking")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here as well as stdout")
+    args = parser.parse_args(argv)
+
+    os.environ["INFERENCE_BACKEND"] = args.backend
+    os.environ["CACHE_BACKEND"] = "none"
+    os.environ["ANN_KIND"] = args.kind
+    if args.lists:
+        os.environ["ANN_LISTS"] = str(args.lists)
+    import config
+    from ann_index import recall_at_k
+    from bench.corpus import load_queries, scale_catalogue
+    from intelligent_nlp_model import IntelligentFoodRecommender
+
+    with open(config.DISHES_PATH, "r", encoding="utf-8") as f:
+        dishes = scale_catalogue(json.load(f), args.size, seed=args.seed)
+    queries = load_queries(synthetic=args.queries, seed=args.seed)[:args.queries]
+
+    report = {"config": vars(args), "results": []}
+    with tempfile.TemporaryDirectory() as index_dir:
+        exact = IntelligentFoodRecommender(index_dir=index_dir, retrieval_mode="exact")
+        exact.index_dishes(dishes)
+        ann = IntelligentFoodRecommender(index_dir=index_dir, retrieval_mode="ann", ann_candidates=args.candidates)
+        started = time.perf_counter()
+        ann.index_dishes(dishes)
+        report["index_build_seconds"] = time.perf_counter() - started
+
+        features = exact.get_query_features(queries)
+        query_vectors = np.stack([feature["query_embedding"] for feature in features])
+        # Score of the 5th exact result, anything scoring as well is a hit
+        expected, latencies = [], []
+        for query, feature in zip(queries, features):
+            started = time.perf_counter()
+            result = exact.intelligent_search(query, dishes, **feature)
+            latencies.append(time.perf_counter() - started)
+            expected.append(min(float(rec["score"]) for rec in result))
+        report["exact_pipeline_mean_ms"] = float(np.mean(latencies)) * 1000.0
+
+        settings = args.ef_search if ann.ann_index.kind == "hnsw" else args.nprobe
+        for setting in settings:
+            if ann.ann_index.kind == "hnsw":
+                ann.ann_index.ef_search = setting
+            else:
+                ann.ann_index.nprobe = setting
+            vector = recall_at_k(exact.dish_index.matrix, query_vectors, ann.ann_index, k=args.k,
+                                 n_candidates=args.candidates)
+            hits, returned, latencies = 0, 0, []
+            for query, feature, threshold in zip(queries, features, expected):
+                started = time.perf_counter()
+                result = ann.intelligent_search(query, dishes, **feature)
+                latencies.append(time.perf_counter() - started)
+                hits += sum(float(rec["score"]) >= threshold - 1e-5 for rec in result)
+                returned += len(result)
+            report["results"].append({
+                "ef_search" if ann.ann_index.kind == "hnsw" else "nprobe": setting,
+                "vector": vector,
+                "pipeline": {
+                    "top5_recall": hits / max(1, returned),
+                    "mean_ms": float(np.mean(latencies)) * 1000.0,
+                },
+            })
+        report["index_kind"] = ann.ann_index.kind
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Latency and memory comparison of the inference backends.
+
+    python -m bench.backends --backends torch onnx onnx-int8 --repeat 20 --output backends.json
+
+Each backend runs in its own subprocess so peak RSS and torch/ORT thread
+pools are not shared between them.  The first ONNX run includes the export
+into ONNX_DIR; run twice to see cached start-up.  Models are the ones named in
+config (EMBEDDING_MODEL / SENTIMENT_MODEL), which may be local directories.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+BACKENDS = {
+    "torch": {"INFERENCE_BACKEND": "torch"},
+    "onnx": {"INFERENCE_BACKEND": "onnx", "ONNX_QUANTIZE": "0"},
+    "onnx-int8": {"INFERENCE_BACKEND": "onnx", "ONNX_QUANTIZE": "1"},
+}
+
+QUERIES = [
+    "I feel jumpy and restless",
+    "I'm stressed from work and need comfort food",
+    "I'm tired and need something energizing",
+    "I want something to celebrate with friends",
+    "something spicy",
+    "warm soup on a rainy day",
+]
+
+
+def _latency_ms(samples):
+    samples = np.asarray(samples) * 1000.0
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "mean": float(samples.mean())}
+
+
+def run_worker(repeat, batch_size):
+    """Measure the backend selected by the environment, print one JSON line"""
+    import config
+    from dish_index import dish_text
+    from intelligent_nlp_model import IntelligentFoodRecommender
+
+    with open(config.DISHES_PATH, "r", encoding="utf-8") as f:
+        texts = [dish_text(dish) for dish in json.load(f).values()]
+
+    recommender = IntelligentFoodRecommender()
+    backend = recommender.backend
+
+    started = time.perf_counter()
+    recommender.warm_up()
+    load_seconds = time.perf_counter() - started
+
+    embed_times, sentiment_times = [], []
+    for _ in range(repeat):
+        for query in QUERIES:
+            started = time.perf_counter()
+            backend.embed([query])
+            embed_times.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            backend.sentiment([query])
+            sentiment_times.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    backend.embed(texts, batch_size=batch_size)
+    catalogue_seconds = time.perf_counter() - started
+
+    print(json.dumps({
+        "backend": backend.name,
+        "load_seconds": load_seconds,
+        "query_embedding_ms": _latency_ms(embed_times),
+        "query_sentiment_ms": _latency_ms(sentiment_times),
+        "catalogue_embedding_seconds": catalogue_seconds,
+        "catalogue_size": len(texts),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+    }))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the query list")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--output", help="write the JSON report here as well as stdout")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args.repeat, args.batch_size)
+        return
+
+    report = {}
+    for name in args.backends:
+        env = dict(os.environ, **BACKENDS[name])
+        completed = subprocess.run(
+            [sys.executable, "-m", "bench.backends", "--worker", "--repeat", str(args.repeat),
+             "--batch-size", str(args.batch_size)],
+            env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            report[name] = {"error": completed.stderr.strip().splitlines()[-1:]}
+            continue
+        report[name] = json.loads(completed.stdout.strip().splitlines()[-1])
+        # Note if the ONNX backend fell back to torch
+        report[name]["ran_as"] = report[name].pop("backend")
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
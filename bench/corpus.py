@@ -0,0 +1,78 @@
+"""Query corpus and synthetic catalogues for the benchmarks."""
+import copy
+import json
+import os
+import random
+import re
+
+# Quoted example queries in the backlog bodies, e.g. ("I'm stressed", "something spicy")
+_QUOTED = re.compile(r'"([^"]{3,80})"')
+
+MOODS = ["stressed", "tired", "sad", "happy", "anxious", "jumpy", "energetic", "romantic", "nostalgic",
+         "restless", "overwhelmed", "excited", "sleepy", "down"]
+CRAVINGS = ["something spicy", "comfort food", "warm soup", "something sweet", "a light meal", "pizza",
+            "fried chicken", "a fresh salad", "noodles", "something cheesy", "a burger", "seafood",
+            "something healthy", "dessert", "coffee"]
+TEMPLATES = [
+    "I'm {mood} and want {craving}",
+    "I feel {mood}, need {craving}",
+    "{craving}",
+    "feeling {mood} today",
+    "something for when I'm {mood}",
+    "I'm so {mood}, craving {craving} after the gym",
+]
+
+STOPWORDS = frozenset("""
+a about after am an and any are as at be been but by can could do feel feeling for from get had has have i
+i'm im in is it just like me my need of on or so some something that the this to today too very want was
+when with would you
+""".split())
+
+VARIANT_WORDS = ["Classic", "Deluxe", "Spicy", "Mini", "Family", "Signature", "House", "Grilled", "Crispy",
+                 "Double", "Veggie", "Smoky", "Garlic", "Honey", "Loaded", "Street", "Royal", "Golden"]
+
+
+def load_queries(requests_path="requests.jsonl", synthetic=200, seed=0):
+    """Queries quoted in the backlog (if present) followed by synthetic mood queries"""
+    queries = []
+    if requests_path and os.path.exists(requests_path):
+        with open(requests_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    queries.extend(_QUOTED.findall(json.loads(line).get("body", "")))
+    rng = random.Random(seed)
+    for _ in range(synthetic):
+        template = rng.choice(TEMPLATES)
+        queries.append(template.format(mood=rng.choice(MOODS), craving=rng.choice(CRAVINGS)))
+    return queries
+
+
+def keywords_for(query):
+    """Lightweight stand-in for nlp_model.analyze_query (no spaCy model needed)"""
+    return [word for word in re.findall(r"[\w']+", query.lower()) if word not in STOPWORDS]
+
+
+def scale_catalogue(dishes, size, seed=0):
+    """Synthetic catalogue of ``size`` dishes derived from ``dishes``.
+
+    Each copy gets a new id, a name prefixed with one or two variant words,
+    shuffled ingredient/characteristic order and jittered price and star,
+    so dish texts (and their embeddings) differ without inventing vocabulary.
+    """
+    rng = random.Random(seed)
+    templates = list(dishes.values())
+    scaled = {}
+    for i in range(size):
+        dish = copy.deepcopy(templates[i % len(templates)])
+        dish_id = f"synthetic-{i}"
+        dish["id"] = dish_id
+        if i >= len(templates):
+            variants = rng.sample(VARIANT_WORDS, rng.randint(1, 2))
+            dish["name"] = " ".join(variants + [dish["name"]])
+            rng.shuffle(dish["main_ingredients"])
+            rng.shuffle(dish["dish_characteristics"])
+            dish["price"] = round(max(1.0, dish["price"] * rng.uniform(0.7, 1.3)), 2)
+            dish["star"] = round(min(5.0, max(1.0, dish["star"] + rng.uniform(-1, 1))), 1)
+        scaled[dish_id] = dish
+    return scaled
@@ -0,0 +1,134 @@
+"""Memory and latency of the ``DishStore`` against plain per-dish dicts.
+
+    python -m bench.dish_store --size 100000 --output dish_store.json
+
+Loads a synthetic catalogue (see bench/corpus.py) from JSON text, as the
+service loads data/dishes.json, and compares two ways of holding it:
+
+* ``dicts``: the ``json.load`` dicts, with every per-dish derivative the
+  request path needs (lower-cased field texts, embedding texts, filter
+  columns, response JSON) computed from them separately, as before the
+  store existed;
+* ``store``: the same dicts with their repeated strings interned plus one
+  ``DishStore``.
+
+Memory is the ``tracemalloc`` growth for building each.  Latency covers
+the full build, a rebuild after one dish changed and serializing the top
+10 results of a request (``dish_json`` per dish against the store's
+pre-serialized rows).
+"""
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+
+def traced(build):
+    """(result, bytes allocated by ``build`` and still alive)"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def timed(run, repeat):
+    """Median seconds of ``repeat`` calls"""
+    seconds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        seconds.append(time.perf_counter() - started)
+    return float(np.median(seconds))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=2000, help="simulated top-10 responses to serialize")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here as well as stdout")
+    args = parser.parse_args(argv)
+
+    import config
+    from bench.corpus import scale_catalogue
+    from dish_filters import DishColumns
+    from dish_index import dish_text
+    from dish_store import DishStore, intern_dishes
+    from keyword_index import SEARCH_FIELDS, field_text
+    from responses import dish_json
+
+    with open(config.DISHES_PATH, "r", encoding="utf-8") as f:
+        text = json.dumps(scale_catalogue(json.load(f), args.size, seed=args.seed))
+
+    def build_dicts(dishes):
+        dish_list = list(dishes.values())
+        return {
+            "texts": {field: [field_text(dish, field) for dish in dish_list] for field in SEARCH_FIELDS},
+            "embedding_texts": [dish_text(dish) for dish in dish_list],
+            "columns": DishColumns(dish_list),
+            "json": [dish_json(dish) for dish in dish_list],
+        }
+
+    dicts, dicts_bytes = traced(lambda: json.loads(text))
+    derived, derived_bytes = traced(lambda: build_dicts(dicts))
+    interned, interned_bytes = traced(lambda: intern_dishes(json.loads(text)))
+    store, store_bytes = traced(lambda: DishStore(interned))
+
+    edited = dict(interned)
+    first_id = next(iter(edited))
+    edited[first_id] = dict(edited[first_id], description="Now with extra lemongrass")
+
+    rng = random.Random(args.seed)
+    pages = [[rng.randrange(args.size) for _ in range(10)] for _ in range(args.requests)]
+    dish_list = list(dicts.values())
+
+    def serialize_dicts():
+        for rows in pages:
+            ", ".join(dish_json(dish_list[row]) for row in rows)
+
+    def serialize_store():
+        for rows in pages:
+            ", ".join(store.json[row] for row in rows)
+
+    mb = 1024.0 * 1024.0
+    report = {
+        "config": vars(args),
+        "memory_mb": {
+            "dicts": {"catalogue": dicts_bytes / mb, "derived": derived_bytes / mb,
+                      "total": (dicts_bytes + derived_bytes) / mb},
+            "store": {"catalogue": interned_bytes / mb, "derived": store_bytes / mb,
+                      "total": (interned_bytes + store_bytes) / mb},
+        },
+        "latency_ms": {
+            "build": {"dicts": timed(lambda: build_dicts(dicts), args.repeat) * 1000.0,
+                      "store": timed(lambda: DishStore(interned), args.repeat) * 1000.0},
+            "rebuild_one_changed": {"dicts": timed(lambda: build_dicts(edited), args.repeat) * 1000.0,
+                                    "store": timed(lambda: DishStore(edited, store), args.repeat) * 1000.0},
+            "serialize_top10_per_request": {
+                "dicts": timed(serialize_dicts, args.repeat) * 1000.0 / args.requests,
+                "store": timed(serialize_store, args.repeat) * 1000.0 / args.requests,
+            },
+        },
+    }
+    del derived
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,371 @@
+"""Load test of /search and /smart-search against a local stand-in server.
+
+    python -m bench.loadtest --concurrency 1 4 16 64 --duration 10 --output load.json
+    python -m bench.loadtest --rate 50 100 200 400 --duration 10       # open loop
+    python -m bench.loadtest --server subprocess --asgi --concurrency 8 32 128
+    python -m bench.loadtest --target http://localhost:5000 --concurrency 8
+
+By default the Flask app is served in this process (threaded werkzeug
+server) with the ``stub`` models, a temporary index directory and a
+read-only catalogue; ``--server subprocess`` runs it in a child process
+instead (``--asgi`` serves asgi.py through uvicorn there) and ``--target``
+drives a server that is already running.  ``--no-cache`` disables the
+query caches so every request walks the whole pipeline.
+
+The workload replays the queries quoted in requests.jsonl followed by a
+synthetic mood/craving mix (``--workload synthetic`` uses only the latter),
+spread over the endpoints by ``--mix``.
+
+Each level of ``--concurrency`` (closed loop: that many clients send their
+next request as soon as the previous one answers) or ``--rate`` (open loop:
+requests/s arriving on schedule whatever the server does, latency counted
+from the scheduled time so queueing shows) runs for ``--duration`` seconds.
+The report gives throughput, latency percentiles, status counts and error
+rate per level, and the saturation point: the first level whose throughput
+gained less than ``--min-gain`` over the previous one (closed loop) or fell
+short of the offered rate, or whose error rate or p99 broke ``--max-error-rate``
+or ``--slo-ms``.
+"""
+import argparse
+import contextlib
+import http.client
+import json
+import logging
+import os
+import queue
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+from bench.run import summarize_ms
+
+ENDPOINTS = ("/search", "/smart-search")
+
+
+def stub_environment(index_dir, cache):
+    """Environment for a server with stub models that leaves the repo's files alone"""
+    return {
+        "INFERENCE_BACKEND": "stub",
+        "INDEX_DIR": index_dir,
+        "CATALOGUE_PERSIST": "0",
+        "CACHE_BACKEND": "memory" if cache else "none",
+        "LOG_LEVEL": "WARNING",
+    }
+
+
+def parse_mix(text):
+    """``"/search=1,/smart-search=1"`` -> [(endpoint, weight)]"""
+    mix = []
+    for part in text.split(","):
+        endpoint, _, weight = part.partition("=")
+        endpoint = "/" + endpoint.strip().lstrip("/")
+        if endpoint not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{endpoint}', use {', '.join(ENDPOINTS)}")
+        mix.append((endpoint, float(weight or 1)))
+    return mix
+
+
+class Workload:
+    """Endless (endpoint, JSON body) pairs: queries in order, endpoints drawn by weight"""
+
+    def __init__(self, queries, mix, top_k=5):
+        self.queries = queries
+        self.endpoints = [endpoint for endpoint, _ in mix]
+        self.weights = [weight for _, weight in mix]
+        self.top_k = top_k
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def draw(self, rng):
+        with self._lock:
+            query = self.queries[self._next % len(self.queries)]
+            self._next += 1
+        endpoint = rng.choices(self.endpoints, self.weights)[0]
+        return endpoint, json.dumps({"query": query, "top_k": self.top_k}).encode()
+
+
+class Client:
+    """Keep-alive HTTP/1.1 connection that reconnects after errors"""
+
+    def __init__(self, base_url, timeout):
+        url = urllib.parse.urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.timeout = timeout
+        self._connection = None
+
+    def post(self, path, body):
+        """HTTP status of the response, or 0 when the request failed"""
+        try:
+            if self._connection is None:
+                self._connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._connection.request("POST", path, body, {"Content-Type": "application/json"})
+            response = self._connection.getresponse()
+            response.read()
+            if response.getheader("Connection", "").lower() == "close":
+                self.close()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            self.close()
+            return 0
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def closed_loop(base_url, workload, concurrency, duration, timeout, seed):
+    """``concurrency`` clients each sending back to back for ``duration`` seconds"""
+    samples = []
+    deadline = time.perf_counter() + duration
+
+    def run(worker):
+        rng = random.Random(seed * 1000 + worker)
+        client = Client(base_url, timeout)
+        local = []
+        while time.perf_counter() < deadline:
+            endpoint, body = workload.draw(rng)
+            started = time.perf_counter()
+            status = client.post(endpoint, body)
+            local.append((endpoint, status, time.perf_counter() - started))
+        client.close()
+        samples.extend(local)
+
+    threads = [threading.Thread(target=run, args=(worker,), daemon=True) for worker in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - started
+
+
+def open_loop(base_url, workload, rate, duration, timeout, seed, max_inflight, poisson):
+    """Requests arriving at ``rate`` per second for ``duration`` seconds, sent
+    by up to ``max_inflight`` clients.  Latency runs from each request's
+    scheduled arrival, and arrivals still queued ``timeout`` seconds after
+    the run are recorded as failed (status 0)."""
+    rng = random.Random(seed)
+    arrivals = queue.Queue()
+    samples = []
+    started = time.perf_counter()
+    stop_at = started + duration + timeout
+
+    def send(worker):
+        worker_rng = random.Random(seed * 1000 + worker)
+        client = Client(base_url, timeout)
+        local = []
+        while True:
+            scheduled = arrivals.get()
+            if scheduled is None:
+                break
+            endpoint, body = workload.draw(worker_rng)
+            status = client.post(endpoint, body) if time.perf_counter() < stop_at else 0
+            local.append((endpoint, status, time.perf_counter() - scheduled))
+        client.close()
+        samples.extend(local)
+
+    threads = [threading.Thread(target=send, args=(worker,), daemon=True) for worker in range(max_inflight)]
+    for thread in threads:
+        thread.start()
+    scheduled = started
+    while scheduled < started + duration:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        arrivals.put(scheduled)
+        scheduled += rng.expovariate(rate) if poisson else 1.0 / rate
+    for _ in threads:
+        arrivals.put(None)
+    for thread in threads:
+        thread.join()
+    return samples, max(time.perf_counter() - started, duration)
+
+
+def summarize(samples, seconds):
+    """Throughput, latency and status counts of one level, overall and per endpoint"""
+    def describe(subset):
+        ok = [elapsed for _, status, elapsed in subset if 200 <= status < 300]
+        statuses = {}
+        for _, status, _ in subset:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return {
+            "requests": len(subset),
+            "throughput_rps": len(ok) / seconds if seconds else 0.0,
+            "error_rate": 1.0 - len(ok) / len(subset) if subset else 0.0,
+            "statuses": statuses,
+            "latency_ms": summarize_ms(ok),
+        }
+
+    summary = describe(samples)
+    summary["seconds"] = seconds
+    summary["endpoints"] = {endpoint: describe([sample for sample in samples if sample[0] == endpoint])
+                            for endpoint in sorted({sample[0] for sample in samples})}
+    return summary
+
+
+def saturation_point(levels, open_loop_mode, min_gain, max_error_rate, slo_ms):
+    """First level past which the server stopped keeping up, with the reason, or None"""
+    previous = None
+    for level in levels:
+        reasons = []
+        if level["error_rate"] > max_error_rate:
+            reasons.append(f"error rate {level['error_rate']:.1%} over {max_error_rate:.1%}")
+        if slo_ms and level["latency_ms"]["p99"] > slo_ms:
+            reasons.append(f"p99 {level['latency_ms']['p99']:.0f} ms over {slo_ms:.0f} ms")
+        if open_loop_mode:
+            if level["throughput_rps"] < 0.9 * level["level"]:
+                reasons.append(f"served {level['throughput_rps']:.1f} of {level['level']} requests/s")
+        elif previous is not None and level["throughput_rps"] < previous["throughput_rps"] * (1.0 + min_gain):
+            reasons.append(f"throughput gained less than {min_gain:.0%} over concurrency {previous['level']}")
+        if reasons:
+            return {"level": level["level"], "last_good_level": previous["level"] if previous else None,
+                    "max_throughput_rps": max(entry["throughput_rps"] for entry in levels),
+                    "reasons": reasons}
+        previous = level
+    return None
+
+
+def wait_ready(base_url, timeout):
+    """Poll /ready until it answers 200; the stub models make that quick"""
+    url = urllib.parse.urlsplit(base_url)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=5)
+        try:
+            connection.request("GET", "/ready")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        finally:
+            connection.close()
+        time.sleep(0.2)
+    raise RuntimeError(f"{base_url} did not become ready within {timeout:.0f} s")
+
+
+@contextlib.contextmanager
+def in_process_server(cache):
+    """The Flask app on a threaded werkzeug server in this process, yields its URL"""
+    with tempfile.TemporaryDirectory() as index_dir:
+        os.environ.update(stub_environment(index_dir, cache))
+        from werkzeug.serving import make_server
+        import app
+
+        # One access-log line per request would cost more than some searches
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        server = make_server("127.0.0.1", 0, app.app, threaded=True)
+        thread = threading.Thread(target=server.serve_forever, name="loadtest-server", daemon=True)
+        thread.start()
+        try:
+            yield f"http://127.0.0.1:{server.server_port}"
+        finally:
+            server.shutdown()
+            app.catalogue.stop()
+
+
+@contextlib.contextmanager
+def subprocess_server(cache, asgi, port):
+    """The app in a child process (werkzeug, or uvicorn with ``asgi``), yields its URL"""
+    with tempfile.TemporaryDirectory() as index_dir:
+        env = dict(os.environ, **stub_environment(index_dir, cache))
+        if asgi:
+            command = [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(port),
+                       "--log-level", "warning"]
+        else:
+            command = [sys.executable, "-m", "bench.loadtest", "--serve", str(port)]
+        process = subprocess.Popen(command, env=env)
+        try:
+            yield f"http://127.0.0.1:{port}"
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+
+
+def serve(port):
+    """Child process of ``--server subprocess``: the Flask app on a threaded werkzeug server"""
+    from werkzeug.serving import make_server
+    import app
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    make_server("127.0.0.1", port, app.app, threaded=True).serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    levels = parser.add_mutually_exclusive_group()
+    levels.add_argument("--concurrency", nargs="+", type=int, help="closed-loop client counts (default 1 4 16 64)")
+    levels.add_argument("--rate", nargs="+", type=float, help="open-loop arrival rates in requests/s")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per level")
+    parser.add_argument("--server", default="inprocess", choices=["inprocess", "subprocess"])
+    parser.add_argument("--asgi", action="store_true", help="serve asgi.py with uvicorn (subprocess only)")
+    parser.add_argument("--port", type=int, default=5055, help="port of the subprocess server")
+    parser.add_argument("--target", help="URL of a running server to drive instead of starting one")
+    parser.add_argument("--workload", default="requests", choices=["requests", "synthetic"])
+    parser.add_argument("--queries", type=int, default=500, help="synthetic queries in the mix")
+    parser.add_argument("--mix", default="/search=1,/smart-search=1", help="endpoint weights")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--no-cache", action="store_true", help="disable the server's query caches")
+    parser.add_argument("--max-inflight", type=int, default=256, help="open-loop client threads")
+    parser.add_argument("--poisson", action="store_true", help="exponential open-loop arrival gaps")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--min-gain", type=float, default=0.1)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--slo-ms", type=float, default=0.0, help="p99 limit for saturation (0: none)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here as well as stdout")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.serve)
+        return 0
+    if args.asgi and args.server != "subprocess":
+        parser.error("--asgi needs --server subprocess")
+
+    from bench.corpus import load_queries
+    queries = load_queries("requests.jsonl" if args.workload == "requests" else None,
+                           synthetic=args.queries, seed=args.seed)
+    workload = Workload(queries, parse_mix(args.mix), top_k=args.top_k)
+    open_loop_mode = args.rate is not None
+    steps = args.rate if open_loop_mode else (args.concurrency or [1, 4, 16, 64])
+
+    if args.target:
+        server = contextlib.nullcontext(args.target.rstrip("/"))
+    elif args.server == "subprocess":
+        server = subprocess_server(not args.no_cache, args.asgi, args.port)
+    else:
+        server = in_process_server(not args.no_cache)
+
+    report = {"config": {key: value for key, value in vars(args).items() if key != "serve"}, "levels": []}
+    with server as base_url:
+        wait_ready(base_url, timeout=120)
+        for step in steps:
+            if open_loop_mode:
+                samples, seconds = open_loop(base_url, workload, step, args.duration, args.timeout, args.seed,
+                                             args.max_inflight, args.poisson)
+            else:
+                samples, seconds = closed_loop(base_url, workload, step, args.duration, args.timeout, args.seed)
+            level = dict(level=step, **summarize(samples, seconds))
+            report["levels"].append(level)
+            print(f"{'rate' if open_loop_mode else 'concurrency'} {step}: {level['throughput_rps']:.1f} req/s, "
+                  f"p50 {level['latency_ms']['p50']:.1f} ms, p99 {level['latency_ms']['p99']:.1f} ms, "
+                  f"errors {level['error_rate']:.1%}", file=sys.stderr)
+    report["saturation"] = saturation_point(report["levels"], open_loop_mode, args.min_gain,
+                                            args.max_error_rate, args.slo_ms)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
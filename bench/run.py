@@ -0,0 +1,190 @@
+"""Offline benchmark of the search pipeline.
+
+    python -m bench.run --sizes 1000 10000 100000 --output bench_report.json
+    python -m bench.run --baseline bench_baseline.json            # compare, exit 1 on regression
+    python -m bench.run --save-baseline bench_baseline.json       # record a new baseline
+
+Runs ``IntelligentFoodRecommender.intelligent_search`` and
+``nlp_model.search_dishes`` in-process over synthetic catalogues scaled from
+data/dishes.json.  Each size runs in its own subprocess so peak RSS is
+per-size.  The default ``stub`` backend needs no network; pass
+``--backend torch`` or ``onnx`` to include the real models.  Result caching
+is disabled so every query walks the full pipeline.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Metrics compared against the baseline and the direction that counts as worse
+COMPARED_METRICS = {
+    ("intelligent_search", "latency_ms", "p50"): "higher",
+    ("intelligent_search", "latency_ms", "p95"): "higher",
+    ("intelligent_search", "latency_ms", "p99"): "higher",
+    ("intelligent_search", "throughput_qps"): "lower",
+    ("search_dishes", "latency_ms", "p50"): "higher",
+    ("search_dishes", "latency_ms", "p99"): "higher",
+    ("peak_rss_mb",): "higher",
+}
+
+
+def summarize_ms(seconds):
+    """p50/p95/p99/mean/max in milliseconds"""
+    ms = np.asarray(seconds, dtype=np.float64) * 1000.0
+    if len(ms) == 0:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0, "max": 0.0}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "mean": float(ms.mean()), "max": float(ms.max())}
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run_size(size, query_count, backend_name, warmup, seed):
+    """Benchmark one catalogue size in this process, returns a dict"""
+    os.environ["INFERENCE_BACKEND"] = backend_name
+    os.environ["CACHE_BACKEND"] = "none"
+    import config
+    import nlp_model
+    from bench.corpus import keywords_for, load_queries, scale_catalogue
+    from intelligent_nlp_model import IntelligentFoodRecommender
+
+    with open(config.DISHES_PATH, "r", encoding="utf-8") as f:
+        dishes = scale_catalogue(json.load(f), size, seed=seed)
+    queries = load_queries(synthetic=query_count, seed=seed)[:query_count]
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        recommender = IntelligentFoodRecommender(index_dir=index_dir)
+        recommender.warm_up()
+
+        started = time.perf_counter()
+        recommender.index_dishes(dishes)
+        index_seconds = time.perf_counter() - started
+
+        for query in queries[:warmup]:
+            recommender.intelligent_search(query, dishes)
+
+        latencies, stages = [], {}
+        started = time.perf_counter()
+        for query in queries:
+            query_started = time.perf_counter()
+            result = recommender.intelligent_search(query, dishes)
+            latencies.append(time.perf_counter() - query_started)
+            for stage, ms in result.timings.items():
+                stages.setdefault(stage, []).append(ms / 1000.0)
+        search_seconds = time.perf_counter() - started
+
+    keyword_lists = [keywords_for(query) for query in queries]
+    nlp_model.search_dishes(keyword_lists[0], dishes)  # builds the keyword index
+    fallback_latencies = []
+    for keywords in keyword_lists:
+        query_started = time.perf_counter()
+        nlp_model.search_dishes(keywords, dishes)
+        fallback_latencies.append(time.perf_counter() - query_started)
+
+    return {
+        "catalogue_size": size,
+        "queries": len(queries),
+        "backend": recommender.backend.name,
+        "index_build_seconds": index_seconds,
+        "intelligent_search": {
+            "latency_ms": summarize_ms(latencies),
+            "throughput_qps": len(queries) / search_seconds if search_seconds else 0.0,
+            "stages_ms": {stage: summarize_ms(values) for stage, values in sorted(stages.items())},
+        },
+        "search_dishes": {
+            "latency_ms": summarize_ms(fallback_latencies),
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _metric(result, path):
+    for key in path:
+        result = result[key]
+    return result
+
+
+def compare(report, baseline, threshold):
+    """Metrics worse than the baseline by more than ``threshold`` (a fraction)"""
+    regressions = []
+    for size, result in report["results"].items():
+        base = baseline.get("results", {}).get(size)
+        if base is None or "error" in result or "error" in base:
+            continue
+        for path, worse in COMPARED_METRICS.items():
+            try:
+                current, previous = _metric(result, path), _metric(base, path)
+            except KeyError:
+                continue
+            if not previous:
+                continue
+            change = (current - previous) / previous
+            if (worse == "higher" and change > threshold) or (worse == "lower" and -change > threshold):
+                regressions.append({
+                    "catalogue_size": int(size),
+                    "metric": ".".join(path),
+                    "baseline": previous,
+                    "current": current,
+                    "change": change,
+                })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--backend", default="stub", choices=["stub", "torch", "onnx"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here as well as stdout")
+    parser.add_argument("--baseline", help="compare against this stored report")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before flagging, as a fraction")
+    parser.add_argument("--save-baseline", help="store this run as the new baseline")
+    parser.add_argument("--worker-size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker_size:
+        print(json.dumps(run_size(args.worker_size, args.queries, args.backend, args.warmup, args.seed)))
+        return 0
+
+    report = {
+        "config": {"backend": args.backend, "queries": args.queries, "warmup": args.warmup, "seed": args.seed},
+        "results": {},
+    }
+    for size in args.sizes:
+        completed = subprocess.run(
+            [sys.executable, "-m", "bench.run", "--worker-size", str(size), "--queries", str(args.queries),
+             "--warmup", str(args.warmup), "--backend", args.backend, "--seed", str(args.seed)],
+            capture_output=True, text=True)
+        if completed.returncode != 0:
+            report["results"][str(size)] = {"error": completed.stderr.strip().splitlines()[-1:]}
+        else:
+            report["results"][str(size)] = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        report["comparison"] = {"baseline": args.baseline, "threshold": args.threshold, "regressions": regressions}
+        exit_code = 1 if regressions else 0
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(output + "\n")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
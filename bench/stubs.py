@@ -0,0 +1,52 @@
+"""Deterministic stand-ins for the sentiment and embedding models.
+
+They need no downloads and cost microseconds, so benchmarks and load tests
+measure the search pipeline around the models rather than the models.
+The embedding is a hashed bag of words, so texts that share words still
+score as similar and the ranking stays meaningful.
+"""
+import re
+import zlib
+
+import numpy as np
+
+_WORD = re.compile(r"\w+")
+
+NEGATIVE_WORDS = frozenset({
+    "stressed", "overwhelmed", "pressure", "tense", "anxious", "tired", "sleepy", "sad", "down",
+    "depressed", "jumpy", "restless", "bad", "awful", "hate", "exhausted", "lonely", "angry",
+})
+
+
+class StubBackend:
+    """Inference backend with hashed bag-of-words embeddings and lexicon sentiment"""
+
+    name = "stub"
+    model_names = ()
+
+    def __init__(self, dim=256):
+        self.dim = dim
+
+    def _word_hashes(self, text):
+        hashes = np.fromiter((zlib.crc32(word.encode("utf-8")) for word in _WORD.findall(text.lower())),
+                             dtype=np.uint32)
+        return hashes % self.dim, np.where(hashes & 0x80000000, -1.0, 1.0)
+
+    def embed(self, texts, batch_size=32):
+        """L2-normalized embeddings, one row per text"""
+        texts = list(texts)
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            buckets, signs = self._word_hashes(text)
+            np.add.at(embeddings[row], buckets, signs)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+    def sentiment(self, texts):
+        """``{"label", "score"}`` per text, negative when any negative word appears"""
+        results = []
+        for text in texts:
+            negative = sum(word in NEGATIVE_WORDS for word in _WORD.findall(text.lower()))
+            label = "NEGATIVE" if negative else "POSITIVE"
+            results.append({"label": label, "score": min(0.99, 0.75 + 0.1 * negative)})
+        return results
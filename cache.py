@@ -0,0 +1,231 @@
+import fnmatch
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    """Canonical form of a query for cache keys.
+
+    Lower-casing and collapsing whitespace does not change any result: the
+    keyword logic lower-cases and splits on whitespace, and both models use
+    uncased tokenizers.
+    """
+    return _WHITESPACE.sub(" ", query).strip().lower()
+
+
+class CacheBackend:
+    """Interface shared by the query caches.
+
+    ``get`` returns ``None`` on a miss, so ``None`` itself cannot be cached.
+    """
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        raise NotImplementedError
+
+
+class _Counters:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class NullCache(CacheBackend):
+    """Stores nothing; every lookup is a miss.  Used to switch caching off."""
+
+    def __init__(self):
+        self._counters = _Counters()
+
+    def get(self, key):
+        self._counters.misses += 1
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        stats = self._counters.as_dict()
+        stats.update(backend="none")
+        return stats
+
+
+class LRUCache(CacheBackend):
+    """Bounded in-process cache with LRU eviction and a per-entry TTL"""
+
+    def __init__(self, max_entries=1024, ttl=300.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = _Counters()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= self._clock():
+                del self._entries[key]
+                self._counters.expirations += 1
+                self._counters.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = self._clock() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = self._counters.as_dict()
+            stats.update(backend="memory", size=len(self._entries), max_entries=self.max_entries, ttl=self.ttl)
+            return stats
+
+
+class SharedCache(CacheBackend):
+    """Cache kept in an external key-value store so several workers share it.
+
+    ``client`` needs the redis-py subset ``get``, ``set(key, value, ex=)``,
+    ``delete`` and ``scan_iter(match=)``.  Values are pickled; eviction is
+    left to the store (e.g. redis ``maxmemory-policy allkeys-lru``).
+    """
+
+    def __init__(self, client, prefix="nlp-cache:", ttl=300.0):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counters = _Counters()
+
+    def _key(self, key):
+        return self.prefix + (key if isinstance(key, str) else repr(key))
+
+    def get(self, key):
+        raw = self.client.get(self._key(key))
+        with self._lock:
+            if raw is None:
+                self._counters.misses += 1
+                return None
+            self._counters.hits += 1
+        return pickle.loads(raw)
+
+    def set(self, key, value):
+        ex = max(1, int(self.ttl)) if self.ttl else None
+        self.client.set(self._key(key), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ex=ex)
+
+    def delete(self, key):
+        self.client.delete(self._key(key))
+
+    def clear(self):
+        for key in list(self.client.scan_iter(match=self.prefix + "*")):
+            self.client.delete(key)
+
+    def stats(self):
+        with self._lock:
+            stats = self._counters.as_dict()
+        stats.update(backend="shared", prefix=self.prefix, ttl=self.ttl)
+        return stats
+
+
+class InMemorySharedStore:
+    """Tiny stand-in for a redis client, for tests and single-host setups"""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= self._clock():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (self._clock() + ex if ex else None, value)
+        return True
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+    def scan_iter(self, match="*"):
+        with self._lock:
+            keys = list(self._data)
+        return iter([key for key in keys if fnmatch.fnmatchcase(key, match)])
+
+
+def make_cache(backend="memory", max_entries=1024, ttl=300.0, prefix="nlp-cache:", redis_url=None):
+    """Build a cache from configuration (``memory``, ``redis`` or ``none``)"""
+    if backend == "none":
+        return NullCache()
+    if backend == "memory":
+        return LRUCache(max_entries=max_entries, ttl=ttl)
+    if backend == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis needs the 'redis' package: pip install redis")
+        return SharedCache(redis.Redis.from_url(redis_url), prefix=prefix, ttl=ttl)
+    raise ValueError(f"Unknown cache backend '{backend}'")
@@ -0,0 +1,94 @@
+import os
+
+
+def _flag(name, default="0"):
+    return os.environ.get(name, default).lower() in ("1", "true", "yes", "on")
+
+
+# Data
+DISHES_PATH = os.environ.get("DISHES_PATH", os.path.join("data", "dishes.json"))
+INDEX_DIR = os.environ.get("INDEX_DIR", os.path.join("data", "index"))
+# Emotion keywords and the foods each mood suggests
+EMOTIONS_PATH = os.environ.get("EMOTIONS_PATH", os.path.join("data", "emotions.json"))
+# The catalogue file is polled for changes every CATALOGUE_WATCH_INTERVAL_S
+# seconds (0 disables); admin upserts/deletes are written back to it when
+# CATALOGUE_PERSIST is set so other workers pick them up. It is off by
+# default because DISHES_PATH defaults to the tracked data/dishes.json; point
+# DISHES_PATH at a runtime copy before enabling it. Admin endpoints are
+# disabled unless ADMIN_TOKEN is set (sent as the X-Admin-Token header).
+CATALOGUE_WATCH_INTERVAL_S = float(os.environ.get("CATALOGUE_WATCH_INTERVAL_S", "5"))
+CATALOGUE_PERSIST = _flag("CATALOGUE_PERSIST", "0")
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+# Models, loaded lazily on first use unless NLP_WARMUP is set
+SENTIMENT_MODEL = os.environ.get("SENTIMENT_MODEL", "distilbert/distilbert-base-uncased-finetuned-sst-2-english")
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+WARMUP = _flag("NLP_WARMUP")
+TORCH_NUM_THREADS = int(os.environ.get("TORCH_NUM_THREADS", "0")) or None
+
+# Deepest ranked position a request may page to (offset + top_k)
+SEARCH_MAX_DEPTH = int(os.environ.get("SEARCH_MAX_DEPTH", "1000"))
+
+# Micro-batching of model calls for /search and /smart-search
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", "5"))
+BATCH_RESULT_TIMEOUT_S = float(os.environ.get("BATCH_RESULT_TIMEOUT_S", "30"))
+# Largest /batch-search request; each query scores a full row of the dish matrix
+BATCH_SEARCH_MAX_QUERIES = int(os.environ.get("BATCH_SEARCH_MAX_QUERIES", "128"))
+
+# Circuit breaker: after BREAKER_FAILURES consecutive model errors or responses
+# slower than BREAKER_LATENCY_SLO_MS (0 disables the latency check), /search
+# answers from the keyword fallback (other searches get 503) and the models
+# are probed every BREAKER_PROBE_INTERVAL_S seconds until they recover
+BREAKER_FAILURES = int(os.environ.get("BREAKER_FAILURES", "5"))
+BREAKER_LATENCY_SLO_MS = float(os.environ.get("BREAKER_LATENCY_SLO_MS", "2000"))
+BREAKER_PROBE_INTERVAL_S = float(os.environ.get("BREAKER_PROBE_INTERVAL_S", "10"))
+
+# ASGI serving (asgi.py): /search and /smart-search run on ASGI_WORKERS
+# threads; at most ASGI_QUEUE_SIZE more requests wait for one, beyond that
+# requests get 503 with Retry-After: ASGI_RETRY_AFTER_S. Model inference
+# runs on the single micro-batcher thread, not on these workers, so it keeps
+# TORCH_NUM_THREADS (all cores by default).
+ASGI_WORKERS = int(os.environ.get("ASGI_WORKERS", "4"))
+ASGI_QUEUE_SIZE = int(os.environ.get("ASGI_QUEUE_SIZE", "64"))
+ASGI_RETRY_AFTER_S = int(os.environ.get("ASGI_RETRY_AFTER_S", "1"))
+
+# Query caches: ranked results (keyed on query + catalogue version) and
+# per-query model features (embedding + sentiment). CACHE_BACKEND=redis
+# shares them between workers through REDIS_URL; CACHE_BACKEND=none disables them.
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", "1024"))
+RESULT_CACHE_TTL_S = float(os.environ.get("RESULT_CACHE_TTL_S", "300"))
+FEATURE_CACHE_MAX_ENTRIES = int(os.environ.get("FEATURE_CACHE_MAX_ENTRIES", "4096"))
+FEATURE_CACHE_TTL_S = float(os.environ.get("FEATURE_CACHE_TTL_S", "3600"))
+
+# Inference backend: "torch" (eager PyTorch), "onnx" (ONNX Runtime, exported
+# on first use into ONNX_DIR, falling back to torch if that fails) or "stub"
+# (deterministic stand-ins from bench/stubs.py, for benchmarks and load tests).
+# After an ONNX failure torch serves calls for INFERENCE_RETRY_S seconds, then
+# ONNX is tried again.  Quantized ONNX and torch vectors each keep their own
+# dish index in INDEX_DIR, and the catalogue is switched to the one in use
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "torch")
+ONNX_DIR = os.environ.get("ONNX_DIR", os.path.join("data", "onnx"))
+ONNX_QUANTIZE = _flag("ONNX_QUANTIZE")
+INFERENCE_RETRY_S = float(os.environ.get("INFERENCE_RETRY_S", "60"))
+
+# Retrieval: "exact" scores every dish, "ann" first fetches ANN_CANDIDATES
+# nearest dishes from an approximate index (ANN_KIND "ivf", pure NumPy, or
+# "hnsw" with hnswlib installed) and re-ranks only those plus any keyword
+# matches; "auto" switches to ann once the catalogue has ANN_MIN_DISHES dishes.
+# ANN_NPROBE (ivf) / ANN_EF_SEARCH (hnsw) trade latency for recall.
+RETRIEVAL_MODE = os.environ.get("RETRIEVAL_MODE", "auto")
+ANN_KIND = os.environ.get("ANN_KIND", "ivf")
+ANN_MIN_DISHES = int(os.environ.get("ANN_MIN_DISHES", "20000"))
+ANN_CANDIDATES = int(os.environ.get("ANN_CANDIDATES", "1000"))
+ANN_NPROBE = int(os.environ.get("ANN_NPROBE", "8"))
+ANN_LISTS = int(os.environ.get("ANN_LISTS", "0")) or None
+ANN_EF_SEARCH = int(os.environ.get("ANN_EF_SEARCH", "64"))
+
+# Logging: LOG_LEVEL (debug/info/warning/error), LOG_FORMAT "text" or "json"
+# (one object per line). Per-request events are sampled at LOG_SAMPLE_RATE.
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "info")
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "0.01"))
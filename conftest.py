@@ -0,0 +1,48 @@
+import threading
+
+import pytest
+
+import config
+from batching import MicroBatcher
+from bench.stubs import StubBackend
+from dish_catalogue import CatalogueManager
+from fallback import CircuitBreaker, FallbackSearch
+from intelligent_nlp_model import IntelligentFoodRecommender
+
+# test_api.py is a manual client for a running server, not a unit test module
+collect_ignore = ["test_api.py"]
+
+
+@pytest.fixture
+def stub_app(tmp_path, monkeypatch):
+    """Wire the Flask app module to stub models and a read-only catalogue.
+
+    Returns ``wire(backend=None, breaker=None, **recommender_options)``,
+    which swaps in a fresh recommender, batcher, catalogue, keyword fallback
+    and circuit breaker (``breaker`` holds ``CircuitBreaker`` options) and
+    returns the ``app`` module.  The real globals are restored afterwards;
+    the threads the import started are stopped.
+    """
+    import app
+    app.catalogue.stop()
+    for thread in threading.enumerate():
+        if thread.name == "fallback-index":
+            thread.join()
+    batchers = []
+
+    def wire(backend=None, breaker=None, **recommender_options):
+        recommender_options.setdefault("retrieval_mode", "exact")
+        recommender = IntelligentFoodRecommender(index_dir=str(tmp_path / "index"), backend=backend or StubBackend(),
+                                                 **recommender_options)
+        catalogue = CatalogueManager(recommender, path=config.DISHES_PATH, persist=False)
+        batchers.append(MicroBatcher(recommender))
+        monkeypatch.setattr(app, "recommender", recommender)
+        monkeypatch.setattr(app, "batcher", batchers[-1])
+        monkeypatch.setattr(app, "catalogue", catalogue)
+        monkeypatch.setattr(app, "fallback_search", FallbackSearch(catalogue))
+        monkeypatch.setattr(app, "breaker", CircuitBreaker(app._probe_models, **(breaker or {})))
+        return app
+
+    yield wire
+    for batcher in batchers:
+        batcher.stop()
@@ -0,0 +1,246 @@
+import json
+import logging
+import os
+import threading
+import time
+
+import config
+from dish_index import combine_digests
+from dish_store import intern_dishes
+from responses import dish_json
+
+logger = logging.getLogger(__name__)
+
+# Fields every dish needs before it can be embedded and indexed
+REQUIRED_FIELDS = ("name", "description", "categoryName", "main_ingredients")
+
+
+def validate_dish(dish_id, dish):
+    """Raise ValueError unless ``dish`` can be indexed"""
+    if not isinstance(dish, dict):
+        raise ValueError(f"Dish '{dish_id}' must be an object")
+    missing = [field for field in REQUIRED_FIELDS if field not in dish]
+    if missing:
+        raise ValueError(f"Dish '{dish_id}' is missing {', '.join(missing)}")
+    if not isinstance(dish["main_ingredients"], list):
+        raise ValueError(f"Dish '{dish_id}': main_ingredients must be a list")
+
+
+class CatalogueSnapshot:
+    """One catalogue version and everything derived from it.
+
+    Snapshots are never modified after they are built: a catalogue change
+    builds a new one (sharing whatever did not change) and swaps it in, so a
+    request that picked up a snapshot keeps a consistent view until it ends.
+    ``version`` is the content hash used to key cached results, ``store``
+    the per-row dish data (``DishStore``), ``columns`` the structured
+    attributes searches are filtered on and ``index_key`` the embedding
+    backend variant the dish vectors (and so the query vectors) come from.
+    """
+
+    def __init__(self, dishes, dish_index, keyword_index, ann_index, digests, store):
+        self.dishes = dishes
+        self.dish_index = dish_index
+        self.store = store
+        self.dish_list = store.dishes
+        self.columns = store.columns
+        self.keyword_index = keyword_index
+        self.ann_index = ann_index
+        self.digests = digests
+        self.version = combine_digests(digests.values())
+
+    def __len__(self):
+        return len(self.dish_list)
+
+    @property
+    def index_key(self):
+        return self.dish_index.model_name
+
+    def dish_json(self, row, dish=None):
+        """Response JSON of the dish at a catalogue row, serialized when the snapshot was built.
+
+        Passing the ``dish`` the row was ranked for guards against rows from
+        another catalogue, e.g. a result cached by a worker that ordered it
+        differently; those are serialized directly.
+        """
+        if dish is not None and (row >= len(self.dish_list) or
+                                 (self.dish_list[row] is not dish and self.dish_list[row] != dish)):
+            return dish_json(dish)
+        return self.store.json[row]
+
+
+class CatalogueManager:
+    """Owns the live dish catalogue and swaps in new versions without blocking searches.
+
+    Changes arrive as upserts and deletes (the admin endpoints) or by
+    re-reading the catalogue file, either on demand or from a polling
+    watcher.  Each change copies the dish mapping, re-embeds and re-indexes
+    only the dishes that changed and then replaces the current snapshot with
+    a single reference assignment.  Readers never take a lock; writers are
+    serialized.  The first snapshot is built lazily on first use so start-up
+    stays cheap, and it is re-indexed when the inference backend falls back
+    to (or recovers from) another embedding variant.
+    """
+
+    def __init__(self, recommender, path=None, dishes=None, persist=config.CATALOGUE_PERSIST):
+        self.recommender = recommender
+        self.path = path
+        self.persist = persist
+        self._dishes = dishes if dishes is not None else self._read_file()
+        self._snapshot = None
+        self._write_lock = threading.Lock()
+        self._file_stamp = self._stamp()
+        self._watcher = None
+        self._stop = threading.Event()
+        self.last_update = None
+
+    @property
+    def dishes(self):
+        """The current dish mapping; never mutated once published"""
+        return self._dishes
+
+    def snapshot(self):
+        """The current ``CatalogueSnapshot``, indexing the catalogue on first
+        use and again when the backend's embedding variant changed"""
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.index_key != self.recommender.index_key:
+            with self._write_lock:
+                if self._snapshot is None:
+                    self._snapshot = self.recommender.index_dishes(self._dishes)
+                elif self._snapshot.index_key != self.recommender.index_key:
+                    self._apply(self._dishes, "backend")
+                snapshot = self._snapshot
+        return snapshot
+
+    def current(self):
+        """The current snapshot, or None before the catalogue was first indexed"""
+        return self._snapshot
+
+    @property
+    def version(self):
+        snapshot = self._snapshot
+        return snapshot.version if snapshot is not None else None
+
+    def upsert(self, updates):
+        """Add or replace dishes given as ``{dish_id: dish}``"""
+        for dish_id, dish in updates.items():
+            validate_dish(dish_id, dish)
+        intern_dishes(updates)
+        with self._write_lock:
+            dishes = dict(self._dishes)
+            dishes.update(updates)
+            update = self._apply(dishes, "upsert")
+            self._write_file()
+        return update
+
+    def delete(self, dish_ids):
+        """Remove dishes by id; ids not in the catalogue are reported, not an error"""
+        dish_ids = set(dish_ids)
+        with self._write_lock:
+            not_found = sorted(dish_ids - set(self._dishes))
+            dishes = {dish_id: dish for dish_id, dish in self._dishes.items() if dish_id not in dish_ids}
+            update = self._apply(dishes, "delete")
+            self._write_file()
+        update["not_found"] = not_found
+        return update
+
+    def reload(self):
+        """Re-read the catalogue file, applying only the dishes that changed"""
+        loaded = self._read_file()
+        for dish_id, dish in loaded.items():
+            validate_dish(dish_id, dish)
+        with self._write_lock:
+            current = self._dishes
+            # Keep the published object for unchanged dishes so they count as unchanged
+            dishes = {dish_id: current[dish_id] if current.get(dish_id) == dish else dish
+                      for dish_id, dish in loaded.items()}
+            if list(dishes) == list(current) and all(dishes[k] is current[k] for k in dishes):
+                return None
+            return self._apply(dishes, "reload")
+
+    def _apply(self, dishes, reason):
+        """Index ``dishes`` against the current snapshot and swap it in (write lock held)"""
+        started = time.perf_counter()
+        previous = self._snapshot
+        changed = sum(1 for dish_id, dish in dishes.items() if self._dishes.get(dish_id) is not dish)
+        removed = sum(1 for dish_id in self._dishes if dish_id not in dishes)
+        embedded = None
+        if previous is not None:
+            snapshot = self.recommender.build_snapshot(dishes, previous)
+            embedded = snapshot.embedded
+            self.recommender.snapshot = snapshot
+            self._snapshot = snapshot
+        self._dishes = dishes
+        self.last_update = {
+            "reason": reason,
+            "changed": changed,
+            "removed": removed,
+            "embedded": embedded,
+            "dishes": len(dishes),
+            "version": self.version,
+            "seconds": time.perf_counter() - started,
+            "at": time.time(),
+        }
+        logger.info("Catalogue %s: %d changed, %d removed, now %d dishes", reason, changed, removed, len(dishes))
+        return dict(self.last_update)
+
+    def _stamp(self):
+        if not self.path or not os.path.exists(self.path):
+            return None
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_file(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return intern_dishes(json.load(f))
+
+    def _write_file(self):
+        """Persist the catalogue so other workers pick the change up (write lock held)"""
+        if not (self.persist and self.path):
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._dishes, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        self._file_stamp = self._stamp()
+
+    def check_file(self):
+        """Reload if the catalogue file changed since it was last read"""
+        stamp = self._stamp()
+        if stamp is None or stamp == self._file_stamp:
+            return None
+        self._file_stamp = stamp
+        return self.reload()
+
+    def watch(self, interval=config.CATALOGUE_WATCH_INTERVAL_S):
+        """Poll the catalogue file every ``interval`` seconds on a daemon thread"""
+        if self._watcher is not None or not self.path or interval <= 0:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="catalogue-watcher",
+                                         daemon=True)
+        self._watcher.start()
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.check_file()
+            except Exception:
+                logger.exception("Catalogue reload failed")
+
+    def stop(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def status(self):
+        return {
+            "version": self.version,
+            "dishes": len(self._dishes),
+            "indexed": self._snapshot is not None,
+            "path": self.path,
+            "watching": self._watcher is not None,
+            "persist": self.persist,
+            "last_update": self.last_update,
+        }
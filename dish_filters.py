@@ -0,0 +1,96 @@
+import json
+import re
+
+import numpy as np
+
+# Filters compared for equality (a list accepts any of its values)
+EQUALITY_FILTERS = ("categoryName", "cuisine_type", "isPopular", "isDeleted")
+# Range filters and the numeric column each one bounds
+RANGE_FILTERS = {
+    "min_price": ("price", np.greater_equal),
+    "max_price": ("price", np.less_equal),
+    "min_star": ("star", np.greater_equal),
+    "max_prep_minutes": ("prep_minutes", np.less_equal),
+}
+FILTER_NAMES = EQUALITY_FILTERS + tuple(RANGE_FILTERS)
+
+_MINUTES = re.compile(r"\d+(?:\.\d+)?")
+
+
+def prep_minutes(time_text):
+    """Longest preparation time in minutes from a dish ``time`` such as
+    "8 mins", "5 - 10 mins" or "20 - 25 phút"; NaN when it has no number"""
+    numbers = _MINUTES.findall(str(time_text or ""))
+    return max(float(number) for number in numbers) if numbers else float("nan")
+
+
+def _number(value):
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else float("nan")
+
+
+def validate_filters(filters):
+    """Raise ValueError unless ``filters`` is a valid ``{name: value}`` object"""
+    if not filters:
+        return
+    if not isinstance(filters, dict):
+        raise ValueError("filters must be an object of {field: value}")
+    for name, value in filters.items():
+        if name not in FILTER_NAMES:
+            raise ValueError(f"Cannot filter on '{name}', use one of {', '.join(FILTER_NAMES)}")
+        if name in RANGE_FILTERS and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise ValueError(f"Filter '{name}' must be a number")
+        if name in EQUALITY_FILTERS:
+            values = value if isinstance(value, list) else [value]
+            if not all(item is None or isinstance(item, (str, int, float, bool)) for item in values):
+                raise ValueError(f"Filter '{name}' must be a value or a list of values")
+
+
+def filters_key(filters):
+    """Canonical string of ``filters`` for result cache keys ("" without filters)"""
+    return json.dumps(filters, sort_keys=True) if filters else ""
+
+
+class DishColumns:
+    """Structured dish attributes as NumPy columns, one entry per catalogue row.
+
+    Numbers (price, star, preparation minutes) are float32 with NaN where a
+    dish lacks the value, so range filters never match it; equality fields
+    are integer codes into a per-field vocabulary.  ``mask`` combines them
+    into one boolean array before any scoring happens.  Deleted dishes are
+    left out unless the filters ask for ``isDeleted`` explicitly.
+    """
+
+    def __init__(self, dish_list):
+        self.size = len(dish_list)
+        self.numbers = {
+            "price": np.array([_number(dish.get("price")) for dish in dish_list], dtype=np.float32),
+            "star": np.array([_number(dish.get("star")) for dish in dish_list], dtype=np.float32),
+            "prep_minutes": np.array([prep_minutes(dish.get("time")) for dish in dish_list], dtype=np.float32),
+        }
+        self.codes = {}
+        self.vocabulary = {}
+        for field in EQUALITY_FILTERS:
+            vocabulary = {}
+            self.codes[field] = np.fromiter((vocabulary.setdefault(dish.get(field), len(vocabulary))
+                                             for dish in dish_list), dtype=np.int32, count=self.size)
+            self.vocabulary[field] = vocabulary
+        self.deleted = self.isin("isDeleted", [True])
+
+    def isin(self, field, values):
+        """Rows whose ``field`` equals any of ``values``"""
+        codes = [self.vocabulary[field][value] for value in values if value in self.vocabulary[field]]
+        return np.isin(self.codes[field], np.array(codes, dtype=np.int32))
+
+    def mask(self, filters=None):
+        """Boolean mask of the rows passing ``filters``, or None when every row does"""
+        validate_filters(filters)
+        filters = filters or {}
+        mask = None if "isDeleted" in filters or not self.deleted.any() else ~self.deleted
+        for name, value in filters.items():
+            if name in RANGE_FILTERS:
+                column, compare = RANGE_FILTERS[name]
+                passed = compare(self.numbers[column], value)
+            else:
+                passed = self.isin(name, value if isinstance(value, list) else [value])
+            mask = passed if mask is None else mask & passed
+        return None if mask is None or mask.all() else mask
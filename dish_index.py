@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+DEFAULT_INDEX_DIR = os.path.join('data', 'index')
+
+
+def dish_text(dish_data):
+    """Build the text used to embed a dish"""
+    return f"{dish_data['name']} {dish_data['description']} {dish_data['categoryName']} {' '.join(dish_data['main_ingredients'])}"
+
+
+def text_hash(text):
+    """Content hash used to decide whether a dish needs re-embedding"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def dish_digest(dish_id, dish_data):
+    """128-bit content hash of one catalogue entry, id included"""
+    encoded = json.dumps([dish_id, dish_data], sort_keys=True).encode('utf-8')
+    return int.from_bytes(hashlib.sha1(encoded).digest()[:16], 'big')
+
+
+def combine_digests(digests):
+    """Order-independent catalogue version from per-dish digests.
+
+    A sum modulo 2**128 can be updated one dish at a time, so the catalogue
+    manager never rehashes unchanged dishes.
+    """
+    return format(sum(digests) % (1 << 128), '032x')[:16]
+
+
+def catalogue_version(dishes):
+    """Content hash of the whole catalogue, changes whenever any dish field does"""
+    return combine_digests(dish_digest(dish_id, dish) for dish_id, dish in dishes.items())
+
+
+def normalize_rows(matrix):
+    """L2-normalize each row so cosine similarity becomes a dot product"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_indices(scores, k):
+    """Indices of the k highest scores, best first (ties keep catalogue order)"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+    if k < len(scores):
+        top = np.sort(np.argpartition(-scores, k - 1)[:k])
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+class DishEmbeddingIndex:
+    """Normalized float32 matrix of dish embeddings, one row per dish.
+
+    The matrix is persisted as ``embeddings-<fingerprint>.npy`` next to
+    ``index-<model>.json``, which names that file and records the dish ids,
+    the content hash of each dish text and the embedding model.  Each model
+    (backend variant) has its own manifest, so switching backends never
+    overwrites another variant's index.  The manifest is written last, so a
+    reader always finds the matrix it names.  On load the matrix is
+    memory-mapped; ``sync`` only re-embeds dishes whose text hash changed.
+    """
+
+    def __init__(self, index_dir=DEFAULT_INDEX_DIR, model_name=None):
+        self.index_dir = index_dir
+        self.model_name = model_name
+        self.ids = []
+        self.hashes = []
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+
+    @property
+    def matrix_path(self):
+        return os.path.join(self.index_dir, f'embeddings-{self.fingerprint()}.npy')
+
+    @property
+    def meta_path(self):
+        return self.path('index.json')
+
+    def path(self, filename):
+        """Path of a file belonging to this model's index, ``index.json`` -> ``index-<model>.json``"""
+        if not self.model_name:
+            return os.path.join(self.index_dir, filename)
+        stem, ext = os.path.splitext(filename)
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "__", self.model_name)
+        return os.path.join(self.index_dir, f"{stem}-{slug}{ext}")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def copy(self):
+        """Index sharing this one's rows; ``sync`` on the copy leaves this one untouched"""
+        copy = DishEmbeddingIndex(self.index_dir, model_name=self.model_name)
+        copy.ids = self.ids
+        copy.hashes = self.hashes
+        copy.matrix = self.matrix
+        return copy
+
+    def load(self):
+        """Load a previously saved index, returns False if none is usable"""
+        if not os.path.exists(self.meta_path):
+            return False
+        with open(self.meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        matrix_path = os.path.join(self.index_dir, meta.get("matrix", "embeddings.npy"))
+        if meta.get("model") != self.model_name or not os.path.exists(matrix_path):
+            return False
+        matrix = np.load(matrix_path, mmap_mode='r')
+        if matrix.shape[0] != len(meta["ids"]):
+            return False
+        self.ids = meta["ids"]
+        self.hashes = meta["hashes"]
+        self.matrix = matrix
+        return True
+
+    def save(self):
+        """Write the matrix under its own name, then the manifest naming it.
+
+        Matrices other than the new one and those named by a manifest are
+        removed: the one the old manifest named may still be loading in
+        another process, and other models' manifests name theirs.
+        """
+        os.makedirs(self.index_dir, exist_ok=True)
+        matrix_path = self.matrix_path
+        keep = {os.path.basename(matrix_path)}
+        for name in os.listdir(self.index_dir):
+            if name.startswith('index') and name.endswith('.json'):
+                with open(os.path.join(self.index_dir, name), 'r', encoding='utf-8') as f:
+                    keep.add(json.load(f).get("matrix"))
+        tmp_matrix = matrix_path + '.tmp.npy'
+        tmp_meta = self.meta_path + '.tmp'
+        np.save(tmp_matrix, np.ascontiguousarray(self.matrix, dtype=np.float32))
+        os.replace(tmp_matrix, matrix_path)
+        with open(tmp_meta, 'w', encoding='utf-8') as f:
+            json.dump({"model": self.model_name, "matrix": os.path.basename(matrix_path), "ids": self.ids,
+                       "hashes": self.hashes}, f)
+        os.replace(tmp_meta, self.meta_path)
+
+        for name in os.listdir(self.index_dir):
+            if name.startswith('embeddings') and name.endswith('.npy') and name not in keep:
+                os.remove(os.path.join(self.index_dir, name))
+
+    def sync(self, dishes, embed_fn, texts=None):
+        """Bring the index in line with ``dishes``, embedding only changed texts.
+
+        ``embed_fn`` takes a list of texts and returns an (n, dim) array;
+        ``texts`` may give each dish's ``dish_text`` when already computed.
+        Returns the number of dishes that were (re-)embedded.
+        """
+        ids = list(dishes.keys())
+        if texts is None:
+            texts = [dish_text(dishes[dish_id]) for dish_id in ids]
+        hashes = [text_hash(text) for text in texts]
+        if ids == self.ids and hashes == self.hashes:
+            return 0
+
+        # Reuse rows by content hash so reordered or renamed dishes are free
+        existing = {h: row for row, h in enumerate(self.hashes)}
+        source = np.array([existing.get(h, -1) for h in hashes], dtype=np.int64)
+        missing = np.flatnonzero(source < 0)
+
+        new_vectors = None
+        if len(missing):
+            new_vectors = normalize_rows(embed_fn([texts[i] for i in missing]))
+
+        dim = new_vectors.shape[1] if new_vectors is not None else self.matrix.shape[1]
+        matrix = np.empty((len(ids), dim), dtype=np.float32)
+        reused = np.flatnonzero(source >= 0)
+        if len(reused):
+            matrix[reused] = self.matrix[source[reused]]
+        if new_vectors is not None:
+            matrix[missing] = new_vectors
+
+        self.ids = ids
+        self.hashes = hashes
+        self.matrix = matrix
+        self.save()
+        return len(missing)
+
+    def fingerprint(self):
+        """Hash of the model and every row's content, identifies this exact matrix"""
+        digest = hashlib.sha1((self.model_name or "").encode('utf-8'))
+        for h in self.hashes:
+            digest.update(h.encode('ascii'))
+        return digest.hexdigest()[:16]
+
+    def similarities(self, query_vector, rows=None):
+        """Cosine similarity of a normalized query against every dish, or only ``rows``"""
+        query_vector = np.asarray(query_vector, dtype=np.float32).ravel()
+        if rows is None:
+            return self.matrix @ query_vector
+        return np.asarray(self.matrix[rows], dtype=np.float32) @ query_vector
@@ -0,0 +1,111 @@
+import sys
+
+from dish_filters import DishColumns
+from dish_index import dish_text
+from keyword_index import SEARCH_FIELDS, field_text
+from responses import dish_json
+
+# Dish fields whose values repeat across the catalogue (lists hold repeated items)
+SHARED_FIELDS = ("categoryName", "cuisine_type", "time", "main_ingredients", "dish_characteristics")
+
+
+def _interned(value):
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list):
+        return [sys.intern(item) if isinstance(item, str) else item for item in value]
+    return value
+
+
+def intern_dishes(dishes):
+    """Intern the repeated strings (categories, cuisines, ingredients, ...) of
+    freshly loaded dishes in place, so the catalogue holds one copy of each.
+    Returns ``dishes``."""
+    for dish in dishes.values():
+        if isinstance(dish, dict):
+            for field in SHARED_FIELDS:
+                if field in dish:
+                    dish[field] = _interned(dish[field])
+    return dishes
+
+
+class DishRecord:
+    """Read-only view of one store row: the dish, its id and its response JSON"""
+
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    @property
+    def id(self):
+        return self.store.ids[self.row]
+
+    @property
+    def dish(self):
+        return self.store.dishes[self.row]
+
+    @property
+    def json(self):
+        return self.store.json[self.row]
+
+    def __getitem__(self, field):
+        return self.store.dishes[self.row][field]
+
+    def get(self, field, default=None):
+        return self.store.dishes[self.row].get(field, default)
+
+    def __repr__(self):
+        return f"DishRecord({self.id!r})"
+
+
+class DishStore:
+    """Everything the request path reads about the catalogue's dishes, laid
+    out per row (catalogue order) and computed once when a snapshot is built.
+
+    * ``columns``: prices, stars, preparation minutes and filter codes as
+      NumPy arrays (``DishColumns``);
+    * ``texts``: lower-cased text of every searchable field for the keyword
+      index, one shared string per distinct value of the repeated fields;
+    * ``embedding_texts``: what each dish is embedded from;
+    * ``json``: each dish's response JSON, serialized up front.
+
+    Rows of dishes whose object is also in ``previous`` are copied from it
+    rather than recomputed.  ``store[row]`` is a ``DishRecord``.
+    """
+
+    def __init__(self, dishes, previous=None):
+        self.ids = list(dishes)
+        self.dishes = [dishes[dish_id] for dish_id in self.ids]
+        old_rows = {dish_id: row for row, dish_id in enumerate(previous.ids)} if previous is not None else {}
+        lowered = {}
+
+        self.texts = {field: [None] * len(self.ids) for field in SEARCH_FIELDS}
+        self.embedding_texts = [None] * len(self.ids)
+        self.json = [None] * len(self.ids)
+        for row, (dish_id, dish) in enumerate(zip(self.ids, self.dishes)):
+            old_row = old_rows.get(dish_id)
+            if old_row is not None and previous.dishes[old_row] is dish:
+                for field in SEARCH_FIELDS:
+                    self.texts[field][row] = previous.texts[field][old_row]
+                self.embedding_texts[row] = previous.embedding_texts[old_row]
+                self.json[row] = previous.json[old_row]
+                continue
+            for field in SEARCH_FIELDS:
+                text = field_text(dish, field)
+                if field in SHARED_FIELDS:
+                    text = lowered.setdefault(text, text)
+                self.texts[field][row] = text
+            self.embedding_texts[row] = dish_text(dish)
+            self.json[row] = dish_json(dish)
+        self.columns = DishColumns(self.dishes)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, row):
+        return DishRecord(self, row)
+
+    def records(self, rows):
+        return [DishRecord(self, row) for row in rows]
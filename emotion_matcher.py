@@ -0,0 +1,72 @@
+import json
+import re
+
+# Words left out of the keywords taken directly from a query
+QUERY_STOPWORDS = frozenset(["i", "am", "feel", "feeling", "like", "want", "need"])
+
+
+def _keyword_pattern(keyword):
+    """Regex for one keyword: any run of whitespace between words, either apostrophe"""
+    words = [re.escape(word).replace("'", "['’]") for word in keyword.lower().split()]
+    return r"\s+".join(words)
+
+
+def _normalize(text):
+    return " ".join(text.lower().replace("’", "'").split())
+
+
+class EmotionMatcher:
+    """Emotion keywords and mood-to-food expansions, compiled once.
+
+    All keywords go into a single word-boundary regex (longest first, so a
+    phrase wins over a word it starts with), so one scan of the query finds
+    every emotion together with the spans that triggered it.  Matching is
+    on whole words: "gym" does not fire inside "gymnastics".  The food
+    keywords each emotion expands to are precomputed as frozen sets.
+    """
+
+    def __init__(self, emotions, moods, negative_sentiment_moods=()):
+        self.emotional_keywords = {emotion: list(spec["keywords"]) for emotion, spec in emotions.items()}
+        self.mood_food_mapping = {mood: list(foods) for mood, foods in moods.items()}
+        self.emotions = tuple(emotions)
+
+        self._keyword_emotions = {}
+        for emotion, keywords in self.emotional_keywords.items():
+            for keyword in keywords:
+                self._keyword_emotions.setdefault(_normalize(keyword), []).append(emotion)
+        alternatives = sorted(self._keyword_emotions, key=len, reverse=True)
+        self._pattern = re.compile(r"\b(?:" + "|".join(_keyword_pattern(k) for k in alternatives) + r")\b",
+                                   re.IGNORECASE) if alternatives else None
+
+        self.expansions = {emotion: self._foods(spec.get("moods", ())) for emotion, spec in emotions.items()}
+        self.negative_expansion = self._foods(negative_sentiment_moods)
+
+    @classmethod
+    def from_file(cls, path):
+        """Load a matcher from a JSON file laid out like data/emotions.json"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data["emotions"], data["moods"], data.get("negative_sentiment_moods", ()))
+
+    def _foods(self, moods):
+        return frozenset(food for mood in moods for food in self.mood_food_mapping.get(mood, ()))
+
+    def match(self, query):
+        """``(emotions, matches)`` for a query: the emotions found, in lexicon
+        order, and one ``{"keyword", "emotions", "span"}`` per matched keyword"""
+        matches = []
+        found = set()
+        if self._pattern is not None:
+            for m in self._pattern.finditer(query):
+                keyword = _normalize(m.group())
+                emotions = self._keyword_emotions[keyword]
+                found.update(emotions)
+                matches.append({"keyword": keyword, "emotions": emotions, "span": [m.start(), m.end()]})
+        return [emotion for emotion in self.emotions if emotion in found], matches
+
+    def expand(self, emotions, negative=False):
+        """Food keywords suggested by ``emotions`` (and a negative sentiment)"""
+        foods = [self.expansions[emotion] for emotion in emotions if emotion in self.expansions]
+        if negative:
+            foods.append(self.negative_expansion)
+        return frozenset().union(*foods)
@@ -0,0 +1,148 @@
+import logging
+import re
+import threading
+import time
+
+import numpy as np
+
+import config
+from dish_index import top_k_indices
+from dish_store import DishStore
+from keyword_index import KeywordIndex
+
+logger = logging.getLogger(__name__)
+
+# Words of any script, keeping inner apostrophes ("can't")
+TOKEN_PATTERN = re.compile(r"[^\W_]+(?:['’][^\W_]+)*")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each even ever few for from further get got had
+has have having he her here hers herself him himself his how i if in into is it its itself just let me
+might more most much must my myself need no nor not now of off on once only or other our ours ourselves
+out over own please really same she should so some something such than that the their theirs them
+themselves then there these they this those through to too under until up us very want was we were what
+when where which while who whom why will with would you your yours yourself yourselves feel feeling like
+i'm i've i'd i'll it's don't can't
+""".split())
+
+
+def tokenize(text):
+    """Lower-cased words of ``text`` without stopwords; none unless it is a string"""
+    if not isinstance(text, str):
+        return []
+    return [token for token in TOKEN_PATTERN.findall(text.lower().replace("’", "'")) if token not in STOPWORDS]
+
+
+class FallbackSearch:
+    """Keyword-only dish search that never touches a model.
+
+    Dishes are ranked by how many query words match their fields, using the
+    current catalogue snapshot's inverted index when there is one and
+    otherwise an index of its own, built by ``prepare`` at start-up and
+    rebuilt whenever the catalogue changes.
+    """
+
+    def __init__(self, catalogue):
+        self.catalogue = catalogue
+        self._prepared = None
+        self._lock = threading.Lock()
+
+    def prepare(self):
+        """(keyword index, ``DishStore``) of the live catalogue"""
+        snapshot = self.catalogue.current()
+        if snapshot is not None and snapshot.dishes is self.catalogue.dishes:
+            return snapshot.keyword_index, snapshot.store
+        dishes = self.catalogue.dishes
+        prepared = self._prepared
+        if prepared is None or prepared[0] is not dishes:
+            with self._lock:
+                prepared = self._prepared
+                if prepared is None or prepared[0] is not dishes:
+                    store = DishStore(dishes, prepared[2] if prepared is not None else None)
+                    prepared = self._prepared = (dishes, KeywordIndex(dishes, texts=store.texts), store)
+        return prepared[1:]
+
+    def search(self, query_text, top_k=5, offset=0, filters=None):
+        """``DishRecord``s ranked ``offset`` to ``offset + top_k`` for a query"""
+        keyword_index, store = self.prepare()
+        scores = keyword_index.score(tokenize(query_text), {field: 1.0 for field in keyword_index.fields})
+        mask = store.columns.mask(filters)
+        rows = np.flatnonzero(scores > 0 if mask is None else (scores > 0) & mask)
+        top = rows[top_k_indices(scores[rows], offset + top_k)][offset:]
+        return store.records(top)
+
+
+class CircuitBreaker:
+    """Stops sending traffic to the models after repeated trouble.
+
+    ``failures`` consecutive errors or responses slower than ``latency_slo_ms``
+    open the circuit; while open, ``allow`` is False and a background
+    thread calls ``probe`` every ``probe_interval_s`` seconds, closing the
+    circuit again once a probe succeeds within the SLO.
+    """
+
+    def __init__(self, probe, failures=config.BREAKER_FAILURES, latency_slo_ms=config.BREAKER_LATENCY_SLO_MS,
+                 probe_interval_s=config.BREAKER_PROBE_INTERVAL_S):
+        self.probe = probe
+        self.failures = failures
+        self.latency_slo = latency_slo_ms / 1000.0 if latency_slo_ms else None
+        self.probe_interval = probe_interval_s
+        self.state = "closed"
+        self.consecutive = 0
+        self.opened = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+        self._prober = None
+
+    def allow(self):
+        return self.state == "closed"
+
+    def record_success(self, seconds):
+        if self.latency_slo is not None and seconds > self.latency_slo:
+            self.record_failure(f"latency {seconds * 1000.0:.0f} ms over the SLO")
+            return
+        with self._lock:
+            self.consecutive = 0
+
+    def record_failure(self, reason="error"):
+        with self._lock:
+            self.consecutive += 1
+            if self.state != "closed" or self.consecutive < self.failures:
+                return
+            self.state = "open"
+            self.opened += 1
+            self.opened_at = time.time()
+            self._prober = threading.Thread(target=self._probe_until_closed, name="breaker-probe", daemon=True)
+            self._prober.start()
+        logger.warning("Circuit opened after %d failures (last: %s); serving keyword fallback", self.failures, reason)
+
+    def _probe_until_closed(self):
+        while True:
+            time.sleep(self.probe_interval)
+            started = time.perf_counter()
+            try:
+                self.probe()
+            except Exception as e:
+                logger.info("Recovery probe failed: %s", e)
+                continue
+            seconds = time.perf_counter() - started
+            if self.latency_slo is not None and seconds > self.latency_slo:
+                logger.info("Recovery probe too slow: %.0f ms", seconds * 1000.0)
+                continue
+            with self._lock:
+                self.state = "closed"
+                self.consecutive = 0
+                self._prober = None
+            logger.warning("Circuit closed, models are back")
+            return
+
+    def status(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive,
+            "failures_to_open": self.failures,
+            "latency_slo_ms": self.latency_slo * 1000.0 if self.latency_slo is not None else None,
+            "times_opened": self.opened,
+            "opened_at": self.opened_at,
+        }
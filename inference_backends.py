@@ -0,0 +1,311 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import numpy as np
+import torch
+
+import config
+from metrics import FALLBACKS
+from model_registry import load_embedding_model, load_sentiment_model
+
+logger = logging.getLogger(__name__)
+
+
+def mean_pool(last_hidden_state, attention_mask):
+    """Average token embeddings, ignoring padding positions"""
+    mask = attention_mask.unsqueeze(-1).to(last_hidden_state.dtype)
+    return (last_hidden_state * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+
+
+def _length_buckets(lengths, batch_size):
+    """Row groups of similar token length, so each batch pads only to its own longest member"""
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    return [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+
+
+class TorchBackend:
+    """Runs both models eagerly through PyTorch; the reference implementation"""
+
+    name = "torch"
+    model_names = ("sentiment", "embedding")
+    # Appended to the embedding model name to key the dish embedding index
+    index_suffix = ""
+
+    def __init__(self, models):
+        self.models = models
+
+    def embed(self, texts, batch_size=32):
+        """L2-normalized embeddings, one row per text"""
+        tokenizer, model = self.models.get("embedding")
+        texts = list(texts)
+        embeddings = np.empty((len(texts), model.config.hidden_size), dtype=np.float32)
+        if not texts:
+            return embeddings
+
+        encoded = tokenizer(texts, truncation=True)
+        for rows in _length_buckets([len(ids) for ids in encoded['input_ids']], batch_size):
+            batch = tokenizer.pad(
+                {key: [encoded[key][i] for i in rows] for key in encoded.keys()},
+                return_tensors='pt')
+            with torch.inference_mode():
+                outputs = model(**batch)
+            pooled = mean_pool(outputs.last_hidden_state, batch['attention_mask'])
+            embeddings[rows] = torch.nn.functional.normalize(pooled, p=2, dim=1).numpy()
+        return embeddings
+
+    def sentiment(self, texts):
+        """``{"label", "score"}`` per text"""
+        texts = list(texts)
+        if not texts:
+            return []
+        return self.models.get("sentiment")(texts)
+
+
+class _EncoderForExport(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+
+class _ClassifierForExport(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+def export_onnx(tokenizer, model, directory, kind, quantize=False):
+    """Export an encoder (``kind="embedding"``) or classifier (``kind="sentiment"``)
+    to ``directory/model.onnx``, optionally with dynamic int8 weight quantization.
+    The tokenizer and label map are saved alongside so loading needs no torch model."""
+    os.makedirs(directory, exist_ok=True)
+    wrapper = (_EncoderForExport if kind == "embedding" else _ClassifierForExport)(model).eval()
+    output_name = "last_hidden_state" if kind == "embedding" else "logits"
+    sample = tokenizer(["export sample", "a slightly longer export sample"], padding=True, return_tensors='pt')
+    dynamic_axes = {"input_ids": {0: "batch", 1: "sequence"}, "attention_mask": {0: "batch", 1: "sequence"}}
+    dynamic_axes[output_name] = {0: "batch", 1: "sequence"} if kind == "embedding" else {0: "batch"}
+
+    fp32_path = os.path.join(directory, "model.fp32.onnx" if quantize else "model.onnx")
+    with torch.inference_mode():
+        torch.onnx.export(
+            wrapper, (sample['input_ids'], sample['attention_mask']), fp32_path,
+            input_names=["input_ids", "attention_mask"], output_names=[output_name],
+            dynamic_axes=dynamic_axes, opset_version=17, dynamo=False)
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(fp32_path, os.path.join(directory, "model.onnx"), weight_type=QuantType.QInt8)
+        os.remove(fp32_path)
+
+    tokenizer.save_pretrained(directory)
+    meta = {"kind": kind, "quantized": quantize, "hidden_size": model.config.hidden_size}
+    if kind == "sentiment":
+        meta["id2label"] = {str(i): label for i, label in model.config.id2label.items()}
+    with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def _torch_sentiment_model():
+    analyzer = load_sentiment_model()
+    return analyzer.tokenizer, analyzer.model
+
+
+class _OnnxModel:
+    """An ONNX Runtime session with the tokenizer and metadata exported with it"""
+
+    def __init__(self, directory, num_threads=None):
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(directory, "model.onnx"), options, providers=["CPUExecutionProvider"])
+        self.tokenizer = AutoTokenizer.from_pretrained(directory)
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+    def run(self, input_ids, attention_mask):
+        return self.session.run(None, {
+            "input_ids": np.asarray(input_ids, dtype=np.int64),
+            "attention_mask": np.asarray(attention_mask, dtype=np.int64),
+        })[0]
+
+
+class OnnxBackend:
+    """Runs both models through ONNX Runtime on CPU.
+
+    On first use each model is exported from its PyTorch checkpoint into
+    ``cache_dir`` (int8-quantized when ``quantize`` is set); later starts
+    load the cached artifact directly, without loading torch weights.
+    The sessions are registered in the model registry as
+    ``embedding_onnx`` / ``sentiment_onnx`` so they show up in /ready.
+    """
+
+    name = "onnx"
+    model_names = ("sentiment_onnx", "embedding_onnx")
+
+    def __init__(self, models, cache_dir=config.ONNX_DIR, quantize=config.ONNX_QUANTIZE,
+                 embedding_model=config.EMBEDDING_MODEL, sentiment_model=config.SENTIMENT_MODEL,
+                 torch_loaders=None, num_threads=config.TORCH_NUM_THREADS):
+        self.models = models
+        self.cache_dir = cache_dir
+        self.quantize = quantize
+        self.num_threads = num_threads
+        self.model_ids = {"embedding": embedding_model, "sentiment": sentiment_model}
+        self.torch_loaders = {"embedding": load_embedding_model, "sentiment": _torch_sentiment_model}
+        self.torch_loaders.update(torch_loaders or {})
+        self._export_lock = threading.Lock()
+        for kind in ("embedding", "sentiment"):
+            models.register(f"{kind}_onnx", lambda kind=kind: self._load(kind))
+
+    @property
+    def index_suffix(self):
+        # int8 weights give slightly different vectors than torch
+        return "+onnx-int8" if self.quantize else ""
+
+    def artifact_dir(self, kind):
+        name = re.sub(r"[^A-Za-z0-9_.-]+", "__", self.model_ids[kind])
+        return os.path.join(self.cache_dir, name + ("-int8" if self.quantize else ""))
+
+    def _load(self, kind):
+        directory = self.artifact_dir(kind)
+        with self._export_lock:
+            if not os.path.exists(os.path.join(directory, "meta.json")):
+                tokenizer, model = self.torch_loaders[kind]()
+                export_onnx(tokenizer, model, directory, kind, quantize=self.quantize)
+        return _OnnxModel(directory, num_threads=self.num_threads)
+
+    def embed(self, texts, batch_size=32):
+        """L2-normalized embeddings, one row per text"""
+        encoder = self.models.get("embedding_onnx")
+        texts = list(texts)
+        embeddings = np.empty((len(texts), encoder.meta["hidden_size"]), dtype=np.float32)
+        if not texts:
+            return embeddings
+
+        encoded = encoder.tokenizer(texts, truncation=True)
+        for rows in _length_buckets([len(ids) for ids in encoded['input_ids']], batch_size):
+            batch = encoder.tokenizer.pad(
+                {key: [encoded[key][i] for i in rows] for key in ("input_ids", "attention_mask")},
+                return_tensors='np')
+            hidden = encoder.run(batch['input_ids'], batch['attention_mask'])
+            mask = batch['attention_mask'][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+            embeddings[rows] = pooled / np.maximum(norms, 1e-12)
+        return embeddings
+
+    def sentiment(self, texts, batch_size=32):
+        """``{"label", "score"}`` per text, matching the transformers pipeline output"""
+        classifier = self.models.get("sentiment_onnx")
+        texts = list(texts)
+        if not texts:
+            return []
+        id2label = classifier.meta["id2label"]
+
+        encoded = classifier.tokenizer(texts, truncation=True)
+        results = [None] * len(texts)
+        for rows in _length_buckets([len(ids) for ids in encoded['input_ids']], batch_size):
+            batch = classifier.tokenizer.pad(
+                {key: [encoded[key][i] for i in rows] for key in ("input_ids", "attention_mask")},
+                return_tensors='np')
+            logits = classifier.run(batch['input_ids'], batch['attention_mask'])
+            logits = logits - logits.max(axis=1, keepdims=True)
+            probabilities = np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+            for row, scores in zip(rows, probabilities):
+                best = int(scores.argmax())
+                results[row] = {"label": id2label[str(best)], "score": float(scores[best])}
+        return results
+
+
+class FallbackBackend:
+    """Uses ``primary``; a call it fails is answered by ``fallback``, which
+    then serves every call for ``retry_after_s`` seconds before ``primary``
+    is tried again"""
+
+    def __init__(self, primary, fallback, retry_after_s=config.INFERENCE_RETRY_S):
+        self.primary = primary
+        self.fallback = fallback
+        self.retry_after = retry_after_s
+        self._primary_down_until = 0.0
+
+    @property
+    def active(self):
+        """The backend calls go to right now"""
+        return self.primary if time.monotonic() >= self._primary_down_until else self.fallback
+
+    @property
+    def name(self):
+        return self.active.name
+
+    @property
+    def model_names(self):
+        return self.active.model_names
+
+    @property
+    def index_suffix(self):
+        return self.active.index_suffix
+
+    def _primary_failed(self, error):
+        logger.warning("%s backend failed (%s); using %s for %.0f s", self.primary.name, error,
+                       self.fallback.name, self.retry_after)
+        FALLBACKS.inc(kind="inference_backend")
+        self._primary_down_until = time.monotonic() + self.retry_after
+
+    def _call(self, method, *args, **kwargs):
+        if self.active is self.primary:
+            try:
+                return getattr(self.primary, method)(*args, **kwargs)
+            except Exception as e:
+                self._primary_failed(e)
+        return getattr(self.fallback, method)(*args, **kwargs)
+
+    def embed(self, texts, batch_size=32):
+        return self._call("embed", texts, batch_size=batch_size)
+
+    def embed_variant(self, texts, index_suffix, batch_size=32):
+        """Embeddings comparable with the dish index variant ``index_suffix``.
+
+        Only a backend producing that variant answers, even during the
+        cooldown.  A primary failure still starts the cooldown but is raised
+        rather than answered with the other encoder's vectors; a primary
+        success ends it.
+        """
+        if self.primary.index_suffix != index_suffix:
+            return self.fallback.embed(texts, batch_size=batch_size)
+        if self.fallback.index_suffix == index_suffix:
+            return self._call("embed", texts, batch_size=batch_size)
+        try:
+            vectors = self.primary.embed(texts, batch_size=batch_size)
+        except Exception as e:
+            self._primary_failed(e)
+            raise
+        self._primary_down_until = 0.0
+        return vectors
+
+    def sentiment(self, texts):
+        return self._call("sentiment", texts)
+
+
+def make_backend(name, models, num_threads=config.TORCH_NUM_THREADS):
+    """Inference backend named in configuration, ``torch``, ``onnx`` or ``stub``;
+    ``num_threads`` caps the intra-op threads of ONNX sessions"""
+    if name == "stub":
+        # Deterministic stand-in models for benchmarks and load tests, no downloads
+        from bench.stubs import StubBackend
+        return StubBackend()
+    if name == "torch":
+        return TorchBackend(models)
+    if name == "onnx":
+        return FallbackBackend(OnnxBackend(models, num_threads=num_threads), TorchBackend(models))
+    raise ValueError(f"Unknown inference backend '{name}'")
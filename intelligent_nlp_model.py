@@ -1,148 +1,542 @@
-from transformers import pipeline, AutoTokenizer, AutoModel
+import logging
+import os
+import threading
+import time
 import torch
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 import json
+import config
+from ann_index import make_ann_index
+from cache import make_cache, normalize_query
+from dish_catalogue import CatalogueSnapshot
+from dish_filters import filters_key
+from dish_index import DishEmbeddingIndex, dish_digest, top_k_indices
+from dish_store import DishStore
+from emotion_matcher import QUERY_STOPWORDS, EmotionMatcher
+from keyword_index import KeywordIndex
+from log_setup import log_event
+from inference_backends import make_backend, mean_pool
+from model_registry import default_registry
+
+logger = logging.getLogger(__name__)
+
+def _elapsed_ms(started):
+    return (time.perf_counter() - started) * 1000.0
+
+class SearchResult:
+    """Outcome of ``intelligent_search``: the ranked candidates plus the
+    emotional context, keywords and per-stage timings (ms) that produced them.
+
+    Iterating, indexing or ``len()`` act on ``candidates``, so callers that
+    treat the result as the plain list of recommendations keep working.
+    ``depth`` is how many ranked positions were computed and ``offset`` the
+    rank of the first candidate, when this result is one page of them.
+    """
+
+    def __init__(self, query, emotional_context, keywords, candidates, timings, cached=False, depth=None,
+                 offset=0):
+        self.query = query
+        self.emotional_context = emotional_context
+        self.keywords = keywords
+        self.candidates = candidates
+        self.timings = timings
+        self.cached = cached
+        self.depth = len(candidates) if depth is None else depth
+        self.offset = offset
+
+    def __iter__(self):
+        return iter(self.candidates)
+
+    def __len__(self):
+        return len(self.candidates)
+
+    def __getitem__(self, index):
+        return self.candidates[index]
+
+    def page(self, offset, top_k, timings=None, cached=None):
+        """Copy holding ranks ``offset`` to ``offset + top_k`` of this result"""
+        return SearchResult(self.query, self.emotional_context, self.keywords,
+                            self.candidates[offset:offset + top_k],
+                            self.timings if timings is None else timings,
+                            cached=self.cached if cached is None else cached, depth=self.depth, offset=offset)
 
 class IntelligentFoodRecommender:
-    def __init__(self):
-        # Load pre-trained models
-        self.sentiment_analyzer = pipeline("sentiment-analysis")
-        self.text_generator = pipeline("text-generation", model="gpt2", max_length=50)
-        
-        # For semantic similarity
-        self.tokenizer = AutoTokenizer.from_pretrained('sentence-transformers/all-MiniLM-L6-v2')
-        self.model = AutoModel.from_pretrained('sentence-transformers/all-MiniLM-L6-v2')
-        
-        # Mood to food mapping (this is where the intelligence begins)
-        self.mood_food_mapping = {
-            "stressed": ["comfort food", "warm soup", "chocolate", "tea", "calming herbs"],
-            "energetic": ["spicy food", "citrus", "protein rich", "fresh salads", "coffee"],
-            "sad": ["comfort food", "sweet treats", "warm dishes", "chocolate", "ice cream"],
-            "happy": ["light meals", "fresh ingredients", "colorful dishes", "celebration food"],
-            "tired": ["energy boosting", "protein", "caffeine", "nuts", "fruits"],
-            "anxious": ["calming foods", "herbal tea", "light meals", "avoiding caffeine"],
-            "jumpy": ["calming foods", "magnesium rich", "avoiding stimulants", "herbal remedies"],
-            "romantic": ["wine pairing", "elegant dishes", "aphrodisiac foods", "intimate dining"],
-            "nostalgic": ["traditional dishes", "childhood favorites", "classic recipes", "comfort food"]
-        }
+    # Fields checked by keyword scoring and the weight of a match in each
+    keyword_field_weights = {
+        "name": 1.0,
+        "description": 1.0,
+        "categoryName": 1.0,
+        "main_ingredients": 1.0,
+        "dish_characteristics": 1.0,
+    }
+
+    def __init__(self, index_dir=config.INDEX_DIR, num_threads=config.TORCH_NUM_THREADS, models=None,
+                 embedding_model_name=None, result_cache=None, feature_cache=None, backend=None,
+                 retrieval_mode=None, ann_candidates=None, emotions=None):
+        # Cap intra-op threads so several workers don't oversubscribe the CPU
+        self.num_threads = num_threads
+        if num_threads:
+            torch.set_num_threads(num_threads)
+
+        # Pre-trained models are loaded lazily through the registry
+        self.models = models if models is not None else default_registry()
+        self.backend = backend if backend is not None else make_backend(config.INFERENCE_BACKEND, self.models,
+                                                                         num_threads=num_threads)
+
+        # Precomputed dish embeddings, reloaded from disk when available.
+        # Quantized encoders give slightly different vectors, so each backend's
+        # vectors get their own index (see index_key).
+        self.index_dir = index_dir
+        self._embedding_model_name = embedding_model_name
+        self._stored_index = self._load_index(self.index_key)
+
+        # Everything derived from the catalogue lives in an immutable snapshot
+        # that is replaced as a whole when the catalogue changes
+        self.snapshot = None
+        self._index_lock = threading.Lock()
+
+        # Two-stage retrieval for large catalogues: an approximate index picks
+        # candidates and only those are scored (see config.RETRIEVAL_MODE)
+        self.retrieval_mode = retrieval_mode or config.RETRIEVAL_MODE
+        self.ann_candidates = ann_candidates or config.ANN_CANDIDATES
+
+        # Ranked results keyed on (normalized query, catalogue version), and
+        # per-query model features keyed on (dish index key, normalized query)
+        self.result_cache = result_cache if result_cache is not None else make_cache(
+            config.CACHE_BACKEND, config.RESULT_CACHE_MAX_ENTRIES, config.RESULT_CACHE_TTL_S,
+            prefix="nlp-results:", redis_url=config.REDIS_URL)
+        self.feature_cache = feature_cache if feature_cache is not None else make_cache(
+            config.CACHE_BACKEND, config.FEATURE_CACHE_MAX_ENTRIES, config.FEATURE_CACHE_TTL_S,
+            prefix="nlp-features:", redis_url=config.REDIS_URL)
         
-        # Emotional keywords to detect
-        self.emotional_keywords = {
-            "stress": ["stressed", "overwhelmed", "pressure", "tense", "anxious"],
-            "energy": ["energetic", "pumped", "active", "workout", "gym", "tired", "sleepy"],
-            "mood": ["sad", "down", "depressed", "happy", "excited", "celebration"],
-            "physical": ["jumpy", "restless", "can't sit still", "fidgety", "hyperactive"],
-            "comfort": ["need comfort", "cozy", "warm", "hug", "security"]
-        }
+        # Emotion keywords and mood to food mapping (this is where the intelligence
+        # begins), loaded from data/emotions.json and compiled into one matcher
+        self.emotions = emotions if emotions is not None else EmotionMatcher.from_file(config.EMOTIONS_PATH)
+        self.mood_food_mapping = self.emotions.mood_food_mapping
+        self.emotional_keywords = self.emotions.emotional_keywords
+
+    @property
+    def index_key(self):
+        """Name the dish embedding index is stored under: the embedding model
+        plus the variant of the backend embedding right now, e.g. "+onnx-int8" """
+        if self._embedding_model_name is not None:
+            return self._embedding_model_name
+        return config.EMBEDDING_MODEL + getattr(self.backend, "index_suffix", "")
+
+    def _load_index(self, key):
+        index = DishEmbeddingIndex(self.index_dir, model_name=key)
+        index.load()
+        return index
+
+    def _index_embeddings(self, texts, index_key, batch_size=32):
+        """Embeddings comparable with the dish index stored under ``index_key``,
+        never another backend variant's vectors"""
+        embed_variant = getattr(self.backend, "embed_variant", None)
+        if embed_variant is None or self._embedding_model_name is not None:
+            return self.get_embeddings_batch(texts, batch_size=batch_size)
+        # The key is the embedding model followed by the variant's index suffix
+        return embed_variant(texts, index_key[len(config.EMBEDDING_MODEL):], batch_size=batch_size)
+
+    @property
+    def dish_index(self):
+        return self.snapshot.dish_index if self.snapshot is not None else self._stored_index
+
+    @property
+    def keyword_index(self):
+        return self.snapshot.keyword_index if self.snapshot is not None else None
+
+    @property
+    def ann_index(self):
+        return self.snapshot.ann_index if self.snapshot is not None else None
+
+    @property
+    def catalogue_version(self):
+        return self.snapshot.version if self.snapshot is not None else None
+
+    @property
+    def sentiment_analyzer(self):
+        return self.models.get("sentiment")
+
+    @property
+    def tokenizer(self):
+        return self.models.get("embedding")[0]
+
+    @property
+    def model(self):
+        return self.models.get("embedding")[1]
+
+    def warm_up(self, dishes=None):
+        """Load the models the inference backend needs now instead of on first request"""
+        self.models.warm_up(self.backend.model_names)
+        if dishes is not None:
+            self.index_dishes(dishes)
 
     def get_embeddings(self, text):
         """Get semantic embeddings for text"""
         inputs = self.tokenizer(text, return_tensors='pt', truncation=True, padding=True)
-        with torch.no_grad():
+        with torch.inference_mode():
             outputs = self.model(**inputs)
-        return outputs.last_hidden_state.mean(dim=1).numpy()
+        return mean_pool(outputs.last_hidden_state, inputs['attention_mask']).numpy()
 
-    def analyze_emotional_context(self, query):
-        """Analyze the emotional context of the query"""
-        query_lower = query.lower()
-        detected_emotions = []
-        
-        # Check for emotional keywords
-        for emotion, keywords in self.emotional_keywords.items():
-            if any(keyword in query_lower for keyword in keywords):
-                detected_emotions.append(emotion)
+    def get_embeddings_batch(self, texts, batch_size=32):
+        """Get L2-normalized embeddings for many texts, one row per text.
+
+        Texts are sorted by token length before batching so each batch is
+        padded only to its own longest member; pooling ignores padding.
+        """
+        return self.backend.embed(texts, batch_size=batch_size)
+
+    def index_dishes(self, dishes):
+        """Build or refresh the dish embedding and keyword indexes, embedding only
+        changed dishes, and make them current.  Returns the new snapshot."""
+        with self._index_lock:
+            self.snapshot = self.build_snapshot(dishes, self.snapshot)
+        return self.snapshot
+
+    def build_snapshot(self, dishes, previous=None):
+        """Index ``dishes`` into a new ``CatalogueSnapshot``, reusing whatever
+        ``previous`` computed for dishes whose object is unchanged.  Neither
+        ``previous`` nor the current snapshot is modified."""
+        started = time.perf_counter()
+        store = DishStore(dishes, previous.store if previous is not None else None)
+        base = previous.dish_index if previous is not None else self._stored_index
+        dish_index, embedded = self._sync_dish_index(dishes, base, store.embedding_texts)
+
+        old = previous.dishes if previous is not None else {}
+        changed = [dish_id for dish_id, dish in dishes.items() if old.get(dish_id) is not dish]
+        if previous is None or len(changed) > len(dishes) // 2:
+            keyword_index = KeywordIndex(dishes, texts=store.texts)
+        else:
+            keyword_index = previous.keyword_index.updated(dishes, changed, texts=store.texts)
+        changed = set(changed)
+        digests = {dish_id: dish_digest(dish_id, dish) if dish_id in changed else previous.digests[dish_id]
+                   for dish_id, dish in dishes.items()}
+        same_key = previous is not None and previous.index_key == dish_index.model_name
+        ann_index = self._sync_ann_index(dish_index, previous.ann_index if same_key else None)
+
+        snapshot = CatalogueSnapshot(dishes, dish_index, keyword_index, ann_index, digests, store)
+        snapshot.embedded = embedded
+        snapshot.build_seconds = time.perf_counter() - started
+        return snapshot
+
+    def _sync_dish_index(self, dishes, base, texts):
+        """(dish index, number embedded) for ``dishes`` under the current index key.
+
+        A failed embedding is retried once with the same backend, so a
+        transient failure still embeds only the changed dishes.  If the
+        retry fails too and the backend fell back to another variant, that
+        variant's own stored index is synced instead.
+        """
+        key = self.index_key
+        for attempt in range(3):
+            dish_index = base.copy() if base.model_name == key else self._load_index(key)
+            try:
+                embedded = dish_index.sync(dishes, lambda batch, key=key: self._index_embeddings(batch, key),
+                                           texts=texts)
+                return dish_index, embedded
+            except Exception as e:
+                if attempt == 2 or (attempt == 1 and self.index_key == key):
+                    raise
+                if attempt == 0:
+                    logger.warning("Embedding dishes for %s failed (%s); retrying", key, e)
+                else:
+                    logger.warning("Embedding dishes for %s failed again; indexing as %s", key, self.index_key)
+                    key = self.index_key
+
+    def _uses_ann(self, dish_index):
+        if self.retrieval_mode == "ann":
+            return True
+        if self.retrieval_mode == "auto":
+            return len(dish_index) >= config.ANN_MIN_DISHES
+        return False
+
+    def _sync_ann_index(self, dish_index, previous=None):
+        """ANN index for ``dish_index``: the previous one if the matrix is
+        unchanged, else loaded from disk, refreshed from ``previous`` or built"""
+        if not self._uses_ann(dish_index) or len(dish_index) == 0:
+            return None
+        fingerprint = dish_index.fingerprint()
+        if previous is not None and previous.fingerprint == fingerprint:
+            return previous
+        ann_index = make_ann_index(config.ANN_KIND, nprobe=config.ANN_NPROBE, n_lists=config.ANN_LISTS,
+                                   ef_search=config.ANN_EF_SEARCH)
+        path = dish_index.path(ann_index.filename)
+        # One key per dish version, so graph indexes can keep unchanged nodes
+        keys = [f"{dish_id}:{digest}" for dish_id, digest in zip(dish_index.ids, dish_index.hashes)]
+        if ann_index.load(path, fingerprint=fingerprint, dim=dish_index.matrix.shape[1]):
+            return ann_index
+        if previous is not None and previous.kind == ann_index.kind:
+            ann_index = previous.refreshed(dish_index.matrix, fingerprint=fingerprint, keys=keys)
+        else:
+            logger.info("Building %s index over %d dishes", ann_index.kind, len(dish_index))
+            ann_index.build(dish_index.matrix, fingerprint=fingerprint, keys=keys)
+        ann_index.save(path)
+        return ann_index
+
+    def _snapshot_for(self, dishes):
+        """Snapshot to search: ``dishes`` itself when it is a snapshot (so a
+        request keeps one view throughout), else the index of that mapping"""
+        if isinstance(dishes, CatalogueSnapshot):
+            return dishes
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot.dishes is dishes and snapshot.index_key == self.index_key:
+            return snapshot
+        return self.index_dishes(dishes)
+
+    def get_query_features(self, queries, timings=None, index_key=None):
+        """Sentiment and embedding for each query, running the models only on cache misses.
+
+        Embeddings are made for the dish index stored under ``index_key``
+        (the current snapshot's by default), which each feature records.
+        If ``timings`` is a dict, the milliseconds spent in each model are added to it.
+        """
+        timings = timings if timings is not None else {}
+        timings.setdefault("sentiment", 0.0)
+        timings.setdefault("embedding", 0.0)
+        if index_key is None:
+            snapshot = self.snapshot
+            index_key = snapshot.index_key if snapshot is not None else self.index_key
+        keys = [normalize_query(query) for query in queries]
+        features = {}
+        for key in dict.fromkeys(keys):
+            cached = self.feature_cache.get((index_key, key))
+            if cached is not None:
+                features[key] = cached
+        missing = [key for key in dict.fromkeys(keys) if key not in features]
+        if missing:
+            started = time.perf_counter()
+            sentiments = self.analyze_sentiment_batch(missing)
+            timings["sentiment"] += _elapsed_ms(started)
+            started = time.perf_counter()
+            embeddings = self._index_embeddings(missing, index_key)
+            timings["embedding"] += _elapsed_ms(started)
+            for key, sentiment, embedding in zip(missing, sentiments, embeddings):
+                features[key] = {"sentiment": sentiment, "query_embedding": embedding, "index_key": index_key}
+                self.feature_cache.set((index_key, key), features[key])
+        return [features[key] for key in keys]
+
+    def cached_search(self, query, dishes, top_k=5, offset=0, filters=None):
+        """Cached ``SearchResult`` page for a query, or None when the cached
+        ranking is missing or not deep enough for this page"""
+        started = time.perf_counter()
+        snapshot = self._snapshot_for(dishes)
+        cached = self.result_cache.get((normalize_query(query), snapshot.version, filters_key(filters)))
+        if cached is None or cached.depth < offset + top_k:
+            return None
+        return cached.page(offset, top_k, timings={"cache_lookup": _elapsed_ms(started)}, cached=True)
+
+    def analyze_sentiment_batch(self, texts):
+        """Run the sentiment model once over several texts"""
+        return self.backend.sentiment(texts)
+
+    def analyze_emotional_context(self, query, sentiment=None):
+        """Analyze the emotional context of the query.
+
+        ``sentiment`` may be passed in when it was already computed, e.g. by
+        the micro-batcher, to skip the model call.
+        """
+        # Emotional keywords and where they occur, in one pass over the query
+        detected_emotions, matches = self.emotions.match(query)
         
         # Use sentiment analysis
-        sentiment = self.sentiment_analyzer(query)[0]
+        if sentiment is None:
+            sentiment = self.analyze_sentiment_batch([query])[0]
         
         return {
             "emotions": detected_emotions,
+            "matches": matches,
             "sentiment": sentiment,
             "confidence": sentiment['score']
         }
 
     def generate_contextual_keywords(self, query, emotional_context):
         """Generate intelligent keywords based on context"""
-        base_keywords = []
-        
         # Extract direct food-related words
-        food_words = ["food", "dish", "meal", "eat", "hungry", "craving", "want", "need"]
-        words = query.lower().split()
-        direct_food_keywords = [word for word in words if word not in ["i", "am", "feel", "feeling", "like", "want", "need"]]
-        
-        # Add emotional context keywords
-        for emotion in emotional_context["emotions"]:
-            if emotion in ["stress", "comfort"]:
-                base_keywords.extend(self.mood_food_mapping.get("stressed", []))
-            elif emotion == "energy":
-                if "tired" in query.lower() or "sleepy" in query.lower():
-                    base_keywords.extend(self.mood_food_mapping.get("tired", []))
-                else:
-                    base_keywords.extend(self.mood_food_mapping.get("energetic", []))
-            elif emotion == "physical":
-                base_keywords.extend(self.mood_food_mapping.get("jumpy", []))
-        
-        # If sentiment is negative, add comfort food
-        if emotional_context["sentiment"]["label"] == "NEGATIVE":
-            base_keywords.extend(self.mood_food_mapping.get("sad", []))
-        
+        direct_food_keywords = [word for word in query.lower().split() if word not in QUERY_STOPWORDS]
+
+        # Add emotional context keywords, plus comfort food if sentiment is negative
+        base_keywords = self.emotions.expand(emotional_context["emotions"],
+                                             negative=emotional_context["sentiment"]["label"] == "NEGATIVE")
+
         # Combine and deduplicate
-        all_keywords = list(set(direct_food_keywords + base_keywords))
-        
-        return all_keywords
+        return list(base_keywords.union(direct_food_keywords))
 
-    def intelligent_search(self, query, dishes):
-        """Perform intelligent search with reasoning"""
-        print(f"🧠 Analyzing query: '{query}'")
-        
+    def _retrieve_candidates(self, snapshot, query_embedding, keyword_scores):
+        """Rows to re-rank in two-stage retrieval: the ANN neighbours of the
+        query plus the best keyword matches, sorted to keep catalogue order"""
+        return np.union1d(
+            snapshot.ann_index.search(snapshot.dish_index.matrix, query_embedding, self.ann_candidates),
+            top_k_indices(keyword_scores, self.ann_candidates))
+
+    def _candidate_rows(self, snapshot, query_embedding, keyword_scores, mask, depth, timings):
+        """Catalogue rows to score, or None for all of them.
+
+        Only rows passing the filter ``mask`` are scored.  With an ANN index
+        the retrieved candidates are filtered instead, falling back to every
+        eligible row when too few of them pass to fill ``depth`` ranks.
+        """
+        eligible = None if mask is None else np.flatnonzero(mask)
+        if snapshot.ann_index is None or (eligible is not None and len(eligible) <= self.ann_candidates):
+            return eligible
+        started = time.perf_counter()
+        rows = self._retrieve_candidates(snapshot, query_embedding, keyword_scores)
+        if mask is not None:
+            rows = rows[mask[rows]]
+            if len(rows) < depth:
+                rows = eligible
+        timings["retrieval"] = _elapsed_ms(started)
+        return rows
+
+    def intelligent_search(self, query, dishes, sentiment=None, query_embedding=None, use_cache=True,
+                           timings=None, top_k=5, offset=0, filters=None, index_key=None):
+        """Perform intelligent search with reasoning, returns a ``SearchResult``
+        holding ranks ``offset`` to ``offset + top_k``.
+
+        ``dishes`` is the dish mapping, or a ``CatalogueSnapshot`` from the
+        catalogue manager so the whole request sees one catalogue version.
+        Only dishes passing ``filters`` (see ``DishColumns.mask``; deleted
+        dishes are excluded by default) are scored or returned.
+
+        ``sentiment`` and ``query_embedding`` can be supplied precomputed
+        (e.g. from a batched model call), along with the ``timings`` spent
+        computing them and the ``index_key`` the embedding was made for;
+        otherwise they are computed here.  Pass
+        ``use_cache=False`` when ``cached_search`` was already consulted; the
+        whole ranking down to ``offset + top_k`` is stored in the cache
+        either way, so shallower pages are served from it too.
+        """
+        if use_cache:
+            cached = self.cached_search(query, dishes, top_k=top_k, offset=offset, filters=filters)
+            if cached is not None:
+                return cached
+        snapshot = self._snapshot_for(dishes)
+        mask = snapshot.columns.mask(filters)
+
+        timings = dict(timings or {})
+        if index_key not in (None, snapshot.index_key):
+            # Embedded for another backend variant's index, e.g. just before a fallback
+            query_embedding = None
+        if sentiment is None or query_embedding is None:
+            features = self.get_query_features([query], timings=timings, index_key=snapshot.index_key)[0]
+            sentiment = features["sentiment"] if sentiment is None else sentiment
+            query_embedding = features["query_embedding"] if query_embedding is None else query_embedding
+
+        # Steps 1-2: emotional context and contextual keywords
+        emotional_context, keywords = self._analyze(query, sentiment, timings)
+
+        # Keyword matching score: one per keyword found in any scored field
+        started = time.perf_counter()
+        keyword_scores = snapshot.keyword_index.score(keywords, self.keyword_field_weights)
+
+        # Step 3: Semantic similarity search against the precomputed index,
+        # for the dishes passing the filters (or the ANN candidates among them)
+        depth = offset + top_k
+        rows = self._candidate_rows(snapshot, query_embedding, keyword_scores, mask, depth, timings)
+        if rows is not None:
+            keyword_scores = keyword_scores[rows]
+        similarities = snapshot.dish_index.similarities(query_embedding, rows)
+        timings["scoring"] = _elapsed_ms(started)
+
+        scored_dishes = self._rank(snapshot, similarities, keyword_scores, depth, timings, rows=rows)
+        timings.setdefault("embedding", 0.0)
+
+        result = SearchResult(query, emotional_context, keywords, scored_dishes, timings, depth=depth)
+        log_event(logger, logging.INFO, "search", sampled=True, query=query,
+                  emotions=emotional_context["emotions"], sentiment=sentiment["label"], keywords=keywords,
+                  found=len(scored_dishes), timings_ms=timings)
+        self.result_cache.set((normalize_query(query), snapshot.version, filters_key(filters)), result)
+        return result.page(offset, top_k) if offset else result
+
+    def intelligent_search_batch(self, queries, dishes, top_k=5, filters=None, offset=0):
+        """Search many queries at once, returns one entry per query, in order.
+
+        Both models run once over all the queries (cached features are
+        reused) and every query is scored against the dishes passing
+        ``filters`` in a single matrix multiply, so retrieval is always exact
+        here.  Each entry is a ``SearchResult``, or the exception raised for
+        that query so one bad item does not fail the batch.  ``offset``
+        skips that many top ranks.
+        """
+        log_event(logger, logging.INFO, "batch search", sampled=True, queries=len(queries))
+        snapshot = self._snapshot_for(dishes)
+        mask = snapshot.columns.mask(filters)
+        rows = None if mask is None else np.flatnonzero(mask)
+
+        results = [None] * len(queries)
+        valid = []
+        for i, query in enumerate(queries):
+            if isinstance(query, str) and query.strip():
+                valid.append(i)
+            else:
+                results[i] = ValueError("query must be a non-empty string")
+        if not valid:
+            return results
+
+        shared_timings = {}
+        features = self.get_query_features([queries[i] for i in valid], timings=shared_timings,
+                                           index_key=snapshot.index_key)
+        started = time.perf_counter()
+        query_matrix = np.stack([np.asarray(f["query_embedding"], dtype=np.float32).ravel() for f in features])
+        dish_matrix = snapshot.dish_index.matrix if rows is None else snapshot.dish_index.matrix[rows]
+        similarity_matrix = query_matrix @ dish_matrix.T
+        shared_timings["similarity"] = _elapsed_ms(started)
+
+        for i, feature, similarities in zip(valid, features, similarity_matrix):
+            timings = dict(shared_timings)
+            try:
+                emotional_context, keywords = self._analyze(queries[i], feature["sentiment"], timings)
+                started = time.perf_counter()
+                keyword_scores = snapshot.keyword_index.score(keywords, self.keyword_field_weights)
+                if rows is not None:
+                    keyword_scores = keyword_scores[rows]
+                timings["scoring"] = _elapsed_ms(started)
+                candidates = self._rank(snapshot, similarities, keyword_scores, offset + top_k, timings, rows=rows)
+                results[i] = SearchResult(queries[i], emotional_context, keywords, candidates[offset:], timings,
+                                          depth=offset + top_k, offset=offset)
+            except Exception as e:
+                results[i] = e
+        return results
+
+    def _analyze(self, query, sentiment, timings):
+        """Emotional context and contextual keywords for a query, timed into ``timings``"""
         # Step 1: Analyze emotional context
-        emotional_context = self.analyze_emotional_context(query)
-        print(f"📊 Emotional analysis: {emotional_context}")
-        
+        started = time.perf_counter()
+        emotional_context = self.analyze_emotional_context(query, sentiment=sentiment)
+        timings["sentiment"] = timings.get("sentiment", 0.0) + _elapsed_ms(started)
+
         # Step 2: Generate contextual keywords
+        started = time.perf_counter()
         keywords = self.generate_contextual_keywords(query, emotional_context)
-        print(f"🔍 Generated keywords: {keywords}")
-        
-        # Step 3: Semantic similarity search
-        query_embedding = self.get_embeddings(query)
-        
+        timings["keywords"] = _elapsed_ms(started)
+        return emotional_context, keywords
+
+    def _rank(self, snapshot, similarities, keyword_scores, top_k, timings, rows=None):
+        """Top ``top_k`` scored dishes from per-candidate similarity and keyword scores.
+
+        ``rows`` maps candidates to catalogue rows when only some were scored.
+        Each entry records its catalogue ``row`` for ``CatalogueSnapshot.dish_json``.
+        """
+        started = time.perf_counter()
+        # Combined score
+        total_scores = (similarities * 0.6) + (keyword_scores * 0.4)
+        top = top_k_indices(total_scores, top_k)
+
         scored_dishes = []
-        for dish_id, dish_data in dishes.items():
-            # Create dish description for embedding
-            dish_text = f"{dish_data['name']} {dish_data['description']} {dish_data['categoryName']} {' '.join(dish_data['main_ingredients'])}"
-            dish_embedding = self.get_embeddings(dish_text)
-            
-            # Calculate semantic similarity
-            similarity = cosine_similarity(query_embedding, dish_embedding)[0][0]
-            
-            # Keyword matching score
-            keyword_score = 0
-            for keyword in keywords:
-                if any(keyword.lower() in field.lower() for field in [
-                    dish_data["name"], 
-                    dish_data["description"], 
-                    dish_data["categoryName"],
-                    " ".join(dish_data["main_ingredients"]),
-                    " ".join(dish_data["dish_characteristics"])
-                ]):
-                    keyword_score += 1
-            
-            # Combined score
-            total_score = (similarity * 0.6) + (keyword_score * 0.4)
-            
+        for i in top:
+            similarity = similarities[i]
+            keyword_score = float(keyword_scores[i])
+            keyword_score = int(keyword_score) if keyword_score.is_integer() else keyword_score
+            row = int(i if rows is None else rows[i])
             scored_dishes.append({
-                "dish": dish_data,
-                "score": total_score,
+                "dish": snapshot.dish_list[row],
+                "row": row,
+                "score": total_scores[i],
                 "similarity": similarity,
                 "keyword_matches": keyword_score,
                 "reasoning": f"Semantic similarity: {similarity:.3f}, Keyword matches: {keyword_score}"
             })
-        
-        # Sort by score
-        scored_dishes.sort(key=lambda x: x["score"], reverse=True)
-        
-        return scored_dishes[:5]  # Return top 5
+        timings["ranking"] = _elapsed_ms(started)
+        return scored_dishes
 
     def explain_recommendation(self, query, recommendations, emotional_context):
         """Generate explanation for recommendations"""
@@ -182,11 +576,9 @@ def test_intelligent_model():
             break
         
         try:
-            # Get emotional context
-            emotional_context = recommender.analyze_emotional_context(query)
-            
-            # Get recommendations
+            # Get recommendations along with the emotional context behind them
             recommendations = recommender.intelligent_search(query, dishes)
+            emotional_context = recommendations.emotional_context
             
             # Explain reasoning
             explanation = recommender.explain_recommendation(query, recommendations, emotional_context)
@@ -0,0 +1,270 @@
+import re
+from collections import defaultdict
+
+import numpy as np
+
+# Searchable dish fields; list-valued fields are joined with spaces
+SEARCH_FIELDS = ("name", "description", "categoryName", "cuisine_type", "main_ingredients", "dish_characteristics")
+
+_WORD = re.compile(r"\w+")
+_MAX_CACHED_MATCHES = 50000
+# (suffix, replacement), first match wins
+_SUFFIXES = (("ies", "y"), ("sses", "ss"), ("ches", "ch"), ("shes", "sh"), ("xes", "x"),
+             ("ing", ""), ("ed", ""), ("ly", ""), ("s", ""))
+
+
+def field_text(dish_data, field):
+    """Lower-cased text of one dish field"""
+    value = dish_data.get(field, "")
+    if isinstance(value, (list, tuple)):
+        value = " ".join(value)
+    return str(value).lower()
+
+
+def light_stem(token):
+    """Cheap suffix stripper so 'noodles' and 'noodle' share a key"""
+    for suffix, replacement in _SUFFIXES:
+        if suffix == "s" and token.endswith("ss"):
+            break
+        if token.endswith(suffix) and len(token) - len(suffix) + len(replacement) >= 3:
+            return token[:-len(suffix)] + replacement
+    return token
+
+
+class KeywordIndex:
+    """Inverted index over dish fields, built once per catalogue.
+
+    By default a keyword matches a dish field when it occurs in it as a
+    substring (case-insensitive), the same rule as the original scans.  A
+    keyword without whitespace is looked up against the field vocabulary
+    (whitespace-delimited tokens, so substring-of-field equals
+    substring-of-some-token); phrases are narrowed by intersecting the
+    postings of their words and then checked against the pre-lowered field.
+    The tokens containing a word are found through a character-trigram index
+    of the vocabulary, built with the index, so a lookup only checks tokens
+    sharing all its trigrams; words under three characters still scan the
+    whole vocabulary.  Matches are memoized, up to ``_MAX_CACHED_MATCHES``
+    entries per cache.
+
+    With ``stem=True`` matching is token based instead: words are reduced
+    with ``light_stem`` and phrases up to ``max_ngram`` words are looked up
+    as n-grams.
+
+    Positions returned are row numbers in ``ids`` (catalogue order).
+    ``texts`` may supply the lower-cased field texts already computed by a
+    ``DishStore``, ``{field: [text per row]}``.
+    """
+
+    def __init__(self, dishes, fields=SEARCH_FIELDS, stem=False, max_ngram=3, texts=None):
+        self.ids = list(dishes)
+        self.fields = tuple(fields)
+        self.stem = stem
+        self.max_ngram = max_ngram
+        if texts is not None:
+            self.texts = {field: texts[field] for field in self.fields}
+        else:
+            self.texts = {field: [field_text(dishes[dish_id], field) for dish_id in self.ids]
+                          for field in self.fields}
+
+        self._postings = {}
+        for field in self.fields:
+            postings = defaultdict(set)
+            for position, text in enumerate(self.texts[field]):
+                for term in self._terms(text):
+                    postings[term].add(position)
+            self._postings[field] = {term: np.array(sorted(rows), dtype=np.int64) for term, rows in postings.items()}
+        self._vocabulary = sorted(set().union(*(postings.keys() for postings in self._postings.values())))
+        self._match_cache = {}
+        self._token_cache = {}
+        self._trigrams = None if stem else self._trigram_index()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def updated(self, dishes, changed_ids, texts=None):
+        """New index for ``dishes`` that re-tokenizes only ``changed_ids`` (and
+        dishes this index has not seen); postings of the other dishes are
+        carried over, remapped to their new rows.  This index is not modified.
+        ``texts`` is as for the constructor."""
+        index = KeywordIndex.__new__(KeywordIndex)
+        index.ids = list(dishes)
+        index.fields = self.fields
+        index.stem = self.stem
+        index.max_ngram = self.max_ngram
+        index._match_cache = {}
+        index._token_cache = {}
+
+        changed_ids = set(changed_ids)
+        new_texts = texts
+        old_rows = {dish_id: row for row, dish_id in enumerate(self.ids)}
+        row_map = np.full(len(self.ids), -1, dtype=np.int64)  # old row -> new row, -1 when dropped
+        fresh = []
+        for row, dish_id in enumerate(index.ids):
+            old_row = old_rows.get(dish_id)
+            if old_row is None or dish_id in changed_ids:
+                fresh.append(row)
+            else:
+                row_map[old_row] = row
+        kept = row_map[row_map >= 0]
+        in_place = index.ids[:len(self.ids)] == self.ids  # edits and appends only
+        monotonic = bool(np.all(np.diff(kept) > 0))
+
+        index.texts = {}
+        index._postings = {}
+        for field in self.fields:
+            old_texts = self.texts[field]
+            texts = [None] * len(index.ids)
+            for old_row, row in enumerate(row_map):
+                if row >= 0:
+                    texts[row] = old_texts[old_row]
+            added = defaultdict(list)
+            for row in fresh:
+                texts[row] = (new_texts[field][row] if new_texts is not None
+                              else field_text(dishes[index.ids[row]], field))
+                for term in self._terms(texts[row]):
+                    added[term].append(row)
+            index.texts[field] = texts
+
+            if in_place:
+                # Rows kept their numbers: only terms of replaced rows need touching
+                postings = dict(self._postings[field])
+                stale = defaultdict(list)
+                for row in fresh:
+                    if row < len(self.ids):
+                        for term in self._terms(old_texts[row]):
+                            stale[term].append(row)
+                for term, rows in stale.items():
+                    remaining = np.setdiff1d(postings[term], rows, assume_unique=True)
+                    if len(remaining):
+                        postings[term] = remaining
+                    else:
+                        del postings[term]
+            else:
+                postings = {}
+                for term, rows in self._postings[field].items():
+                    mapped = row_map[rows]
+                    mapped = mapped[mapped >= 0]
+                    if len(mapped):
+                        postings[term] = mapped if monotonic else np.sort(mapped)
+            for term, rows in added.items():
+                existing = postings.get(term)
+                rows = np.array(rows, dtype=np.int64)
+                postings[term] = rows if existing is None else np.union1d(existing, rows)
+            index._postings[field] = postings
+        index._vocabulary = sorted(set().union(*(postings.keys() for postings in index._postings.values())))
+        index._trigrams = None if index.stem else index._trigram_index()
+        return index
+
+    def _terms(self, text):
+        if not self.stem:
+            return set(text.split())
+        words = [light_stem(word) for word in _WORD.findall(text)]
+        terms = set()
+        for n in range(1, self.max_ngram + 1):
+            for i in range(len(words) - n + 1):
+                terms.add(" ".join(words[i:i + n]))
+        return terms
+
+    def _trigram_index(self):
+        """Vocabulary positions of the tokens containing each character trigram"""
+        positions = defaultdict(list)
+        for position, token in enumerate(self._vocabulary):
+            for gram in {token[i:i + 3] for i in range(len(token) - 2)}:
+                positions[gram].append(position)
+        return {gram: np.array(rows, dtype=np.int64) for gram, rows in positions.items()}
+
+    def _matching_tokens(self, part):
+        tokens = self._token_cache.get(part)
+        if tokens is None:
+            if len(part) < 3:
+                candidates = self._vocabulary
+            else:
+                # Tokens holding every trigram of ``part``, rarest trigram first
+                empty = np.array([], dtype=np.int64)
+                grams = {part[i:i + 3] for i in range(len(part) - 2)}
+                grams = sorted((self._trigrams.get(gram, empty) for gram in grams), key=len)
+                positions = grams[0]
+                for rows in grams[1:]:
+                    positions = np.intersect1d(positions, rows, assume_unique=True)
+                candidates = [self._vocabulary[position] for position in positions]
+            tokens = [token for token in candidates if part in token]
+            if len(self._token_cache) >= _MAX_CACHED_MATCHES:
+                self._token_cache.clear()
+            self._token_cache[part] = tokens
+        return tokens
+
+    def _substring_positions(self, part, field):
+        """Rows whose field has a token containing ``part``"""
+        postings = self._postings[field]
+        rows = [postings[token] for token in self._matching_tokens(part) if token in postings]
+        if not rows:
+            return np.array([], dtype=np.int64)
+        return np.unique(np.concatenate(rows))
+
+    def _field_match(self, keyword, field):
+        cache_key = (keyword, field)
+        cached = self._match_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        if not keyword:
+            positions = np.arange(len(self.ids), dtype=np.int64)
+        elif self.stem:
+            positions = self._stemmed_match(keyword, field)
+        else:
+            parts = keyword.split()
+            if parts == [keyword]:
+                positions = self._substring_positions(keyword, field)
+            else:
+                candidates = self._substring_positions(parts[0], field) if parts else np.arange(len(self.ids))
+                for part in parts[1:]:
+                    candidates = np.intersect1d(candidates, self._substring_positions(part, field), assume_unique=True)
+                texts = self.texts[field]
+                positions = np.array([i for i in candidates if keyword in texts[i]], dtype=np.int64)
+
+        # Query keywords are open-ended, so keep the memo bounded
+        if len(self._match_cache) >= _MAX_CACHED_MATCHES:
+            self._match_cache.clear()
+        self._match_cache[cache_key] = positions
+        return positions
+
+    def _stemmed_match(self, keyword, field):
+        postings = self._postings[field]
+        words = [light_stem(word) for word in _WORD.findall(keyword)]
+        empty = np.array([], dtype=np.int64)
+        if not words:
+            return empty
+        if len(words) <= self.max_ngram:
+            return postings.get(" ".join(words), empty)
+        positions = postings.get(words[0], empty)
+        for word in words[1:]:
+            positions = np.intersect1d(positions, postings.get(word, empty), assume_unique=True)
+        return positions
+
+    def match(self, keyword, fields=None):
+        """Sorted rows where ``keyword`` matches any of ``fields``"""
+        keyword = keyword.lower()
+        matches = [self._field_match(keyword, field) for field in (fields or self.fields)]
+        if len(matches) == 1:
+            return matches[0]
+        return np.unique(np.concatenate(matches))
+
+    def match_any(self, keywords, fields=None):
+        """Sorted rows matching at least one keyword"""
+        matches = [self.match(keyword, fields) for keyword in keywords]
+        if not matches:
+            return np.array([], dtype=np.int64)
+        return np.unique(np.concatenate(matches))
+
+    def score(self, keywords, field_weights):
+        """Keyword score per row: each keyword adds the best weight among the
+        fields it matches, so with all weights 1.0 this counts matching keywords."""
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for keyword in keywords:
+            keyword = keyword.lower()
+            best = np.zeros(len(self.ids), dtype=np.float32)
+            for field, weight in field_weights.items():
+                rows = self._field_match(keyword, field)
+                best[rows] = np.maximum(best[rows], weight)
+            scores += best
+        return scores
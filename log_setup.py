@@ -0,0 +1,67 @@
+import json
+import logging
+import random
+import sys
+import time
+
+import config
+
+# Share of sampled events that are logged, see log_event
+_sample_rate = config.LOG_SAMPLE_RATE
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and the record's ``fields``"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Plain lines with the ``fields`` appended as key=value pairs"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        self.converter = time.localtime
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={json.dumps(value, default=str, ensure_ascii=False)}"
+                                   for key, value in fields.items())
+        return line
+
+
+def configure_logging(level=config.LOG_LEVEL, fmt=config.LOG_FORMAT, sample_rate=config.LOG_SAMPLE_RATE):
+    """Install one stderr handler on the root logger (once per process)"""
+    global _sample_rate
+    _sample_rate = sample_rate
+    root = logging.getLogger()
+    if any(getattr(handler, "_nlp_service", False) for handler in root.handlers):
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    handler._nlp_service = True
+    handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+
+
+def log_event(logger, level, message, sampled=False, exc_info=None, **fields):
+    """Log ``message`` with structured ``fields``.  ``sampled`` events (the
+    per-request ones) are kept with probability LOG_SAMPLE_RATE and dropped
+    before any record is built, so they stay cheap on the hot path."""
+    if not logger.isEnabledFor(level):
+        return
+    if sampled and random.random() >= _sample_rate:
+        return
+    logger.log(level, message, exc_info=exc_info, extra={"fields": fields})
@@ -0,0 +1,167 @@
+import bisect
+import math
+import threading
+
+# Latency buckets in seconds, from sub-millisecond stages to slow model calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(name, "") for name in self.labelnames), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _labels(self.labelnames, key), value) for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """Observations bucketed per label set, with their sum and count"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels):
+        series = self._series.get(tuple(labels.get(name, "") for name in self.labelnames))
+        return series[2] if series else 0
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _labels(self.labelnames, key, [f'le="{_number(bound)}"'])
+                    samples.append((self.name + "_bucket", labels, cumulative))
+                samples.append((self.name + "_sum", _labels(self.labelnames, key), total))
+                samples.append((self.name + "_count", _labels(self.labelnames, key), count))
+        return samples
+
+
+class CallbackMetric:
+    """Value read when scraped: ``read()`` returns a number, or a dict of
+    ``{label value (or tuple of them): number}`` when there are labels"""
+
+    def __init__(self, name, help_text, read, labelnames=(), kind="gauge"):
+        self.name = name
+        self.help = help_text
+        self.read = read
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def samples(self):
+        values = self.read()
+        if values is None:
+            return []
+        if not isinstance(values, dict):
+            return [(self.name, "", values)]
+        return [(self.name, _labels(self.labelnames, key if isinstance(key, tuple) else (key,)), value)
+                for key, value in sorted(values.items()) if value is not None]
+
+
+class Registry:
+    """Named metrics rendered together in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(self, name, help_text, read, labelnames=(), kind="gauge"):
+        return self.register(CallbackMetric(name, help_text, read, labelnames, kind))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception:
+                # A collector that cannot be read right now is left out of this scrape
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {_number(value)}" for name, labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.counter("nlp_requests_total", "HTTP requests by endpoint and status", ("endpoint", "status"))
+REQUEST_LATENCY = REGISTRY.histogram("nlp_request_duration_seconds", "HTTP request latency", ("endpoint",))
+STAGE_LATENCY = REGISTRY.histogram("nlp_stage_duration_seconds",
+                                   "Search pipeline latency per stage (sentiment, embedding, scoring, ranking, ...)",
+                                   ("stage",))
+FALLBACKS = REGISTRY.counter("nlp_fallbacks_total", "Times a fallback path was taken", ("kind",))
+
+
+def observe_request(endpoint, status, seconds):
+    REQUESTS.inc(endpoint=endpoint, status=str(status))
+    REQUEST_LATENCY.observe(seconds, endpoint=endpoint)
+
+
+def observe_timings(timings):
+    """Record a ``SearchResult.timings`` dict (milliseconds per stage)"""
+    for stage, ms in timings.items():
+        STAGE_LATENCY.observe(ms / 1000.0, stage=stage)
@@ -0,0 +1,83 @@
+import threading
+import time
+
+import config
+
+
+class ModelRegistry:
+    """Named model loaders that run on first use.
+
+    Nothing is loaded until ``get`` asks for it (or ``warm_up`` is called),
+    so models that are never referenced never cost memory or start-up time.
+    Load durations are recorded for the readiness endpoint.
+    """
+
+    def __init__(self, loaders=None):
+        self._loaders = dict(loaders or {})
+        self._models = {}
+        self._load_seconds = {}
+        self._locks = {name: threading.Lock() for name in self._loaders}
+        self._registry_lock = threading.Lock()
+
+    def register(self, name, loader):
+        with self._registry_lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+            self._models.pop(name, None)
+            self._load_seconds.pop(name, None)
+
+    def names(self):
+        return list(self._loaders)
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def get(self, name):
+        """Return the model, loading it on first use"""
+        try:
+            return self._models[name]
+        except KeyError:
+            pass
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model '{name}'")
+        with self._locks[name]:
+            if name not in self._models:
+                started = time.perf_counter()
+                self._models[name] = self._loaders[name]()
+                self._load_seconds[name] = time.perf_counter() - started
+        return self._models[name]
+
+    def warm_up(self, names=None):
+        """Eagerly load the given models (all registered ones by default)"""
+        for name in (self.names() if names is None else names):
+            self.get(name)
+
+    def status(self):
+        return {
+            name: {
+                "loaded": name in self._models,
+                "load_seconds": self._load_seconds.get(name),
+            }
+            for name in self._loaders
+        }
+
+
+def load_sentiment_model():
+    from transformers import pipeline
+    return pipeline("sentiment-analysis", model=config.SENTIMENT_MODEL)
+
+
+def load_embedding_model():
+    """Tokenizer and encoder used for semantic similarity"""
+    from transformers import AutoTokenizer, AutoModel
+    tokenizer = AutoTokenizer.from_pretrained(config.EMBEDDING_MODEL)
+    model = AutoModel.from_pretrained(config.EMBEDDING_MODEL).eval()
+    return tokenizer, model
+
+
+def default_registry():
+    """Registry holding the models configured in ``config``"""
+    return ModelRegistry({
+        "sentiment": load_sentiment_model,
+        "embedding": load_embedding_model,
+    })
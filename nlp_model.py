@@ -1,40 +1,45 @@
-import spacy
+from keyword_index import KeywordIndex
 
-# Load the spaCy model
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    spacy.cli.download("en_core_web_sm")
-    nlp = spacy.load("en_core_web_sm")
+# spaCy model, loaded on first use so importing search_dishes stays cheap
+nlp = None
+
+def get_nlp():
+    """Load the spaCy model, downloading it if needed"""
+    global nlp
+    if nlp is None:
+        import spacy
+        try:
+            nlp = spacy.load("en_core_web_sm")
+        except OSError:
+            spacy.cli.download("en_core_web_sm")
+            nlp = spacy.load("en_core_web_sm")
+    return nlp
 
 # Analyze query to extract keywords
 def analyze_query(query_text):
     """
     Process user query and extract keywords.
     """
-    doc = nlp(query_text.lower())
+    doc = get_nlp()(query_text.lower())
     return [token.text for token in doc if not token.is_stop and not token.is_punct]
 
+# Keyword index for the catalogue last searched, rebuilt when a new one is passed in
+_index = None
+_indexed_dishes = None
+
+def get_keyword_index(dishes):
+    """Return the inverted keyword index for ``dishes``, building it on first use"""
+    global _index, _indexed_dishes
+    if dishes is not _indexed_dishes:
+        _index = KeywordIndex(dishes)
+        _indexed_dishes = dishes
+    return _index
+
 # Search for dishes in dataset
 def search_dishes(keywords, dishes):
     """
     Search for matching dishes in the dataset using keywords.
+    A dish matches when any keyword occurs in any searchable field.
     """
-    matching_dishes = []
-
-    for dish_id, dish_data in dishes.items():
-        # Combine all searchable fields into one string
-        fields_to_search = [
-            dish_data["categoryName"].lower(),
-            dish_data["description"].lower(),
-            dish_data["name"].lower(),
-            dish_data["cuisine_type"].lower(),
-            " ".join(dish_data["dish_characteristics"]).lower(),
-            " ".join(dish_data["main_ingredients"]).lower()
-        ]
-
-        # Check if any keyword is found in any field
-        if any(any(keyword in field for keyword in keywords) for field in fields_to_search):
-            matching_dishes.append(dish_data)
-
-    return matching_dishes
\ No newline at end of file
+    index = get_keyword_index(dishes)
+    return [dishes[index.ids[i]] for i in index.match_any(keywords)]
@@ -0,0 +1,42 @@
+import json
+
+# Dish fields returned by the API, in response order
+DISH_FIELDS = ("categoryName", "description", "imageUrl", "isDeleted", "isPopular", "name", "price", "star",
+               "time", "cuisine_type", "dish_characteristics", "main_ingredients")
+
+
+def dish_payload(dish):
+    """The complete dish object with all original fields (null when a dish lacks one)"""
+    payload = {field: dish.get(field) for field in DISH_FIELDS}
+    payload["__collections__"] = dish.get("__collections__", {})
+    return payload
+
+
+def dish_json(dish):
+    """``dish_payload`` serialized; computed once per dish by the catalogue snapshot"""
+    return json.dumps(dish_payload(dish))
+
+
+def search_item_json(snapshot, rec):
+    """One /search result: just the dish, from the snapshot it was ranked in"""
+    return snapshot.dish_json(rec["row"], rec["dish"])
+
+
+def smart_item_json(snapshot, rec):
+    """One /smart-search result: the dish with its score and reasoning"""
+    return (f'{{"dish": {snapshot.dish_json(rec["row"], rec["dish"])}, '
+            f'"confidence_score": {json.dumps(float(rec["score"]))}, '
+            f'"reasoning": {json.dumps(rec["reasoning"])}, "similarity": {json.dumps(float(rec["similarity"]))}}}')
+
+
+def json_document(fields, items_key, items):
+    """A JSON object of ``fields`` plus ``items_key`` holding already-serialized items"""
+    head = json.dumps(fields)[:-1]
+    return f'{head}{", " if fields else ""}"{items_key}": [{", ".join(items)}]}}'
+
+
+def ndjson_lines(header, items):
+    """Newline-delimited JSON: the ``header`` object, then one line per serialized item"""
+    yield json.dumps(header) + "\n"
+    for item in items:
+        yield item + "\n"
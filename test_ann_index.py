@@ -0,0 +1,145 @@
+import json
+import os
+import pickle
+import sys
+import types
+
+import numpy as np
+
+from ann_index import HNSWIndex, IVFIndex, recall_at_k
+from bench.stubs import StubBackend
+from dish_index import normalize_rows, top_k_indices
+from intelligent_nlp_model import IntelligentFoodRecommender
+
+
+def clustered_vectors(n=2000, dim=32, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    return normalize_rows(centers[rng.integers(clusters, size=n)] + 0.3 * rng.normal(size=(n, dim)))
+
+
+def test_ivf_probing_every_list_is_exact():
+    matrix = clustered_vectors()
+    index = IVFIndex(n_lists=16).build(matrix)
+    for query in matrix[:20]:
+        assert index.search(matrix, query, 10, nprobe=16).tolist() == top_k_indices(matrix @ query, 10).tolist()
+
+
+def test_ivf_recall_grows_with_nprobe():
+    matrix = clustered_vectors()
+    queries = clustered_vectors(n=50, seed=1)
+    index = IVFIndex(n_lists=40).build(matrix)
+    low = recall_at_k(matrix, queries, index, k=10, nprobe=1)["recall"]
+    high = recall_at_k(matrix, queries, index, k=10, nprobe=8)["recall"]
+    assert high >= low
+    assert high > 0.9
+
+
+def test_ivf_save_and_load(tmp_path):
+    matrix = clustered_vectors()
+    path = str(tmp_path / "ann_ivf.npz")
+    IVFIndex(n_lists=16).build(matrix, fingerprint="v1").save(path)
+
+    loaded = IVFIndex(nprobe=4)
+    assert not loaded.load(path, fingerprint="v2")
+    assert loaded.load(path, fingerprint="v1")
+    assert len(loaded.centroids) == 16
+    assert loaded.search(matrix, matrix[0], 5)[0] == 0
+
+
+def test_two_stage_search_recalls_exact_results_from_fewer_candidates(tmp_path):
+    with open(os.path.join("data", "dishes.json"), "r", encoding="utf-8") as f:
+        dishes = json.load(f)
+    # With every dish eligible, more dishes than ann_candidates pass the filters, so the ANN stage runs
+    for dish in dishes.values():
+        dish["isDeleted"] = False
+    index_dir = str(tmp_path / "index")
+    exact = IntelligentFoodRecommender(index_dir=index_dir, backend=StubBackend(), retrieval_mode="exact")
+    ann = IntelligentFoodRecommender(index_dir=index_dir, backend=StubBackend(), retrieval_mode="ann",
+                                     ann_candidates=10)
+    ann.index_dishes(dishes)
+    assert os.path.exists(ann.dish_index.path(ann.ann_index.filename))
+
+    candidates = []
+    retrieve_candidates = ann._retrieve_candidates
+    ann._retrieve_candidates = lambda *args: candidates.append(retrieve_candidates(*args)) or candidates[-1]
+    queries = ["I'm stressed and need comfort food", "something spicy", "tired after the gym", "pizza",
+               "fresh salad", "noodle soup"]
+    hits = 0
+    for query in queries:
+        expected = {rec["dish"]["name"] for rec in exact.intelligent_search(query, dishes, use_cache=False)}
+        result = ann.intelligent_search(query, dishes, use_cache=False)
+        hits += len(expected & {rec["dish"]["name"] for rec in result})
+        assert "retrieval" in result.timings
+    assert len(candidates) == len(queries) and all(len(rows) < len(dishes) for rows in candidates)
+    assert hits / (5 * len(queries)) >= 0.9
+
+    # A second process reuses the persisted ANN index instead of rebuilding it
+    reloaded = IntelligentFoodRecommender(index_dir=index_dir, backend=StubBackend(), retrieval_mode="ann")
+    reloaded.index_dishes(dishes)
+    assert reloaded.ann_index.build_seconds is None
+
+
+class FakeHnswIndex:
+    """Brute-force stand-in for ``hnswlib.Index`` that records insertions"""
+
+    def __init__(self, space, dim):
+        self.vectors, self.deleted, self.added = {}, set(), []
+
+    def init_index(self, max_elements, **options):
+        self.max_elements = max_elements
+
+    def get_max_elements(self):
+        return self.max_elements
+
+    def add_items(self, vectors, labels, replace_deleted=False):
+        assert len(self.vectors) - len(self.deleted) + len(labels) <= self.max_elements
+        for vector, label in zip(vectors, labels):
+            self.vectors[int(label)] = vector
+            self.added.append(int(label))
+
+    def mark_deleted(self, label):
+        assert label not in self.deleted
+        self.deleted.add(label)
+
+    def set_ef(self, ef):
+        pass
+
+    def knn_query(self, query, k):
+        labels = [label for label in self.vectors if label not in self.deleted]
+        scores = np.array([self.vectors[label] @ query[0] for label in labels])
+        return np.array([[labels[i] for i in top_k_indices(scores, k)]]), None
+
+    def save_index(self, path):
+        with open(path, "wb") as f:
+            pickle.dump((self.vectors, self.deleted, self.max_elements), f)
+
+    def load_index(self, path, max_elements=0, allow_replace_deleted=False):
+        with open(path, "rb") as f:
+            self.vectors, self.deleted, self.max_elements = pickle.load(f)
+        self.max_elements = max(self.max_elements, max_elements)
+
+
+def test_hnsw_refresh_inserts_changed_dishes_into_a_copy(monkeypatch):
+    monkeypatch.setitem(sys.modules, "hnswlib", types.SimpleNamespace(Index=FakeHnswIndex))
+    matrix = clustered_vectors(n=200)
+    keys = [f"dish-{i}:v1" for i in range(200)]
+    index = HNSWIndex().build(matrix, keys=keys)
+    before = [index.search(matrix, query, 10).tolist() for query in matrix[:20]]
+
+    # Dish 3 re-embedded, dish 7 removed, dish-new appended
+    changed = np.delete(matrix, 7, axis=0)
+    changed[3] = -changed[3]
+    changed = np.vstack([changed, matrix[7:8]])
+    changed_keys = [key for i, key in enumerate(keys) if i != 7] + ["dish-new:v1"]
+    changed_keys[3] = "dish-3:v2"
+    refreshed = index.refreshed(changed, keys=changed_keys)
+
+    assert refreshed.index is not index.index
+    assert refreshed.index.added == [200, 201] and refreshed.index.deleted == {3, 7}
+    for query in changed[:20]:
+        assert refreshed.search(changed, query, 10).tolist() == top_k_indices(changed @ query, 10).tolist()
+    # The index an older snapshot holds still finds every one of its dishes
+    assert index.index.deleted == set()
+    assert [index.search(matrix, query, 10).tolist() for query in matrix[:20]] == before
+    assert index.refreshed(changed, keys=changed_keys).index.added == [200, 201]
@@ -0,0 +1,148 @@
+import asyncio
+import importlib
+import json
+import threading
+
+import pytest
+import torch
+
+import config
+from intelligent_nlp_model import IntelligentFoodRecommender
+from model_registry import ModelRegistry
+
+
+@pytest.fixture
+def asgi(stub_app):
+    stub_app()
+    import asgi
+    return asgi
+
+
+def request(server, method, path, body=None, query_string=b"", headers=()):
+    """Status, headers and body of one request sent straight to an ASGI app"""
+    return asyncio.run(_request(server, method, path, body, query_string, headers))
+
+
+async def _request(server, method, path, body, query_string, headers):
+    scope = {"type": "http", "method": method, "path": path, "query_string": query_string,
+             "headers": [(b"content-type", b"application/json"), *headers]}
+    messages = [{"type": "http.request", "body": json.dumps(body).encode() if body is not None else b""}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await server(scope, receive, send)
+    return sent[0]["status"], dict(sent[0]["headers"]), b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def body_messages(server, path, body, query_string=b"", on_body=None):
+    """Every ``http.response.body`` message of one request; ``on_body`` is
+    called as each one is sent"""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": json.dumps(body).encode()}
+
+    async def send(message):
+        sent.append(message)
+        if on_body is not None and message["type"] == "http.response.body":
+            on_body()
+
+    scope = {"type": "http", "method": "POST", "path": path, "query_string": query_string,
+             "headers": [(b"content-type", b"application/json")]}
+    asyncio.run(server(scope, receive, send))
+    return [message for message in sent if message["type"] == "http.response.body"]
+
+
+def test_search_responses_match_the_flask_routes(asgi):
+    client = asgi.wsgi.app.test_client()
+    server = asgi.SearchServer(workers=2, queue_size=2)
+    for path in ("/search", "/smart-search"):
+        body = {"query": "something spicy", "top_k": 7, "filters": {"max_price": 30}}
+        status, _, content = request(server, "POST", path, body)
+        assert status == 200
+        assert json.loads(content) == client.post(path, json=body).get_json()
+
+    status, headers, content = request(server, "POST", "/smart-search", {"query": "pizza"}, query_string=b"stream=1")
+    assert headers[b"content-type"] == b"application/x-ndjson"
+    assert len(content.splitlines()) == 6
+    assert request(server, "POST", "/search", {"top_k": 3})[0] == 400
+
+    # Everything else is served by the Flask app
+    status, _, content = request(server, "GET", "/stats")
+    assert status == 200 and "batcher" in json.loads(content)
+
+
+def test_saturated_pool_returns_503_with_retry_after(asgi, monkeypatch):
+    server = asgi.SearchServer(workers=1, queue_size=1, retry_after=3)
+    release = threading.Event()
+    search_results = asgi.wsgi.search_results
+
+    def slow_search(*args):
+        release.wait(5)
+        return search_results(*args)
+
+    monkeypatch.setattr(asgi.wsgi, "search_results", slow_search)
+
+    async def burst():
+        pending = [asyncio.ensure_future(_request(server, "POST", "/search", {"query": "pizza"}, b"", ()))
+                   for _ in range(3)]
+        while server.in_flight < 2:
+            await asyncio.sleep(0.01)
+        rejected = await _request(server, "POST", "/search", {"query": "noodles"}, b"", ())
+        release.set()
+        return rejected, await asyncio.gather(*pending)
+
+    rejected, served = asyncio.run(burst())
+    assert rejected[0] == 503 and rejected[1][b"retry-after"] == b"3"
+    assert sorted(status for status, _, _ in served) == [200, 200, 503]
+    assert server.rejected == 2 and server.in_flight == 0
+
+
+def test_ndjson_lines_are_sent_as_they_are_serialized(asgi, monkeypatch):
+    server = asgi.SearchServer(workers=1, queue_size=1)
+    first_line_sent = threading.Event()
+    serialized = []
+    search_item_json = asgi.wsgi.search_item_json
+
+    def wait_for_first_line(snapshot, rec):
+        # The 2nd item is serialized only once the header line went out
+        if serialized:
+            serialized.append(first_line_sent.wait(5))
+        serialized.append(True)
+        return search_item_json(snapshot, rec)
+
+    monkeypatch.setattr(asgi.wsgi, "search_item_json", wait_for_first_line)
+
+    messages = body_messages(server, "/search", {"query": "pizza", "top_k": 4}, query_string=b"stream=1",
+                             on_body=first_line_sent.set)
+    chunks = [message["body"] for message in messages if message["body"]]
+    assert len(chunks) == 5 and all(chunk.count(b"\n") == 1 for chunk in chunks)
+    assert messages[-1].get("more_body", False) is False
+    assert all(serialized)
+
+
+def test_thread_count_reaches_the_onnx_sessions(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "INFERENCE_BACKEND", "onnx")
+    threads = torch.get_num_threads()
+    try:
+        recommender = IntelligentFoodRecommender(index_dir=str(tmp_path), num_threads=3, models=ModelRegistry())
+        assert torch.get_num_threads() == 3
+    finally:
+        torch.set_num_threads(threads)
+    assert recommender.num_threads == 3
+    assert recommender.backend.primary.num_threads == 3
+
+
+def test_importing_asgi_keeps_the_app_as_initialized(asgi, monkeypatch):
+    # Inference runs on the micro-batcher thread, so serving does not re-initialize with fewer threads
+    recommender = asgi.wsgi.recommender
+    monkeypatch.setattr(asgi.wsgi, "serving", asgi.wsgi.serving)
+    server = importlib.reload(asgi).app
+    assert asgi.wsgi.recommender is recommender
+    assert server.stats()["torch_threads"] == torch.get_num_threads()
+    server.pool.shutdown()
@@ -0,0 +1,148 @@
+import json
+import time
+
+import pytest
+
+import config
+from bench.stubs import StubBackend
+from dish_catalogue import CatalogueManager
+from dish_index import DishEmbeddingIndex
+from inference_backends import FallbackBackend
+from intelligent_nlp_model import IntelligentFoodRecommender
+
+INT8_KEY = config.EMBEDDING_MODEL + "+onnx-int8"
+
+
+class Primary(StubBackend):
+    """Stub standing in for ONNX: its own index variant, fails while ``failures`` remain"""
+
+    name = "onnx"
+    index_suffix = "+onnx-int8"
+
+    def __init__(self, failures=0):
+        super().__init__()
+        self.failures = failures
+        self.calls = 0
+        self.embedded = []
+
+    def embed(self, texts, batch_size=32):
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("bad batch")
+        self.embedded.extend(texts)
+        return super().embed(texts, batch_size=batch_size)
+
+
+class Fallback(StubBackend):
+    name = "torch"
+    index_suffix = ""
+
+    def __init__(self):
+        super().__init__()
+        self.embedded = []
+
+    def embed(self, texts, batch_size=32):
+        self.embedded.extend(texts)
+        return super().embed(texts, batch_size=batch_size)
+
+
+def load_dishes():
+    with open(config.DISHES_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def new_dish(name):
+    return {"name": name, "description": "Very spicy noodle soup with chilli broth", "categoryName": "Noodles",
+            "main_ingredients": ["noodles", "chilli"], "dish_characteristics": ["spicy"], "price": 5}
+
+
+@pytest.fixture
+def catalogue(tmp_path):
+    backend = FallbackBackend(Primary(), Fallback(), retry_after_s=60)
+    recommender = IntelligentFoodRecommender(index_dir=str(tmp_path), backend=backend, retrieval_mode="exact")
+    catalogue = CatalogueManager(recommender, dishes=load_dishes(), persist=False)
+    assert catalogue.snapshot().index_key == INT8_KEY
+    backend.primary.embedded.clear()
+    return catalogue
+
+
+def test_a_failure_falls_back_for_the_cooldown_only():
+    primary = Primary(failures=1)
+    backend = FallbackBackend(primary, Fallback(), retry_after_s=0.05)
+    assert backend.embed(["pizza"]).shape == (1, primary.dim)
+    assert backend.name == "torch" and backend.index_suffix == ""
+    backend.embed(["pizza"])
+    assert primary.calls == 1
+
+    time.sleep(0.06)
+    assert backend.name == "onnx" and backend.index_suffix == "+onnx-int8"
+    backend.embed(["pizza"])
+    assert primary.calls == 2 and backend.name == "onnx"
+
+
+def test_embed_variant_never_answers_with_the_other_encoder():
+    primary = Primary(failures=1)
+    backend = FallbackBackend(primary, Fallback(), retry_after_s=60)
+    with pytest.raises(RuntimeError):
+        backend.embed_variant(["pizza"], "+onnx-int8")
+    assert backend.index_suffix == "" and backend.fallback.embedded == []
+
+    backend.embed_variant(["pizza"], "")
+    assert backend.fallback.embedded == ["pizza"] and primary.embedded == []
+    # The primary answering again ends the cooldown
+    backend.embed_variant(["pizza"], "+onnx-int8")
+    assert primary.embedded == ["pizza"] and backend.index_suffix == "+onnx-int8"
+
+
+def test_one_failure_during_an_upsert_re_embeds_only_the_changed_dish(catalogue, tmp_path):
+    recommender = catalogue.recommender
+    primary, fallback = recommender.backend.primary, recommender.backend.fallback
+    primary.failures = 1
+    update = catalogue.upsert({"test-1": new_dish("Test Chilli Noodles")})
+
+    assert update["embedded"] == 1 and len(primary.embedded) == 1 and fallback.embedded == []
+    assert catalogue.snapshot().index_key == INT8_KEY
+    assert catalogue.last_update["reason"] == "upsert"
+    # The int8 index on disk holds every dish, ready for the next process
+    stored = DishEmbeddingIndex(str(tmp_path), model_name=INT8_KEY)
+    assert stored.load() and len(stored) == len(catalogue.dishes)
+
+
+def test_a_fallback_re_indexes_under_its_own_key_and_keeps_the_int8_index(catalogue, tmp_path):
+    recommender = catalogue.recommender
+    backend, primary, fallback = recommender.backend, recommender.backend.primary, recommender.backend.fallback
+    dishes = len(catalogue.dishes)
+    primary.failures = 2
+    update = catalogue.upsert({"test-1": new_dish("Test Chilli Noodles")})
+
+    snapshot = catalogue.snapshot()
+    assert snapshot.index_key == config.EMBEDDING_MODEL and update["embedded"] == dishes + 1
+    result = recommender.intelligent_search("spicy noodle soup", snapshot, use_cache=False)
+    assert result[0]["dish"]["name"] == "Test Chilli Noodles"
+    assert primary.embedded == [] and "spicy noodle soup" in fallback.embedded
+    stored = DishEmbeddingIndex(str(tmp_path), model_name=INT8_KEY)
+    assert stored.load() and len(stored) == dishes
+
+    # Once the cooldown is over the int8 index is picked up again: only the upserted dish is embedded
+    backend._primary_down_until = 0.0
+    assert catalogue.snapshot().index_key == INT8_KEY
+    assert catalogue.last_update["reason"] == "backend" and catalogue.last_update["embedded"] == 1
+    assert len(primary.embedded) == 1
+
+
+def test_query_features_are_cached_per_index_key(catalogue):
+    recommender = catalogue.recommender
+    primary, fallback = recommender.backend.primary, recommender.backend.fallback
+    int8 = recommender.get_query_features(["Pizza"])[0]
+    assert int8["index_key"] == INT8_KEY and primary.embedded == ["pizza"]
+
+    torch = recommender.get_query_features(["pizza "], index_key=config.EMBEDDING_MODEL)[0]
+    assert torch["index_key"] == config.EMBEDDING_MODEL and fallback.embedded[-1:] == ["pizza"]
+    recommender.get_query_features(["pizza"])
+    assert primary.embedded == ["pizza"]
+
+    # Features embedded for another variant's index are not scored against this one
+    recommender.feature_cache.clear()
+    recommender.intelligent_search("pizza", catalogue.snapshot(), use_cache=False, **torch)
+    assert primary.embedded == ["pizza", "pizza"]
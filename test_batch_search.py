@@ -0,0 +1,78 @@
+import json
+import os
+
+import pytest
+
+from bench.stubs import StubBackend
+from intelligent_nlp_model import IntelligentFoodRecommender
+
+QUERIES = ["I'm stressed and need comfort food", "something spicy", "tired after the gym", "pizza"]
+
+
+@pytest.fixture
+def dishes():
+    with open(os.path.join("data", "dishes.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def recommender(tmp_path):
+    return IntelligentFoodRecommender(index_dir=str(tmp_path / "index"), backend=StubBackend(),
+                                      retrieval_mode="exact")
+
+
+def test_batch_matches_single_searches_in_order(recommender, dishes):
+    results = recommender.intelligent_search_batch(QUERIES, dishes)
+
+    assert [result.query for result in results] == QUERIES
+    for query, result in zip(QUERIES, results):
+        expected = recommender.intelligent_search(query, dishes, use_cache=False)
+        assert [rec["dish"]["name"] for rec in result] == [rec["dish"]["name"] for rec in expected]
+        assert result.emotional_context == expected.emotional_context
+
+
+def test_batch_reports_per_item_errors(recommender, dishes):
+    results = recommender.intelligent_search_batch(["pizza", "", None, "noodles"], dishes, top_k=3)
+
+    assert len(results[0]) == 3 and len(results[3]) == 3
+    assert isinstance(results[1], ValueError)
+    assert isinstance(results[2], ValueError)
+
+
+def test_batch_filters(recommender, dishes):
+    cuisine = next(iter(dishes.values()))["cuisine_type"]
+    results = recommender.intelligent_search_batch(QUERIES, dishes, top_k=50, filters={"cuisine_type": [cuisine]})
+    for result in results:
+        assert result.candidates
+        assert all(rec["dish"]["cuisine_type"] == cuisine for rec in result)
+
+    with pytest.raises(ValueError):
+        recommender.intelligent_search_batch(QUERIES, dishes, filters={"imageUrl": "x"})
+
+
+class BrokenBackend(StubBackend):
+    """Stub backend whose embedding model raises ValueError while ``broken`` is set"""
+
+    broken = False
+
+    def embed(self, texts, batch_size=32):
+        if self.broken:
+            raise ValueError("embedding model returned NaN")
+        return super().embed(texts, batch_size=batch_size)
+
+
+def test_endpoint_rejects_bad_filters_before_searching(stub_app):
+    client = stub_app().app.test_client()
+    response = client.post("/batch-search", json={"queries": QUERIES, "filters": {"imageUrl": "x"}})
+    assert response.status_code == 400
+    assert client.get("/stats").get_json()["circuit_breaker"]["state"] == "closed"
+
+
+def test_endpoint_counts_pipeline_errors_as_failures(stub_app):
+    backend = BrokenBackend()
+    app = stub_app(backend, breaker={"failures": 1, "latency_slo_ms": 0})
+    app.catalogue.snapshot()
+    backend.broken = True
+    response = app.app.test_client().post("/batch-search", json={"queries": QUERIES})
+    assert response.status_code == 500
+    assert app.breaker.state == "open"
@@ -0,0 +1,64 @@
+import threading
+import time
+
+import pytest
+
+from batching import MicroBatcher
+
+
+class FakeRecommender:
+    """Records each batch of queries it is asked to featurize"""
+
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+        self._lock = threading.Lock()
+
+    def get_query_features(self, queries, timings=None):
+        with self._lock:
+            self.calls.append(list(queries))
+        if self.error is not None:
+            raise self.error
+        return [{"sentiment": {"label": "POSITIVE", "score": 1.0}, "query_embedding": query} for query in queries]
+
+
+def test_concurrent_submits_share_a_backend_call():
+    recommender = FakeRecommender()
+    batcher = MicroBatcher(recommender, max_batch_size=4, max_wait_ms=1000)
+    futures = []
+    threads = [threading.Thread(target=lambda i=i: futures.append((i, batcher.submit(f"query {i}"))))
+               for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for i, future in futures:
+        assert future.result(timeout=5)["query_embedding"] == f"query {i}"
+    # Full batches go out at once, without waiting for max_wait_ms
+    assert [len(call) for call in recommender.calls] == [4, 4]
+    assert batcher.stats()["batch_size_histogram"] == {"4": 2}
+    batcher.stop()
+
+
+def test_max_wait_flushes_a_partial_batch():
+    recommender = FakeRecommender()
+    batcher = MicroBatcher(recommender, max_batch_size=16, max_wait_ms=20)
+    started = time.perf_counter()
+    futures = [batcher.submit(f"query {i}") for i in range(3)]
+    results = [future.result(timeout=5) for future in futures]
+    assert time.perf_counter() - started < 1.0
+    assert recommender.calls == [["query 0", "query 1", "query 2"]]
+    assert all(result["timings"]["queue_wait"] >= 0 for result in results)
+    batcher.stop()
+
+
+def test_backend_errors_reach_every_caller():
+    recommender = FakeRecommender(error=RuntimeError("model crashed"))
+    batcher = MicroBatcher(recommender, max_batch_size=3, max_wait_ms=1000)
+    futures = [batcher.submit(f"query {i}") for i in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model crashed"):
+            future.result(timeout=5)
+    assert len(recommender.calls) == 1
+    batcher.stop()
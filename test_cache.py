@@ -0,0 +1,71 @@
+from cache import InMemorySharedStore, LRUCache, SharedCache, normalize_query
+from dish_index import catalogue_version
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_query():
+    assert normalize_query("  I'm   STRESSED\n") == "i'm stressed"
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2, ttl=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+
+
+def test_lru_expires_after_ttl():
+    clock = FakeClock()
+    cache = LRUCache(max_entries=10, ttl=5, clock=clock)
+    cache.set("a", 1)
+    clock.now = 4.9
+    assert cache.get("a") == 1
+    clock.now = 5.0
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+    assert len(cache) == 0
+
+
+def test_shared_cache_is_visible_across_workers():
+    store = InMemorySharedStore()
+    worker_a = SharedCache(store, prefix="t:", ttl=60)
+    worker_b = SharedCache(store, prefix="t:", ttl=60)
+
+    worker_a.set(("something spicy", "v1"), [{"score": 1.5}])
+    assert worker_b.get(("something spicy", "v1")) == [{"score": 1.5}]
+    assert worker_b.get(("something spicy", "v2")) is None
+
+    worker_b.clear()
+    assert worker_a.get(("something spicy", "v1")) is None
+    assert worker_b.stats()["hits"] == 1
+
+
+def test_shared_store_expires_entries():
+    clock = FakeClock()
+    cache = SharedCache(InMemorySharedStore(clock=clock), ttl=10)
+    cache.set("q", "value")
+    clock.now = 10.0
+    assert cache.get("q") is None
+
+
+def test_catalogue_version_changes_with_any_field():
+    dishes = {"1": {"name": "Pho", "price": 5}}
+    changed = {"1": {"name": "Pho", "price": 6}}
+    assert catalogue_version(dishes) == catalogue_version({"1": {"price": 5, "name": "Pho"}})
+    assert catalogue_version(dishes) != catalogue_version(changed)
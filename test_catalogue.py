@@ -0,0 +1,99 @@
+import json
+import os
+
+import pytest
+
+from bench.stubs import StubBackend
+from dish_catalogue import CatalogueManager
+from intelligent_nlp_model import IntelligentFoodRecommender
+from keyword_index import KeywordIndex
+
+QUERY = "spicy noodle soup"
+
+
+def load_dishes():
+    with open(os.path.join("data", "dishes.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def catalogue(tmp_path):
+    path = str(tmp_path / "dishes.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(load_dishes(), f)
+    recommender = IntelligentFoodRecommender(index_dir=str(tmp_path / "index"), backend=StubBackend(),
+                                             retrieval_mode="exact")
+    return CatalogueManager(recommender, path=path)
+
+
+def new_dish(name):
+    return {"name": name, "description": "Very spicy noodle soup with chilli broth", "categoryName": "Noodles",
+            "main_ingredients": ["noodles", "chilli"], "dish_characteristics": ["spicy"], "price": 5}
+
+
+def test_upsert_and_delete_swap_in_a_new_version(catalogue):
+    recommender = catalogue.recommender
+    before = catalogue.snapshot()
+    first = recommender.intelligent_search(QUERY, before, use_cache=False)
+
+    update = catalogue.upsert({"test-1": new_dish("Test Chilli Noodles")})
+    after = catalogue.snapshot()
+    assert update["changed"] == 1 and update["embedded"] == 1
+    assert after is not before and after.version != before.version
+    assert "test-1" in after.dishes and "test-1" not in before.dishes
+    assert "Test Chilli Noodles" in [rec["dish"]["name"] for rec in
+                                     recommender.intelligent_search(QUERY, after, use_cache=False, top_k=10)]
+
+    # A request still holding the old snapshot sees the old catalogue
+    assert [rec["row"] for rec in recommender.intelligent_search(QUERY, before, use_cache=False)] == \
+        [rec["row"] for rec in first]
+
+    update = catalogue.delete(["test-1", "missing"])
+    assert update["removed"] == 1 and update["not_found"] == ["missing"]
+    assert catalogue.version == before.version
+
+
+def test_incremental_keyword_index_matches_a_fresh_build(catalogue):
+    catalogue.snapshot()
+    dish_ids = list(catalogue.dishes)
+    edited = dict(catalogue.dishes[dish_ids[3]], description="Now with extra lemongrass")
+    catalogue.upsert({dish_ids[3]: edited, "test-2": new_dish("Lemongrass Broth")})
+    catalogue.delete([dish_ids[0]])
+
+    snapshot = catalogue.snapshot()
+    fresh = KeywordIndex(snapshot.dishes)
+    assert snapshot.keyword_index.ids == fresh.ids
+    for keyword in ("lemongrass", "spicy noodle", "chicken", "ga"):
+        assert snapshot.keyword_index.match(keyword).tolist() == fresh.match(keyword).tolist()
+
+
+def test_file_changes_are_reloaded(catalogue):
+    before = catalogue.snapshot()
+    assert catalogue.check_file() is None
+
+    dishes = load_dishes()
+    dishes["test-3"] = new_dish("File Noodles")
+    with open(catalogue.path, "w", encoding="utf-8") as f:
+        json.dump(dishes, f)
+    os.utime(catalogue.path, ns=(0, 0))
+
+    update = catalogue.check_file()
+    assert update["reason"] == "reload" and update["changed"] == 1
+    assert catalogue.snapshot().version != before.version
+    # Unchanged dishes keep their records and embeddings
+    assert catalogue.snapshot().dish_list[0] is before.dish_list[0]
+
+
+def test_store_reuses_unchanged_rows(catalogue):
+    before = catalogue.snapshot()
+    dish_ids = list(catalogue.dishes)
+    first, second = (catalogue.dishes[dish_id] for dish_id in dish_ids[:2])
+    # Both are pizzas: repeated values are one interned string
+    assert first["categoryName"] is second["categoryName"]
+
+    catalogue.upsert({dish_ids[1]: dict(second, price=1.5)})
+    store = catalogue.snapshot().store
+    assert store.json[0] is before.store.json[0]
+    assert store.texts["description"][0] is before.store.texts["description"][0]
+    assert json.loads(store[1].json)["price"] == 1.5 and store[1].id == dish_ids[1]
+    assert store.columns.numbers["price"][1] == 1.5
@@ -0,0 +1,84 @@
+import json
+import os
+
+import numpy as np
+
+from bench.stubs import StubBackend
+from dish_index import DishEmbeddingIndex
+from intelligent_nlp_model import IntelligentFoodRecommender
+
+
+class CountingBackend(StubBackend):
+    """Stub backend that records every text it embeds"""
+
+    def __init__(self):
+        super().__init__()
+        self.embedded = []
+
+    def embed(self, texts, batch_size=32):
+        self.embedded.extend(texts)
+        return super().embed(texts, batch_size=batch_size)
+
+
+def load_dishes():
+    with open(os.path.join("data", "dishes.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_matrix_persists_and_reloads_without_re_embedding(tmp_path):
+    dishes = load_dishes()
+    backend = CountingBackend()
+    first = IntelligentFoodRecommender(index_dir=str(tmp_path), backend=backend, retrieval_mode="exact")
+    first.index_dishes(dishes)
+    assert len(backend.embedded) == len(dishes)
+    assert os.path.exists(first.dish_index.matrix_path)
+
+    restarted = CountingBackend()
+    second = IntelligentFoodRecommender(index_dir=str(tmp_path), backend=restarted, retrieval_mode="exact")
+    second.index_dishes(dishes)
+    assert restarted.embedded == []
+    np.testing.assert_array_equal(second.dish_index.matrix, first.dish_index.matrix)
+
+
+def test_only_changed_dishes_are_re_embedded(tmp_path):
+    dishes = load_dishes()
+    backend = CountingBackend()
+    index = DishEmbeddingIndex(str(tmp_path), model_name="stub")
+    assert index.sync(dishes, backend.embed) == len(dishes)
+    before = np.array(index.matrix)
+
+    dish_ids = list(dishes)
+    dishes[dish_ids[2]] = dict(dishes[dish_ids[2]], description="Now with extra lemongrass")
+    dishes[dish_ids[5]] = dict(dishes[dish_ids[5]], price=1.0)  # not part of the embedded text
+    backend.embedded.clear()
+    reloaded = DishEmbeddingIndex(str(tmp_path), model_name="stub")
+    assert reloaded.load()
+    assert reloaded.sync(dishes, backend.embed) == 1
+    assert len(backend.embedded) == 1 and "lemongrass" in backend.embedded[0]
+
+    unchanged = [row for row in range(len(dish_ids)) if row != 2]
+    np.testing.assert_array_equal(reloaded.matrix[unchanged], before[unchanged])
+    assert not np.array_equal(reloaded.matrix[2], before[2])
+
+
+def test_manifest_names_the_matrix_written_before_it(tmp_path):
+    dishes = load_dishes()
+    index = DishEmbeddingIndex(str(tmp_path), model_name="stub")
+    index.sync(dishes, StubBackend().embed)
+    first = index.matrix_path
+
+    for description in ["Now with extra lemongrass", "Now with extra basil"]:
+        dish_id = next(iter(dishes))
+        dishes[dish_id] = dict(dishes[dish_id], description=description)
+        index.sync(dishes, StubBackend().embed)
+        with open(index.meta_path, "r", encoding="utf-8") as f:
+            assert json.load(f)["matrix"] == os.path.basename(index.matrix_path)
+    # The matrix the previous manifest named is kept for readers still loading it; older ones go
+    matrices = sorted(name for name in os.listdir(tmp_path) if name.endswith(".npy"))
+    assert len(matrices) == 2 and os.path.basename(first) not in matrices
+
+
+def test_index_of_another_model_is_not_reused(tmp_path):
+    dishes = load_dishes()
+    DishEmbeddingIndex(str(tmp_path), model_name="stub").sync(dishes, StubBackend().embed)
+    assert not DishEmbeddingIndex(str(tmp_path), model_name="other-model").load()
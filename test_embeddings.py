@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from intelligent_nlp_model import IntelligentFoodRecommender
+from model_registry import ModelRegistry
+
+WORDS = "i am feeling tired stressed and need something spicy warm soup comfort food with chicken rice".split()
+
+
+@pytest.fixture
+def recommender(tmp_path):
+    """Recommender wired to a tiny random BERT so no download is needed"""
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS))
+    torch.manual_seed(0)
+    config = transformers.BertConfig(vocab_size=len(WORDS) + 5, hidden_size=32, num_hidden_layers=2,
+                                     num_attention_heads=4, intermediate_size=64)
+    tokenizer = transformers.BertTokenizer(str(vocab_file))
+    model = transformers.BertModel(config).eval()
+    models = ModelRegistry({"embedding": lambda: (tokenizer, model)})
+    return IntelligentFoodRecommender(index_dir=str(tmp_path / "index"), models=models)
+
+
+def test_batch_embeddings_match_single_text(recommender):
+    texts = [
+        "spicy",
+        "i am feeling tired and need something warm",
+        "comfort food",
+        "stressed and need warm soup with chicken and rice",
+        "rice",
+    ]
+    batch = recommender.get_embeddings_batch(texts, batch_size=2)
+
+    single = np.vstack([recommender.get_embeddings(text) for text in texts])
+    single /= np.linalg.norm(single, axis=1, keepdims=True)
+
+    assert batch.shape == single.shape
+    assert batch.dtype == np.float32
+    np.testing.assert_allclose(batch, single, atol=1e-5)
+    np.testing.assert_allclose(np.linalg.norm(batch, axis=1), 1.0, atol=1e-5)
+
+
+def test_batch_embeddings_empty(recommender):
+    assert recommender.get_embeddings_batch([]).shape == (0, 32)
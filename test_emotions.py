@@ -0,0 +1,29 @@
+from emotion_matcher import EmotionMatcher
+
+matcher = EmotionMatcher.from_file("data/emotions.json")
+
+
+def test_whole_word_matches_with_spans():
+    emotions, matches = matcher.match("Tired after the gym, I can’t  sit still")
+    assert emotions == ["energy", "tired", "physical"]
+    assert [(m["keyword"], m["span"]) for m in matches] == [
+        ("tired", [0, 5]), ("gym", [16, 19]), ("can't sit still", [23, 39])]
+
+    assert matcher.match("gymnastics downtown, warmly active")[0] == ["energy"]
+    assert matcher.match("pizza please") == ([], [])
+
+
+def test_expansions_follow_the_mood_mapping():
+    tired = matcher.expand(["tired"])
+    assert tired == frozenset(matcher.mood_food_mapping["tired"])
+    assert "spicy food" not in tired
+    assert matcher.expand(["mood"]) == frozenset()
+    assert matcher.expand(["comfort"], negative=True) == frozenset(
+        matcher.mood_food_mapping["stressed"] + matcher.mood_food_mapping["sad"])
+
+
+def test_lexicon_can_be_extended_without_code():
+    custom = EmotionMatcher({"hungover": {"keywords": ["hungover", "rough night"], "moods": ["greasy"]}},
+                            {"greasy": ["fries", "burger"]})
+    assert custom.match("after a ROUGH   night")[0] == ["hungover"]
+    assert custom.expand(["hungover"]) == {"fries", "burger"}
@@ -0,0 +1,90 @@
+import time
+
+import pytest
+
+import config
+from bench.stubs import StubBackend
+from dish_catalogue import CatalogueManager
+from fallback import FallbackSearch, tokenize
+from intelligent_nlp_model import IntelligentFoodRecommender
+
+
+def test_tokenize_drops_stopwords():
+    assert tokenize("I’d LIKE some Spicy pad-thai, can't wait!") == ["spicy", "pad", "thai", "wait"]
+    assert tokenize("") == []
+
+
+class FlakyBackend(StubBackend):
+    """Stub backend that raises while ``broken`` is set"""
+
+    broken = False
+
+    def sentiment(self, texts):
+        if self.broken:
+            raise RuntimeError("model server down")
+        return super().sentiment(texts)
+
+
+@pytest.fixture
+def client(stub_app):
+    backend = FlakyBackend()
+    app = stub_app(backend, breaker={"failures": 2, "latency_slo_ms": 0, "probe_interval_s": 0.05})
+    return app.app.test_client(), backend
+
+
+def test_fallback_search_ranks_by_keyword_matches(tmp_path):
+    recommender = IntelligentFoodRecommender(index_dir=str(tmp_path / "index"), backend=StubBackend(),
+                                             retrieval_mode="exact")
+    catalogue = CatalogueManager(recommender, path=config.DISHES_PATH, persist=False)
+    fallback = FallbackSearch(catalogue)
+    results = fallback.search("chicken curry", top_k=3)
+    assert 0 < len(results) <= 3
+    assert all("chicken" in record.json.lower() or "curry" in record.json.lower() for record in results)
+    assert all(record["price"] <= 10 for record in fallback.search("chicken", top_k=50, filters={"max_price": 10}))
+    assert fallback.search("zzzz") == []
+    assert fallback.search(None) == [] and fallback.search({"query": "chicken"}) == []
+
+
+def test_breaker_routes_to_fallback_and_recovers(client):
+    client, backend = client
+    backend.broken = True
+    # Each failure still answers from the fallback, flagged with a 500
+    for _ in range(2):
+        response = client.post("/search", json={"query": "spicy chicken"})
+        assert response.status_code == 500
+        assert response.headers["X-Search-Mode"] == "fallback"
+
+    response = client.post("/search", json={"query": "spicy chicken"})
+    assert response.status_code == 200
+    assert response.headers["X-Search-Mode"] == "fallback"
+    assert response.get_json()["result"]
+    assert client.post("/smart-search", json={"query": "spicy chicken"}).status_code == 503
+    assert client.get("/stats").get_json()["circuit_breaker"]["state"] == "open"
+
+    backend.broken = False
+    deadline = time.time() + 5
+    while client.get("/stats").get_json()["circuit_breaker"]["state"] != "closed" and time.time() < deadline:
+        time.sleep(0.02)
+    response = client.post("/search", json={"query": "spicy chicken"})
+    assert response.status_code == 200
+    assert "X-Search-Mode" not in response.headers
+
+
+def test_bad_queries_are_rejected_without_tripping_the_breaker(client):
+    client, _ = client
+    assert tokenize(None) == [] and tokenize(42) == []
+    for _ in range(3):
+        for path in ("/search", "/smart-search"):
+            response = client.post(path, json={"query": ["spicy", "chicken"]})
+            assert response.status_code == 400
+            assert response.get_json()["error"] == "'query' must be a string"
+        assert client.post("/batch-search", json={"queries": ["pizza", 42]}).status_code == 400
+    assert client.get("/stats").get_json()["circuit_breaker"]["state"] == "closed"
+
+
+def test_batch_search_success_resets_the_failure_count(stub_app):
+    app = stub_app(breaker={"failures": 2, "latency_slo_ms": 0})
+    app.breaker.record_failure("model server down")
+    assert app.app.test_client().post("/batch-search", json={"queries": ["pizza"]}).status_code == 200
+    app.breaker.record_failure("model server down")
+    assert app.breaker.state == "closed"
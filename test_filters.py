@@ -0,0 +1,63 @@
+import json
+import math
+import os
+
+import pytest
+
+from bench.stubs import StubBackend
+from dish_filters import DishColumns, prep_minutes
+from intelligent_nlp_model import IntelligentFoodRecommender
+
+
+@pytest.fixture
+def dishes():
+    with open(os.path.join("data", "dishes.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def recommender(tmp_path):
+    return IntelligentFoodRecommender(index_dir=str(tmp_path / "index"), backend=StubBackend(),
+                                      retrieval_mode="exact")
+
+
+def test_prep_minutes():
+    assert prep_minutes("8 mins") == 8
+    assert prep_minutes("5 - 10 mins") == 10
+    assert prep_minutes("20 - 25 phút") == 25
+    assert math.isnan(prep_minutes("temp"))
+    assert math.isnan(prep_minutes(None))
+
+
+def test_masks_match_a_python_scan(dishes):
+    dish_list = list(dishes.values())
+    columns = DishColumns(dish_list)
+    assert columns.mask({"isDeleted": [True, False, None]}) is None
+
+    filters = {"min_price": 10, "max_price": 40, "min_star": 3, "max_prep_minutes": 12,
+               "cuisine_type": ["Italian-American", "American"]}
+    expected = [not dish.get("isDeleted") and isinstance(dish.get("price"), (int, float))
+                and 10 <= dish["price"] <= 40 and dish["star"] >= 3 and prep_minutes(dish["time"]) <= 12
+                and dish["cuisine_type"] in filters["cuisine_type"] for dish in dish_list]
+    assert columns.mask(filters).tolist() == expected
+
+    with pytest.raises(ValueError):
+        columns.mask({"max_price": "cheap"})
+    with pytest.raises(ValueError):
+        columns.mask({"imageUrl": "x"})
+
+
+def test_search_fills_top_k_with_eligible_dishes(recommender, dishes):
+    assert not any(rec["dish"].get("isDeleted")
+                   for rec in recommender.intelligent_search("pizza", dishes, use_cache=False, top_k=60))
+
+    filters = {"max_price": 20, "isPopular": True}
+    eligible = [dish for dish in dishes.values()
+                if dish["price"] <= 20 and dish["isPopular"] and not dish.get("isDeleted")]
+    result = recommender.intelligent_search("noodles", dishes, top_k=len(eligible) + 5, filters=filters)
+    assert len(result) == len(eligible)
+    assert all(rec["dish"]["price"] <= 20 and rec["dish"]["isPopular"] for rec in result)
+
+    # Filtered rankings are cached apart from unfiltered ones
+    assert recommender.cached_search("noodles", dishes, top_k=3, filters=filters) is not None
+    assert recommender.cached_search("noodles", dishes, top_k=3) is None
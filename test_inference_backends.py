@@ -0,0 +1,99 @@
+import json
+import re
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("onnx")
+
+from dish_index import dish_text
+from inference_backends import OnnxBackend, TorchBackend
+from model_registry import ModelRegistry
+
+QUERIES = [
+    "i am tired and need something spicy",
+    "warm soup with chicken",
+    "cheese pizza with beef",
+    "fresh salad",
+    "sweet dessert with chocolate",
+]
+
+
+@pytest.fixture(scope="module")
+def dish_texts():
+    with open("data/dishes.json", "r", encoding="utf-8") as f:
+        return [dish_text(dish) for dish in json.load(f).values()]
+
+
+@pytest.fixture(scope="module")
+def tiny_models(tmp_path_factory, dish_texts):
+    """Randomly initialised BERT encoder and classifier over the catalogue vocabulary"""
+    words = sorted({word for text in dish_texts + QUERIES for word in re.findall(r"\w+", text.lower())})
+    vocab_file = tmp_path_factory.mktemp("vocab") / "vocab.txt"
+    vocab_file.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words))
+    tokenizer = transformers.BertTokenizerFast(vocab_file=str(vocab_file))
+
+    torch.manual_seed(0)
+    config = dict(vocab_size=len(words) + 5, hidden_size=64, num_hidden_layers=2,
+                  num_attention_heads=4, intermediate_size=128)
+    encoder = transformers.BertModel(transformers.BertConfig(**config)).eval()
+    classifier = transformers.BertForSequenceClassification(transformers.BertConfig(
+        **config, num_labels=2, id2label={0: "NEGATIVE", 1: "POSITIVE"},
+        label2id={"NEGATIVE": 0, "POSITIVE": 1})).eval()
+    return tokenizer, encoder, classifier
+
+
+def make_backends(tiny_models, cache_dir, quantize):
+    tokenizer, encoder, classifier = tiny_models
+    analyzer = transformers.pipeline("sentiment-analysis", model=classifier, tokenizer=tokenizer)
+    torch_backend = TorchBackend(ModelRegistry({
+        "embedding": lambda: (tokenizer, encoder),
+        "sentiment": lambda: analyzer,
+    }))
+    onnx_backend = OnnxBackend(ModelRegistry(), cache_dir=str(cache_dir), quantize=quantize, torch_loaders={
+        "embedding": lambda: (tokenizer, encoder),
+        "sentiment": lambda: (tokenizer, classifier),
+    })
+    return torch_backend, onnx_backend
+
+
+def rankings(backend, dish_texts, k=5):
+    dishes = backend.embed(dish_texts, batch_size=8)
+    queries = backend.embed(QUERIES)
+    return np.argsort(-(queries @ dishes.T), axis=1, kind="stable")[:, :k]
+
+
+def test_onnx_matches_torch(tiny_models, dish_texts, tmp_path):
+    torch_backend, onnx_backend = make_backends(tiny_models, tmp_path, quantize=False)
+
+    np.testing.assert_allclose(onnx_backend.embed(dish_texts, batch_size=8),
+                               torch_backend.embed(dish_texts, batch_size=8), atol=1e-4)
+    np.testing.assert_array_equal(rankings(onnx_backend, dish_texts), rankings(torch_backend, dish_texts))
+
+    expected = torch_backend.sentiment(QUERIES)
+    actual = onnx_backend.sentiment(QUERIES)
+    assert [r["label"] for r in actual] == [r["label"] for r in expected]
+    np.testing.assert_allclose([r["score"] for r in actual], [r["score"] for r in expected], atol=1e-4)
+
+
+def test_onnx_artifacts_are_reused(tiny_models, tmp_path):
+    _, onnx_backend = make_backends(tiny_models, tmp_path, quantize=False)
+    onnx_backend.embed(["warm soup"])
+
+    def fail():
+        raise AssertionError("cached artifact should be loaded without the torch model")
+
+    reloaded = OnnxBackend(ModelRegistry(), cache_dir=str(tmp_path), quantize=False,
+                           torch_loaders={"embedding": fail, "sentiment": fail})
+    np.testing.assert_allclose(reloaded.embed(["warm soup"]), onnx_backend.embed(["warm soup"]), atol=1e-6)
+
+
+def test_int8_ranking_agrees_with_torch(tiny_models, dish_texts, tmp_path):
+    torch_backend, onnx_backend = make_backends(tiny_models, tmp_path, quantize=True)
+    expected = rankings(torch_backend, dish_texts)
+    actual = rankings(onnx_backend, dish_texts)
+    overlap = np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(actual, expected)])
+    assert overlap >= 0.8
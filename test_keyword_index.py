@@ -0,0 +1,114 @@
+import json
+import re
+
+import numpy as np
+import pytest
+
+import keyword_index
+from keyword_index import KeywordIndex, light_stem
+
+INTELLIGENT_FIELDS = ("name", "description", "categoryName", "main_ingredients", "dish_characteristics")
+
+
+@pytest.fixture(scope="module")
+def dishes():
+    with open("data/dishes.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def legacy_keyword_scores(keywords, dishes):
+    """The per-dish substring loop intelligent_search used before the index"""
+    scores = []
+    for dish_data in dishes.values():
+        keyword_score = 0
+        for keyword in keywords:
+            if any(keyword.lower() in field.lower() for field in [
+                dish_data["name"],
+                dish_data["description"],
+                dish_data["categoryName"],
+                " ".join(dish_data["main_ingredients"]),
+                " ".join(dish_data["dish_characteristics"])
+            ]):
+                keyword_score += 1
+        scores.append(keyword_score)
+    return np.array(scores, dtype=np.float32)
+
+
+def legacy_search_dishes(keywords, dishes):
+    """nlp_model.search_dishes before the index"""
+    matching = []
+    for dish_data in dishes.values():
+        fields_to_search = [
+            dish_data["categoryName"].lower(),
+            dish_data["description"].lower(),
+            dish_data["name"].lower(),
+            dish_data["cuisine_type"].lower(),
+            " ".join(dish_data["dish_characteristics"]).lower(),
+            " ".join(dish_data["main_ingredients"]).lower()
+        ]
+        if any(any(keyword in field for keyword in keywords) for field in fields_to_search):
+            matching.append(dish_data)
+    return matching
+
+
+def catalogue_words(dishes):
+    words = set()
+    for dish_data in dishes.values():
+        words.update(re.findall(r"\w+", json.dumps(dish_data).lower()))
+    return sorted(words)
+
+
+def test_single_word_scores_match_substring_semantics(dishes):
+    index = KeywordIndex(dishes)
+    weights = {field: 1.0 for field in INTELLIGENT_FIELDS}
+    # Whole words, fragments that only match inside other words, and misses
+    words = catalogue_words(dishes)[::7] + ["tea", "gym", "chick", "Spicy", "a", "zzz", "i'm", "bbq"]
+    for word in words:
+        np.testing.assert_array_equal(index.score([word], weights), legacy_keyword_scores([word], dishes), err_msg=word)
+    np.testing.assert_array_equal(index.score(words, weights), legacy_keyword_scores(words, dishes))
+
+
+def test_phrase_scores_match_substring_semantics(dishes):
+    index = KeywordIndex(dishes)
+    weights = {field: 1.0 for field in INTELLIGENT_FIELDS}
+    phrases = ["comfort food", "warm soup", "mozzarella cheese", "crab sticks", "of the ocean", "ese and", "ice cream"]
+    np.testing.assert_array_equal(index.score(phrases, weights), legacy_keyword_scores(phrases, dishes))
+
+
+def test_match_any_matches_search_dishes(dishes):
+    index = KeywordIndex(dishes)
+    for keywords in (["spicy"], ["tired", "chicken"], ["italian"], ["nothing-here"], []):
+        expected = legacy_search_dishes(keywords, dishes)
+        assert [dishes[index.ids[i]] for i in index.match_any(keywords)] == expected
+
+
+def test_field_weights_take_best_matching_field():
+    dishes = {
+        "a": {"name": "Pho", "description": "beef noodle soup"},
+        "b": {"name": "Beef Burger", "description": "grilled beef"},
+    }
+    index = KeywordIndex(dishes, fields=("name", "description"))
+    scores = index.score(["beef", "soup"], {"name": 2.0, "description": 0.5})
+    np.testing.assert_array_equal(scores, [1.0, 2.0])
+
+
+def test_stemmed_index_matches_tokens_and_ngrams():
+    dishes = {
+        "a": {"name": "Chicken Noodles", "description": "spicy fried chicken"},
+        "b": {"name": "Teacake", "description": "sweet"},
+    }
+    index = KeywordIndex(dishes, fields=("name", "description"), stem=True)
+    assert light_stem("noodles") == "noodle"
+    assert light_stem("dishes") == "dish"
+    assert index.match("noodle").tolist() == [0]
+    assert index.match("fried chickens").tolist() == [0]
+    assert index.match("tea").tolist() == []
+
+
+def test_trigram_lookup_matches_a_vocabulary_scan(dishes, monkeypatch):
+    monkeypatch.setattr(keyword_index, "_MAX_CACHED_MATCHES", 10)
+    index = KeywordIndex(dishes).updated(dict(dishes, extra={"name": "Lemongrass chicken"}), ["extra"])
+    parts = [word[i:i + n] for word in catalogue_words(dishes)[::11] for n in (1, 3, 5) for i in (0, 1)]
+    for part in parts + ["lemongr", "zzz", "i'm"]:
+        assert index._matching_tokens(part) == [token for token in index._vocabulary if part in token], part
+        assert len(index._token_cache) <= 10
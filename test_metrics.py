@@ -0,0 +1,52 @@
+import logging
+
+import log_setup
+from metrics import Registry
+
+
+def test_prometheus_text_format():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests", ("endpoint", "status"))
+    latency = registry.histogram("latency_seconds", "Latency", ("stage",), buckets=(0.01, 0.1))
+    registry.gauge("queue_depth", "Queue", lambda: 3)
+    requests.inc(endpoint="/search", status="200")
+    requests.inc(endpoint="/search", status="200")
+    for value in (0.005, 0.05, 0.5):
+        latency.observe(value, stage="ranking")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{endpoint="/search",status="200"} 2.0' in lines
+    assert 'latency_seconds_bucket{stage="ranking",le="0.01"} 1.0' in lines
+    assert 'latency_seconds_bucket{stage="ranking",le="0.1"} 2.0' in lines
+    assert 'latency_seconds_bucket{stage="ranking",le="+Inf"} 3.0' in lines
+    assert 'latency_seconds_count{stage="ranking"} 3.0' in lines
+    assert "queue_depth 3.0" in lines
+
+
+def test_metrics_endpoint_reports_requests_and_stages(stub_app):
+    client = stub_app().app.test_client()
+    assert client.post("/smart-search", json={"query": "something spicy"}).status_code == 200
+    assert client.post("/smart-search", json={}).status_code == 400
+    text = client.get("/metrics").get_data(as_text=True)
+
+    assert 'nlp_requests_total{endpoint="/smart-search",status="200"}' in text
+    assert 'nlp_requests_total{endpoint="/smart-search",status="400"}' in text
+    for stage in ("sentiment", "embedding", "scoring", "ranking"):
+        assert f'nlp_stage_duration_seconds_count{{stage="{stage}"}}' in text
+    assert 'nlp_cache_hit_ratio{cache="features"}' in text
+    assert "nlp_batch_queue_depth 0.0" in text
+
+
+def test_sampled_events(monkeypatch, caplog):
+    logger = logging.getLogger("test_sampled_events")
+    caplog.set_level(logging.INFO, logger=logger.name)
+    monkeypatch.setattr(log_setup, "_sample_rate", 0.0)
+    log_setup.log_event(logger, logging.INFO, "search", sampled=True, query="pizza")
+    log_setup.log_event(logger, logging.WARNING, "slow", latency_ms=900)
+    assert [record.getMessage() for record in caplog.records] == ["slow"]
+    assert caplog.records[0].fields == {"latency_ms": 900}
+
+    monkeypatch.setattr(log_setup, "_sample_rate", 1.0)
+    log_setup.log_event(logger, logging.INFO, "search", sampled=True, query="pizza")
+    assert caplog.records[-1].fields == {"query": "pizza"}
@@ -0,0 +1,88 @@
+import sys
+import threading
+import time
+import types
+
+import config
+import model_registry
+from bench.stubs import StubBackend
+from model_registry import ModelRegistry
+
+
+def test_models_load_on_first_use_and_only_once():
+    loads = []
+
+    def load():
+        loads.append(threading.get_ident())
+        time.sleep(0.05)
+        return object()
+
+    registry = ModelRegistry({"embedding": load})
+    assert loads == [] and not registry.is_loaded("embedding")
+
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(registry.get("embedding"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+    assert all(model is models[0] for model in models)
+    assert registry.status()["embedding"]["loaded"] and registry.status()["embedding"]["load_seconds"] > 0
+
+
+def test_model_names_come_from_config(monkeypatch):
+    monkeypatch.setattr(config, "SENTIMENT_MODEL", "local/sentiment")
+    monkeypatch.setattr(config, "EMBEDDING_MODEL", "local/embedding")
+    loaded = []
+
+    class Loader:
+        @staticmethod
+        def from_pretrained(name):
+            loaded.append(("pretrained", name))
+            return Loader()
+
+        def eval(self):
+            return self
+
+    transformers = types.ModuleType("transformers")
+    transformers.pipeline = lambda task, model: loaded.append((task, model)) or task
+    transformers.AutoTokenizer = transformers.AutoModel = Loader
+    monkeypatch.setitem(sys.modules, "transformers", transformers)
+
+    registry = model_registry.default_registry()
+    assert loaded == []
+    registry.get("sentiment")
+    registry.get("embedding")
+    assert loaded == [("sentiment-analysis", "local/sentiment"), ("pretrained", "local/embedding"),
+                      ("pretrained", "local/embedding")]
+
+
+class WarmUpBackend(StubBackend):
+    """Stub backend that depends on both registry models"""
+
+    model_names = ("sentiment", "embedding")
+
+
+def test_ready_reports_503_until_models_load(stub_app, monkeypatch):
+    release = threading.Event()
+
+    def slow_loader():
+        release.wait(5)
+        return object()
+
+    app = stub_app(WarmUpBackend(), models=ModelRegistry({"sentiment": slow_loader, "embedding": slow_loader}))
+    monkeypatch.setattr(app, "warm_up_done", threading.Event())
+    client = app.app.test_client()
+
+    warm_up = threading.Thread(target=app._warm_up)
+    warm_up.start()
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.get_json()["models"]["embedding"]["loaded"] is False
+
+    release.set()
+    warm_up.join(5)
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert all(model["loaded"] for model in response.get_json()["models"].values())
@@ -0,0 +1,43 @@
+import json
+import os
+
+from bench.stubs import StubBackend
+from cache import LRUCache
+from intelligent_nlp_model import IntelligentFoodRecommender
+from responses import dish_payload, json_document, ndjson_lines, smart_item_json
+
+
+def load_dishes():
+    with open(os.path.join("data", "dishes.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_pages_follow_the_deep_ranking_and_reuse_the_cache(tmp_path):
+    dishes = load_dishes()
+    recommender = IntelligentFoodRecommender(index_dir=str(tmp_path / "index"), backend=StubBackend(),
+                                             retrieval_mode="exact", result_cache=LRUCache(ttl=None))
+    ranking = recommender.intelligent_search("I'm stressed and need comfort food", dishes, top_k=30)
+    assert len(ranking) == 30
+
+    page = recommender.intelligent_search("I'm stressed and need comfort food", dishes, top_k=10, offset=10)
+    assert page.cached and page.offset == 10
+    assert [rec["row"] for rec in page] == [rec["row"] for rec in ranking[10:20]]
+
+    # Deeper than anything cached: ranked again
+    assert not recommender.intelligent_search("I'm stressed and need comfort food", dishes, top_k=10,
+                                              offset=30).cached
+
+
+def test_serialized_items_match_the_dish_payload(tmp_path):
+    dishes = load_dishes()
+    recommender = IntelligentFoodRecommender(index_dir=str(tmp_path / "index"), backend=StubBackend())
+    result = recommender.intelligent_search("pizza", dishes, use_cache=False)
+
+    document = json.loads(json_document({"query": "pizza"}, "result",
+                                        (smart_item_json(recommender.snapshot, rec) for rec in result)))
+    assert document["query"] == "pizza"
+    assert [item["dish"] for item in document["result"]] == [dish_payload(rec["dish"]) for rec in result]
+    assert document["result"][0]["confidence_score"] == float(result[0]["score"])
+
+    lines = list(ndjson_lines({"query": "pizza"}, (recommender.snapshot.dish_json(rec["row"]) for rec in result)))
+    assert [json.loads(line) for line in lines[1:]] == [dish_payload(rec["dish"]) for rec in result]
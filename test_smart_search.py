@@ -0,0 +1,36 @@
+from bench.stubs import StubBackend
+
+
+class CountingBackend(StubBackend):
+    """Stub backend that records the texts each model call receives"""
+
+    def __init__(self):
+        super().__init__()
+        self.sentiment_calls = []
+
+    def sentiment(self, texts):
+        self.sentiment_calls.append(list(texts))
+        return super().sentiment(texts)
+
+
+def test_sentiment_runs_once_per_smart_search(stub_app):
+    backend = CountingBackend()
+    client = stub_app(backend).app.test_client()
+    for query in ("I'm stressed and want comfort food", "feeling tired, need coffee"):
+        response = client.post("/smart-search", json={"query": query})
+        assert response.status_code == 200
+        assert response.get_json()["emotional_analysis"]["sentiment"]
+    # One call per request, on the normalized query
+    assert backend.sentiment_calls == [["i'm stressed and want comfort food"], ["feeling tired, need coffee"]]
+
+
+def test_debug_timings(stub_app):
+    client = stub_app().app.test_client()
+    plain = client.post("/smart-search", json={"query": "warm soup"}).get_json()
+    assert "timings_ms" not in plain
+
+    timed = client.post("/smart-search?debug=timings", json={"query": "something spicy"}).get_json()
+    timings = timed["timings_ms"]
+    assert {"sentiment", "embedding", "scoring", "ranking"} <= set(timings)
+    assert all(isinstance(ms, float) and ms >= 0 for ms in timings.values())
+    assert client.post("/search", json={"query": "noodles", "debug": "timings"}).get_json()["timings_ms"]